@@ -0,0 +1,351 @@
+"""
+Banc de mesure des 15 indicateurs sur des volumes croissants (1x, 10x, 100x, 1000x)
+Les tables d'historique du dump et le log robot sont répliqués N fois (copies décalées vers
+le passé, numéros d'OF renumérotés), puis chaque indicateur et run_all_indicators sont
+chronométrés: latence, pic mémoire et nombre de requêtes, écrits en JSON pour comparer
+deux versions du code (--compare ancien.json nouveau.json)
+
+Usage:
+    python benchmark_indicators.py --factors 1 10 100 --output bench.json
+    python benchmark_indicators.py --compare bench_avant.json bench_apres.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mes_backends import DUCKDB_AVAILABLE, EmbeddedBackend
+from mes_dump import MySQLDump
+from robot_data import TIMESTAMP_COLUMN, load_robot_csv, robot_columns
+from test_indicators import MESIndicators
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DUMP_PATH = 'TELEFAN/FestoMES-2025-03-27.sql'
+CSV_ROBOT_PATH = 'TELEFAN/robotino_data.csv'
+DEFAULT_FACTORS = [1, 10, 100, 1000]
+DEFAULT_REPEAT = 3
+MODES = ['direct', 'snapshot']
+
+# Tables d'historique: elles grossissent avec le temps et sont répliquées
+SCALED_TABLES = ['tblfinorder', 'tblfinorderpos', 'tblfinstep', 'tblmachinereport',
+                 'tblpartsreport', 'tblmainterror']
+# Tables de référence et d'état (magasin, ressources): même taille quel que soit l'historique
+REFERENCE_TABLES = ['tblbufferpos', 'tblboxpos', 'tblbuffer', 'tblresource', 'tblerrorcodes']
+# Clés renumérotées à chaque copie (unicité des OF et des lignes de rapport)
+KEY_COLUMNS = {'ONo', 'ID'}
+# Décalage entre deux copies des tables MES: les dates du dump s'étalent de 2016 à 2025,
+# une copie par semaine antérieure garde les motifs hebdomadaires et des dates valides à 1000x
+HISTORY_SHIFT = pd.Timedelta(weeks=1)
+
+# Écart relatif de latence au-delà duquel --compare signale une régression
+REGRESSION_THRESHOLD = 0.20
+
+
+# ========== DONNÉES MISES À L'ÉCHELLE ==========
+
+def _span(frames: Iterable[pd.DataFrame]) -> pd.Timedelta:
+    """Durée couverte par les colonnes de dates, arrondie au jour supérieur (au moins 1 jour)"""
+    low, high = None, None
+    for frame in frames:
+        for column in frame.select_dtypes(include='datetime').columns:
+            values = frame[column].dropna()
+            if values.empty:
+                continue
+            low = values.min() if low is None else min(low, values.min())
+            high = values.max() if high is None else max(high, values.max())
+    if low is None:
+        return pd.Timedelta(days=1)
+    return max((high - low).ceil('D'), pd.Timedelta(days=1))
+
+
+def replicate(frame: pd.DataFrame, factor: int, span: pd.Timedelta,
+              key_columns: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Réplique un DataFrame factor fois: la copie k est reculée de k x span dans le temps et
+    ses clés décalées de k x (clé max + 1), sans boucle Python sur les lignes
+    La copie 0 est la table d'origine: les données les plus récentes ne changent pas
+
+    Args:
+        frame: Table d'origine
+        factor: Nombre de copies (1 = table inchangée)
+        span: Décalage temporel entre deux copies
+        key_columns: Colonnes d'identifiants à renuméroter
+    """
+    if factor <= 1 or frame.empty:
+        return frame
+    n = len(frame)
+    copy = np.repeat(np.arange(factor, dtype='int64'), n)
+    scaled = frame.iloc[np.tile(np.arange(n), factor)].reset_index(drop=True)
+    for column in scaled.select_dtypes(include='datetime').columns:
+        scaled[column] = scaled[column] - pd.to_timedelta(copy * span.value, unit='ns')
+    for column in key_columns:
+        if column in scaled.columns and pd.api.types.is_integer_dtype(scaled[column]):
+            scaled[column] = scaled[column] + copy * (int(frame[column].max()) + 1)
+    return scaled
+
+
+def scaled_tables(tables: Dict[str, pd.DataFrame], factor: int) -> Iterable[Tuple[str, pd.DataFrame]]:
+    """
+    Tables du dump à factor x leur volume (tables de référence inchangées)
+    Produites une par une: à 1000x, une seule table répliquée est en mémoire à la fois
+    """
+    for name, frame in tables.items():
+        yield name, replicate(frame, factor, HISTORY_SHIFT, KEY_COLUMNS) if name in SCALED_TABLES else frame
+
+
+def write_scaled_robot_csv(robot: pd.DataFrame, factor: int, path: str) -> int:
+    """
+    Écrit le log robot répliqué factor fois (un jour de plus par copie, vers le passé)
+    Seules les colonnes lues par les indicateurs sont écrites
+
+    Returns: nombre de lignes écrites
+    """
+    span = _span([robot[[TIMESTAMP_COLUMN]]])
+    scaled = replicate(robot, factor, span)
+    scaled.to_csv(path, index=False, date_format='%Y-%m-%dT%H:%M:%S.%f')
+    return len(scaled)
+
+
+# ========== MESURES ==========
+
+def _rss_peak_mb() -> Optional[float]:
+    """Pic de mémoire résidente du processus (Mo), None si non disponible"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets sous Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def measure(func, repeat: int = DEFAULT_REPEAT) -> Dict:
+    """
+    Chronomètre func() (repeat exécutions sans traçage) puis mesure son pic mémoire Python
+    sur une exécution tracée (tracemalloc ralentit le code: latence et mémoire sont séparées)
+
+    Returns: dict (latency_s = médiane, latency_min_s, peak_mb, error)
+    """
+    timings, error = [], None
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(max(repeat, 1)):
+            began = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                error = str(e)
+            timings.append(time.perf_counter() - began)
+        tracemalloc.start()
+        try:
+            func()
+        except Exception:
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        'latency_s': round(statistics.median(timings), 6),
+        'latency_min_s': round(min(timings), 6),
+        'peak_mb': round(peak / 1e6, 3),
+        'error': error,
+    }
+
+
+def benchmark_factor(tables: Dict[str, pd.DataFrame], robot: pd.DataFrame, factor: int,
+                     engine: str, repeat: int = DEFAULT_REPEAT, work_dir: Optional[str] = None,
+                     modes: Iterable[str] = MODES, query_cache_mb: Optional[float] = None) -> List[Dict]:
+    """
+    Mesure tous les indicateurs et run_all_indicators à un facteur de volume donné
+
+    Args:
+        tables: Tables du dump (volume 1x)
+        robot: Log robot (volume 1x, colonnes des indicateurs)
+        factor: Facteur de volume
+        engine: Moteur de la base embarquée ('duckdb' ou 'sqlite')
+        repeat: Exécutions chronométrées par mesure
+        work_dir: Dossier du CSV robot mis à l'échelle (défaut: dossier temporaire)
+        modes: 'direct' (une requête SQL par indicateur) et/ou 'snapshot'
+        query_cache_mb: Cache des requêtes de MESIndicators (None = sans cache: chaque mesure
+                        exécute son SQL, comme avant le cache)
+    Returns: une ligne de résultat par (mode, indicateur), plus 'run_all_indicators'
+    """
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        began = time.perf_counter()
+        # Base sur disque: à 1000x les tables ne tiennent pas toutes en mémoire
+        backend = EmbeddedBackend(engine, database=os.path.join(tmp, f'mes4_x{factor}.{engine}'))
+        volume = {}
+        for name, frame in scaled_tables(tables, factor):
+            backend.load_table(name, frame)
+            volume[name] = len(frame)
+            del frame
+        csv_path = os.path.join(tmp, f'robotino_x{factor}.csv')
+        volume['robotino_data.csv'] = write_scaled_robot_csv(robot, factor, csv_path)
+        setup_s = time.perf_counter() - began
+        print(f"📦 x{factor}: {sum(volume.values())} lignes préparées en {setup_s:.1f}s")
+
+        mes = MESIndicators({}, csv_path, backend=backend, query_cache_mb=query_cache_mb)
+        results = []
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                mes.ensure_indexes()
+            for mode in modes:
+                snapshot = mode == 'snapshot'
+                base = {'factor': factor, 'engine': engine, 'mode': mode}
+
+                def run_all():
+                    mes.run_all_indicators(snapshot=snapshot)
+                run = measure(run_all, repeat)
+                run.update(base, name='run_all_indicators', queries=mes.query_count)
+                results.append(run)
+
+                # Indicateurs seuls: connexion, CSV et snapshot déjà chargés (hors chronométrage)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    mes._prepare_run(snapshot)
+                for _, methods in MESIndicators.INDICATOR_TABS:
+                    for method in methods:
+                        before = mes.query_count
+                        row = measure(getattr(mes, method), repeat)
+                        # repeat exécutions chronométrées + 1 tracée
+                        row['queries'] = (mes.query_count - before) // (max(repeat, 1) + 1)
+                        row.update(base, name=method)
+                        results.append(row)
+                print(f"   ⏱️  {mode}: run_all_indicators {run['latency_s']:.3f}s, "
+                      f"{run['queries']} requêtes, pic {run['peak_mb']:.1f} Mo")
+        finally:
+            backend.close()
+        rss = _rss_peak_mb()
+        for row in results:
+            row['volume'] = volume
+            row['setup_s'] = round(setup_s, 3)
+            row['rss_peak_mb'] = rss
+        return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(factors: Iterable[int] = DEFAULT_FACTORS, engine: Optional[str] = None,
+                  repeat: int = DEFAULT_REPEAT, dump_path: str = DUMP_PATH,
+                  csv_robot_path: str = CSV_ROBOT_PATH, modes: Iterable[str] = MODES,
+                  work_dir: Optional[str] = None, query_cache_mb: Optional[float] = None) -> Dict:
+    """
+    Exécute le banc complet
+
+    Returns: {'meta': {...}, 'results': [...]} (format JSON de --output)
+    """
+    engine = engine or ('duckdb' if DUCKDB_AVAILABLE else 'sqlite')
+    factors = list(factors)
+    modes = list(modes)
+    tables = MySQLDump(dump_path).read(SCALED_TABLES + REFERENCE_TABLES)
+    robot, _ = load_robot_csv(csv_robot_path, columns=robot_columns(), report=False)
+    meta = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'engine': engine,
+        'factors': factors,
+        'modes': modes,
+        'repeat': repeat,
+        'query_cache_mb': query_cache_mb,
+        'dump': os.path.basename(dump_path),
+        'robot_csv': os.path.basename(csv_robot_path),
+    }
+    results = []
+    for factor in factors:
+        results.extend(benchmark_factor(tables, robot, factor, engine, repeat, work_dir, modes, query_cache_mb))
+    return {'meta': meta, 'results': results}
+
+
+# ========== COMPARAISON ==========
+
+def compare(old: Dict, new: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """
+    Compare deux résultats de run_benchmark mesure par mesure
+
+    Une régression = latence médiane qui augmente de plus de threshold (relatif),
+    ou nombre de requêtes qui augmente
+
+    Returns: une ligne par mesure commune (factor, engine, mode, name, ratios, regression)
+    """
+    def key(row):
+        return row['factor'], row['engine'], row['mode'], row['name']
+
+    previous = {key(row): row for row in old['results']}
+    rows = []
+    for row in new['results']:
+        before = previous.get(key(row))
+        if before is None:
+            continue
+        ratio = row['latency_s'] / before['latency_s'] if before['latency_s'] > 0 else float('inf')
+        rows.append({
+            'factor': row['factor'], 'engine': row['engine'], 'mode': row['mode'], 'name': row['name'],
+            'latency_before_s': before['latency_s'], 'latency_after_s': row['latency_s'],
+            'latency_ratio': round(ratio, 3),
+            'peak_before_mb': before['peak_mb'], 'peak_after_mb': row['peak_mb'],
+            'queries_before': before['queries'], 'queries_after': row['queries'],
+            'regression': ratio > 1 + threshold or row['queries'] > before['queries'],
+        })
+    return rows
+
+
+def _print_table(rows: List[Dict], columns: List[str]):
+    if rows:
+        print(pd.DataFrame(rows)[columns].to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc de mesure des indicateurs MES sur données mises à l'échelle")
+    parser.add_argument('--factors', type=int, nargs='+', default=DEFAULT_FACTORS)
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default=None)
+    parser.add_argument('--modes', choices=MODES, nargs='+', default=MODES)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--dump', default=DUMP_PATH)
+    parser.add_argument('--robot', default=CSV_ROBOT_PATH)
+    parser.add_argument('--work-dir', default=None, help="Dossier des CSV robot temporaires")
+    parser.add_argument('--query-cache', type=float, default=None, metavar='MO',
+                        help="Active le cache des requêtes (plafond en Mo): mesures à chaud")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('AVANT', 'APRES'))
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding='utf-8') as f_old, open(args.compare[1], encoding='utf-8') as f_new:
+            rows = compare(json.load(f_old), json.load(f_new), args.threshold)
+        _print_table(rows, ['factor', 'mode', 'name', 'latency_before_s', 'latency_after_s',
+                            'latency_ratio', 'queries_before', 'queries_after', 'regression'])
+        regressions = [row for row in rows if row['regression']]
+        print(f"\n{'❌' if regressions else '✅'} {len(regressions)} régression(s) sur {len(rows)} mesures")
+        sys.exit(1 if regressions else 0)
+
+    report = run_benchmark(args.factors, args.engine, args.repeat, args.dump, args.robot,
+                           args.modes, args.work_dir, args.query_cache)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    _print_table([row for row in report['results'] if row['name'] == 'run_all_indicators'],
+                 ['factor', 'mode', 'latency_s', 'peak_mb', 'queries', 'rss_peak_mb'])
+    print(f"\n✅ Résultats écrits dans {args.output}")
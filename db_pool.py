@@ -0,0 +1,172 @@
+"""
+Pool de connexions MariaDB partagé par le script de test et les sessions du dashboard
+Vérifie la santé des connexions et se reconnecte après un redémarrage du conteneur
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import pandas as pd
+from mysql.connector import errors, pooling
+
+
+DEFAULT_POOL_SIZE = 5
+
+
+class DatabaseUnavailableError(RuntimeError):
+    """MariaDB reste injoignable après toutes les tentatives de reconnexion"""
+
+
+class MESConnectionPool:
+    """Pool de connexions MariaDB avec health check et reconnexion transparente"""
+
+    # Erreurs qui signalent une connexion perdue (et non une requête invalide)
+    CONNECTION_ERRORS = (errors.InterfaceError, errors.OperationalError, errors.PoolError)
+
+    def __init__(self, db_config: Dict[str, str], pool_size: int = DEFAULT_POOL_SIZE,
+                 retries: int = 3, retry_delay: float = 1.0):
+        """
+        Args:
+            db_config: Configuration de connexion MariaDB
+            pool_size: Nombre maximum de connexions simultanées
+            retries: Tentatives de reconnexion avant d'abandonner
+            retry_delay: Délai (s) entre deux tentatives
+        """
+        self.db_config = dict(db_config)
+        self.pool_size = pool_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._pool = None
+        self._lock = threading.Lock()
+        # mysql.connector lève PoolError si le pool est épuisé: on fait attendre les appelants
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _get_pool(self) -> pooling.MySQLConnectionPool:
+        """Crée le pool à la première utilisation (ouvre pool_size connexions)"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = pooling.MySQLConnectionPool(
+                    pool_name=f"mes4_{id(self)}",
+                    pool_size=self.pool_size,
+                    pool_reset_session=True,
+                    **self.db_config
+                )
+            return self._pool
+
+    def _reset(self):
+        """Oublie le pool courant (connexions mortes après un redémarrage du serveur)"""
+        with self._lock:
+            self._pool = None
+
+    @contextmanager
+    def connection(self):
+        """
+        Emprunte une connexion saine au pool et la rend à la sortie du bloc
+
+        Raises:
+            DatabaseUnavailableError: si aucune connexion n'a pu être établie
+        """
+        with self._slots:
+            conn = None
+            last_error = None
+            for attempt in range(1, self.retries + 1):
+                try:
+                    conn = self._get_pool().get_connection()
+                    # Health check: relance la connexion si le serveur a redémarré
+                    conn.ping(reconnect=True, attempts=1, delay=0)
+                    break
+                except self.CONNECTION_ERRORS as e:
+                    last_error = e
+                    if conn is not None:
+                        try:
+                            conn.close()
+                        except Exception:
+                            pass
+                        conn = None
+                    self._reset()
+                    if attempt < self.retries:
+                        time.sleep(self.retry_delay)
+            if conn is None:
+                raise DatabaseUnavailableError(
+                    f"MariaDB injoignable après {self.retries} tentatives: {last_error}")
+            try:
+                yield conn
+            finally:
+                try:
+                    conn.close()  # Rend la connexion au pool
+                except self.CONNECTION_ERRORS:
+                    self._reset()
+
+    def query(self, query: str, params: Optional[List] = None) -> pd.DataFrame:
+        """
+        Exécute une requête sur une connexion du pool
+        La requête est rejouée une fois si la connexion tombe pendant l'exécution
+
+        Args:
+            query: Requête SQL (placeholders %s)
+            params: Valeurs des placeholders
+        """
+        for attempt in (1, 2):
+            with self.connection() as conn:
+                try:
+                    return pd.read_sql(query, conn, params=params)
+                except Exception as e:
+                    cause = getattr(e, '__cause__', None) or e
+                    if attempt == 2 or not isinstance(cause, self.CONNECTION_ERRORS):
+                        raise
+                    self._reset()
+
+    def execute(self, statement: str, params: Optional[List] = None):
+        """Exécute une instruction sans résultat (DDL, maintenance) et la valide"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(statement, params or ())
+                conn.commit()
+            finally:
+                cursor.close()
+
+    def ping(self) -> bool:
+        """Vérifie que MariaDB répond (lève DatabaseUnavailableError sinon)"""
+        with self.connection():
+            return True
+
+    def close(self):
+        """Ferme les connexions inactives du pool"""
+        with self._lock:
+            if self._pool is not None:
+                try:
+                    self._pool._remove_connections()
+                except Exception:
+                    pass
+                self._pool = None
+
+
+# Pools partagés par configuration (un seul pool par serveur pour tout le processus)
+_POOLS: Dict[tuple, MESConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(db_config: Dict[str, str], pool_size: Optional[int] = None) -> MESConnectionPool:
+    """
+    Retourne le pool partagé associé à cette configuration (créé au premier appel)
+
+    Args:
+        db_config: Configuration de connexion MariaDB
+        pool_size: Taille du pool (DEFAULT_POOL_SIZE si None, ignoré si le pool existe déjà)
+    """
+    key = tuple(sorted((k, str(v)) for k, v in db_config.items()))
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = MESConnectionPool(db_config, pool_size or DEFAULT_POOL_SIZE)
+        return _POOLS[key]
+
+
+def close_all_pools():
+    """Ferme tous les pools partagés (fin du processus)"""
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+        _POOLS.clear()
@@ -0,0 +1,153 @@
+"""
+Consommation d'énergie électrique et d'air comprimé (indicateur 15) à partir de tblfinstep
+MES4 enregistre pour chaque étape l'énergie en mWs et l'air en mNl, mesurés (Real) ou
+calculés (Calc). Les étapes sont agrégées par jour et par ressource dans une petite table
+de cumuls persistée (rollups.DailyRollup), mise à jour incrémentalement
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+
+from rollups import DailyRollup
+
+
+ENERGY_COLUMNS = ['ElectricEnergyCalc', 'ElectricEnergyReal', 'CompressedAirCalc', 'CompressedAirReal']
+# Conversions: 1 kWh = 3.6e9 mWs, 1 Nl = 1000 mNl
+MWS_PER_KWH = 3.6e9
+MNL_PER_NL = 1000.0
+
+ROLLUP_COLUMNS = ['day', 'ResourceID', 'energy_kwh', 'air_nl', 'steps', 'measured_steps']
+ROLLUP_FILE = 'energy_daily.parquet'
+
+# Cumuls calculés par MariaDB (même valeur que step_consumption: mesure si présente, sinon calcul)
+ROLLUP_SQL = """
+    SELECT
+        DATE(End) as day,
+        ResourceID,
+        SUM(CASE WHEN ElectricEnergyReal > 0 THEN ElectricEnergyReal ELSE ElectricEnergyCalc END) as energy_mws,
+        SUM(CASE WHEN CompressedAirReal > 0 THEN CompressedAirReal ELSE CompressedAirCalc END) as air_mnl,
+        COUNT(*) as steps,
+        SUM(CASE WHEN ElectricEnergyReal > 0 OR CompressedAirReal > 0 THEN 1 ELSE 0 END) as measured_steps
+    FROM tblfinstep
+    WHERE End IS NOT NULL AND {condition}
+    GROUP BY DATE(End), ResourceID
+"""
+
+
+def _empty_rollup() -> pd.DataFrame:
+    return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+
+def step_consumption(steps: pd.DataFrame) -> pd.DataFrame:
+    """
+    Consommation de chaque étape terminée, convertie en kWh et Nl
+
+    La valeur mesurée (Real) est retenue quand elle est renseignée, sinon la valeur calculée
+
+    Args:
+        steps: Étapes (ONo, ResourceID, End et colonnes ENERGY_COLUMNS, absentes = 0)
+    Returns: DataFrame (ONo, ResourceID, End, day, energy_kwh, air_nl, measured)
+    """
+    steps = steps[steps['End'].notna()] if 'End' in steps.columns else steps.iloc[0:0]
+    values = {c: steps[c].fillna(0).astype('float64') if c in steps.columns
+              else pd.Series(0.0, index=steps.index) for c in ENERGY_COLUMNS}
+    energy_real, air_real = values['ElectricEnergyReal'], values['CompressedAirReal']
+    energy = energy_real.where(energy_real > 0, values['ElectricEnergyCalc'])
+    air = air_real.where(air_real > 0, values['CompressedAirCalc'])
+    end = pd.to_datetime(steps['End']) if 'End' in steps.columns else pd.Series(dtype='datetime64[ns]')
+    return pd.DataFrame({
+        'ONo': steps['ONo'] if 'ONo' in steps.columns else pd.Series(dtype='int64'),
+        'ResourceID': steps['ResourceID'] if 'ResourceID' in steps.columns else pd.Series(dtype='int64'),
+        'End': end,
+        'day': end.dt.date,
+        'energy_kwh': energy / MWS_PER_KWH,
+        'air_nl': air / MNL_PER_NL,
+        'measured': (energy_real > 0) | (air_real > 0),
+    })
+
+
+def daily_rollup(consumption: pd.DataFrame) -> pd.DataFrame:
+    """Cumuls (jour, ressource) des consommations par étape (format de la table persistée)"""
+    if consumption.empty:
+        return _empty_rollup()
+    grouped = consumption.groupby(['day', 'ResourceID'])
+    result = grouped[['energy_kwh', 'air_nl']].sum()
+    result['steps'] = grouped.size()
+    result['measured_steps'] = grouped['measured'].sum()
+    return result.reset_index()[ROLLUP_COLUMNS]
+
+
+def rollup_from_sql(result: pd.DataFrame) -> pd.DataFrame:
+    """Convertit le résultat de ROLLUP_SQL (mWs, mNl) au format de daily_rollup"""
+    if result.empty or 'energy_mws' not in result.columns:
+        return _empty_rollup()
+    return pd.DataFrame({
+        'day': pd.to_datetime(result['day']).dt.date,
+        'ResourceID': result['ResourceID'],
+        'energy_kwh': result['energy_mws'].astype('float64') / MWS_PER_KWH,
+        'air_nl': result['air_mnl'].astype('float64') / MNL_PER_NL,
+        'steps': result['steps'].astype('int64'),
+        'measured_steps': result['measured_steps'].astype('int64'),
+    })
+
+
+def order_consumption(consumption: pd.DataFrame) -> pd.DataFrame:
+    """
+    Consommation par OF
+
+    Returns: DataFrame (ONo, end, energy_kwh, air_nl, steps) trié par fin d'OF
+    """
+    if consumption.empty:
+        return pd.DataFrame(columns=['ONo', 'end', 'energy_kwh', 'air_nl', 'steps'])
+    grouped = consumption.groupby('ONo')
+    result = grouped[['energy_kwh', 'air_nl']].sum()
+    result.insert(0, 'end', grouped['End'].max())
+    result['steps'] = grouped.size()
+    return result.reset_index().sort_values('end').reset_index(drop=True)
+
+
+def summarize(daily: pd.DataFrame, by: str = 'day') -> pd.DataFrame:
+    """
+    Regroupe les cumuls (jour, ressource) par jour ou par ressource
+
+    Args:
+        daily: Cumuls au format ROLLUP_COLUMNS
+        by: 'day' ou 'resource'
+    Returns: DataFrame (day ou ResourceID, energy_kwh, air_nl, steps, measured_steps)
+    """
+    column = {'day': 'day', 'resource': 'ResourceID'}[by]
+    if daily.empty:
+        return pd.DataFrame(columns=[column, 'energy_kwh', 'air_nl', 'steps', 'measured_steps'])
+    result = daily.groupby(column)[['energy_kwh', 'air_nl', 'steps', 'measured_steps']].sum()
+    return result.reset_index()
+
+
+class EnergyRollup(DailyRollup):
+    """Cumuls (jour, ressource) d'énergie et d'air, persistés dans energy_daily.parquet"""
+
+    FILE = ROLLUP_FILE
+    COLUMNS = ROLLUP_COLUMNS
+    SORT = ['day', 'ResourceID']
+
+    def _fetch(self, since: Optional[datetime]) -> Optional[pd.DataFrame]:
+        condition, params = ("1 = 1", None) if since is None else ("End >= %s", [since])
+        result = self.query_func(ROLLUP_SQL.format(condition=condition), params)
+        # Un DataFrame sans colonnes signale une requête en erreur
+        if len(result.columns) == 0:
+            return None
+        return rollup_from_sql(result)
+
+
+def previous_day(daily: pd.DataFrame, today: Optional[date] = None) -> Optional[date]:
+    """Jour J-1 (veille de today), ou dernier jour avec consommation s'il n'y en a pas la veille"""
+    if daily.empty:
+        return None
+    today = today or date.today()
+    target = today - timedelta(days=1)
+    days = set(daily['day'])
+    if target in days:
+        return target
+    earlier = [d for d in days if d < today]
+    return max(earlier) if earlier else None
@@ -0,0 +1,697 @@
+"""
+Audit EXPLAIN des requêtes des indicateurs et conseil d'index
+Les requêtes réellement émises par les 15 indicateurs et par le snapshot (modes direct et
+snapshot, historique complet et fenêtre du tableau de bord) sont capturées sur une copie
+locale du dump, puis expliquées sans être exécutées sur la base de production:
+- par défaut sur une copie SQLite mise à l'échelle, recréée avec les clés du schéma MES4
+- avec --mariadb, par EXPLAIN sur la base MES4 (index réellement présents)
+Les parcours complets de grandes tables et les tris (filesort, table temporaire) sont signalés
+avec le volume lu par heure au rythme du KPIWorker. Des index (couvrants) ou des colonnes
+générées sont proposés, puis chronométrés sur la copie mise à l'échelle (avant / après):
+seuls ceux qui apportent un gain mesuré sont retenus dans le script SQL (--sql), jamais
+appliqués automatiquement
+
+Usage:
+    python index_advisor.py --factor 100 --sql index_conseilles.sql --output audit_index.json
+    python index_advisor.py --mariadb        # plans de la base MES4 (DB_CONFIG de test_indicators)
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from benchmark_indicators import CSV_ROBOT_PATH, DUMP_PATH, REFERENCE_TABLES, SCALED_TABLES, scaled_tables
+from mes_backends import EmbeddedBackend
+from mes_dump import MySQLDump
+from query_cache import normalize_sql
+from test_indicators import MESIndicators
+
+
+DEFAULT_FACTOR = 10
+DEFAULT_REPEAT = 5
+# Délai (s) entre deux calculs du KPIWorker: chaque requête du tableau de bord revient à ce rythme
+DEFAULT_INTERVAL = 30.0
+# En dessous, un parcours complet coûte moins qu'un accès par index (non signalé)
+MIN_SCAN_ROWS = 1000
+# Gain minimal (durée avant / après) pour retenir un index proposé
+MIN_SPEEDUP = 1.5
+# Au-delà, un index couvrant coûte plus en écriture (MES4 insère en continu) qu'il ne fait gagner
+MAX_INDEX_COLUMNS = 4
+# Fenêtre du tableau de bord capturée en plus de l'historique complet (jours)
+DASHBOARD_DAYS = 7
+
+PLAN_COLUMNS = ['table', 'access', 'index', 'rows', 'filesort', 'temporary', 'detail']
+# Types d'accès MariaDB (colonne type d'EXPLAIN) -> accès commun aux deux moteurs
+MARIADB_ACCESS = {
+    'ALL': 'full_scan', 'index': 'index_scan', 'range': 'range', 'index_merge': 'range',
+    'ref': 'ref', 'eq_ref': 'ref', 'ref_or_null': 'ref', 'fulltext': 'ref',
+    'const': 'const', 'system': 'const',
+}
+SCAN_ACCESS = ('full_scan', 'index_scan')
+
+# Fonctions d'une colonne remplaçables par une colonne générée indexée (type de la colonne)
+GENERATED_FUNCTIONS = {'DATE': 'DATE'}
+
+INDEX_STATISTICS = """
+    SELECT LOWER(TABLE_NAME) as table_name, INDEX_NAME as index_name, COLUMN_NAME as column_name
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+"""
+
+_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.)*'")
+_CLAUSE_RE = re.compile(r"\b(SELECT|FROM|WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT)\b", re.I)
+_TABLE_REF_RE = re.compile(
+    r"(?:\bFROM|\bJOIN|,)\s+`?(\w+)`?(?:\s+(?:AS\s+)?(?!(?:ON|JOIN|INNER|LEFT|RIGHT|CROSS|WHERE|USING)\b)(\w+))?",
+    re.I)
+_COLUMN_RE = re.compile(r"`?\b(?:(\w+)`?\.`?)?(\w+)\b`?")
+_EQUALITY_RE = re.compile(r"\s*(?:=|<=>|IN\s*\()", re.I)
+_RANGE_RE = re.compile(r"\s*(?:<=|>=|<(?!>)|>|BETWEEN\b|LIKE\s+'[^%_])", re.I)
+_FUNCTION_RE = re.compile(r"(\w+)\s*\(\s*$")
+# Mots-clés qui précèdent une parenthèse sans être une fonction: AND (End >= ? OR ...)
+_KEYWORDS = {'AND', 'OR', 'NOT', 'ON', 'IN', 'WHERE', 'WHEN', 'THEN', 'ELSE', 'EXISTS', 'BY', 'HAVING', 'SELECT'}
+_SQLITE_PLAN_RE = re.compile(
+    r"^(SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS (\w+))?"
+    r"(?: USING (AUTOMATIC )?(?:(?:COVERING )?INDEX ?(\w+)?|INTEGER PRIMARY KEY|PRIMARY KEY))?(?: \((.*)\))?")
+_SQLITE_SORT_RE = re.compile(r"^USE TEMP B-TREE FOR (.+)$")
+
+
+# ========== ANALYSE DES REQUÊTES ==========
+
+@dataclass
+class QueryScope:
+    """Un SELECT (requête principale ou sous-requête): tables et colonnes utilisées par rôle"""
+    tables: Dict[str, str]                     # alias ou nom -> table
+    equality: Dict[str, List[str]]             # table -> colonnes comparées par = / IN
+    range: Dict[str, List[str]]                # table -> colonnes comparées par < > BETWEEN
+    functions: Dict[str, List[Tuple[str, str]]]  # table -> (fonction, colonne) en WHERE / GROUP BY
+    group: Dict[str, List[str]]
+    referenced: Dict[str, List[str]]           # table -> toutes les colonnes lues
+    has_or: bool = False
+
+    def filters(self, table: str) -> bool:
+        """La table a-t-elle un prédicat indexable (égalité, intervalle ou fonction d'une colonne) ?"""
+        return bool(self.equality.get(table) or self.range.get(table) or self.functions.get(table))
+
+
+def _strip_subqueries(text: str, scopes: List[str]) -> str:
+    """Remplace chaque sous-requête (SELECT entre parenthèses) par (?) et l'ajoute à scopes"""
+    result, i = [], 0
+    while i < len(text):
+        if text[i] != '(':
+            result.append(text[i])
+            i += 1
+            continue
+        depth, j = 1, i + 1
+        while j < len(text) and depth:
+            depth += {'(': 1, ')': -1}.get(text[j], 0)
+            j += 1
+        inner = text[i + 1:j - 1]
+        if re.match(r"\s*(?:SELECT|WITH)\b", inner, re.I):
+            scopes.append(_strip_subqueries(inner, scopes))
+            result.append('(?)')
+        else:
+            result.append('(' + _strip_subqueries(inner, scopes) + ')')
+        i = j
+    return ''.join(result)
+
+
+def _add(mapping: Dict[str, List], table: str, value):
+    if value not in mapping[table]:
+        mapping[table].append(value)
+
+
+def analyze_sql(query: str, schemas: Dict[str, List[str]]) -> List[QueryScope]:
+    """
+    Colonnes de chaque table par rôle (égalité, intervalle, fonction, regroupement), par SELECT
+
+    Analyse lexicale suffisante pour les requêtes des indicateurs (pas un parseur SQL complet):
+    les colonnes sont reconnues d'après le schéma des tables du FROM
+
+    Args:
+        query: Requête (dialecte MariaDB)
+        schemas: table (minuscules) -> noms de colonnes
+    Returns: une portée par SELECT, requête principale en premier
+    """
+    text = _LITERAL_RE.sub("''", normalize_sql(query))
+    subqueries: List[str] = []
+    main = _strip_subqueries(text, subqueries)
+    return [_analyze_scope(scope, schemas) for scope in [main] + subqueries]
+
+
+def _analyze_scope(text: str, schemas: Dict[str, List[str]]) -> QueryScope:
+    clauses: Dict[str, str] = {}
+    marks = list(_CLAUSE_RE.finditer(text))
+    for k, mark in enumerate(marks):
+        name = re.sub(r"\s+", ' ', mark.group(1).upper())
+        stop = marks[k + 1].start() if k + 1 < len(marks) else len(text)
+        clauses[name] = clauses.get(name, '') + ' ' + text[mark.end():stop]
+
+    source = clauses.get('FROM', '')
+    tables: Dict[str, str] = {}
+    for name, alias in _TABLE_REF_RE.findall('FROM ' + source):
+        table = name.lower()
+        if table in schemas:
+            tables[table] = table
+            if alias:
+                tables[alias.lower()] = table
+    scope = QueryScope(tables, defaultdict(list), defaultdict(list), defaultdict(list),
+                       defaultdict(list), defaultdict(list))
+    if not tables:
+        return scope
+    columns = {table: {c.lower(): c for c in schemas[table]} for table in set(tables.values())}
+
+    def resolve(qualifier: Optional[str], column: str) -> Optional[Tuple[str, str]]:
+        if qualifier:
+            table = tables.get(qualifier.lower())
+            found = columns.get(table, {}).get(column.lower()) if table else None
+            return (table, found) if found else None
+        matches = [(t, cols[column.lower()]) for t, cols in columns.items() if column.lower() in cols]
+        return matches[0] if len(matches) == 1 else None
+
+    def walk(clause: str, role: str):
+        case_depth = 0
+        for match in _COLUMN_RE.finditer(clause):
+            word = match.group(2).lower()
+            if not match.group(1) and word == 'case':
+                case_depth += 1
+                continue
+            if not match.group(1) and word == 'end' and case_depth > 0 and not _RANGE_RE.match(
+                    clause, match.end()) and not _EQUALITY_RE.match(clause, match.end()):
+                case_depth -= 1
+                continue
+            found = resolve(match.group(1), match.group(2))
+            if found is None:
+                continue
+            table, column = found
+            _add(scope.referenced, table, column)
+            function = _FUNCTION_RE.search(clause, 0, match.start())
+            wrapped = function.group(1).upper() if function else None
+            if wrapped in _KEYWORDS:
+                wrapped = None
+            if role in ('WHERE', 'GROUP BY') and wrapped in GENERATED_FUNCTIONS:
+                _add(scope.functions, table, (wrapped, column))
+                continue
+            if role == 'GROUP BY':
+                _add(scope.group, table, column)
+            elif role == 'WHERE' and not wrapped:
+                following = clause[match.end():]
+                if _EQUALITY_RE.match(following):
+                    _add(scope.equality, table, column)
+                elif _RANGE_RE.match(following):
+                    _add(scope.range, table, column)
+
+    # Conditions de jointure: prédicats d'égalité sur la table jointe
+    joins = ' '.join(part.split(' JOIN ')[0] for part in re.split(r"\bON\b", source, flags=re.I)[1:])
+    where = clauses.get('WHERE', '') + ' ' + joins
+    scope.has_or = bool(re.search(r"\bOR\b", clauses.get('WHERE', ''), re.I))
+    walk(where, 'WHERE')
+    for role in ('SELECT', 'GROUP BY', 'HAVING', 'ORDER BY'):
+        walk(clauses.get(role, ''), role)
+    return scope
+
+
+# ========== PLANS D'EXÉCUTION ==========
+
+def _aliases(scopes: Iterable[QueryScope]) -> Dict[str, str]:
+    aliases: Dict[str, str] = {}
+    for scope in scopes:
+        aliases.update(scope.tables)
+    return aliases
+
+
+def parse_sqlite_plan(details: Iterable[str], aliases: Dict[str, str]) -> pd.DataFrame:
+    """
+    Lignes d'EXPLAIN QUERY PLAN (SQLite) au format PLAN_COLUMNS
+    Un index automatique (construit à chaque exécution) compte comme un parcours complet
+    """
+    rows = []
+    for detail in details:
+        sort = _SQLITE_SORT_RE.match(detail)
+        if sort:
+            grouping = sort.group(1)
+            rows.append({'table': None, 'access': 'sort', 'index': None, 'rows': None,
+                         'filesort': 'ORDER BY' in grouping or 'GROUP BY' in grouping,
+                         'temporary': True, 'detail': detail})
+            continue
+        step = _SQLITE_PLAN_RE.match(detail)
+        if not step or detail.startswith('SCAN CONSTANT ROW'):
+            continue
+        kind, name, alias, automatic, index, condition = step.groups()
+        table = aliases.get((alias or name).lower(), name.lower())
+        if automatic:
+            access, index = 'full_scan', '(automatique)'
+        elif kind == 'SCAN':
+            access = 'index_scan' if 'INDEX' in detail else 'full_scan'
+        else:
+            access = 'range' if condition and re.search(r"[<>]", condition) else 'ref'
+        rows.append({'table': table, 'access': access, 'index': index, 'rows': None,
+                     'filesort': False, 'temporary': False, 'detail': detail})
+    return pd.DataFrame(rows, columns=PLAN_COLUMNS)
+
+
+def parse_mariadb_plan(explain: pd.DataFrame, aliases: Dict[str, str]) -> pd.DataFrame:
+    """Résultat d'EXPLAIN (MariaDB: id, select_type, table, type, key, rows, Extra...) au format PLAN_COLUMNS"""
+    rows = []
+    for row in explain.to_dict('records'):
+        extra = str(row.get('Extra') or '')
+        name = str(row.get('table') or '')
+        estimate = pd.to_numeric(row.get('rows'), errors='coerce')
+        rows.append({
+            'table': aliases.get(name.lower(), name.lower()) or None,
+            'access': MARIADB_ACCESS.get(row.get('type'), 'other'),
+            'index': row.get('key'),
+            'rows': None if pd.isna(estimate) else int(estimate),
+            'filesort': 'Using filesort' in extra,
+            'temporary': 'Using temporary' in extra,
+            'detail': f"{row.get('select_type')} {name} {row.get('type')} {extra}".strip(),
+        })
+    return pd.DataFrame(rows, columns=PLAN_COLUMNS)
+
+
+def sqlite_explainer(backend: EmbeddedBackend) -> Callable[[str, Optional[List], Dict[str, str]], pd.DataFrame]:
+    """Plans de la copie SQLite, avec le volume de la table pour les parcours complets"""
+    counts: Dict[str, int] = {}
+
+    def explain(query: str, params: Optional[List], aliases: Dict[str, str]) -> pd.DataFrame:
+        plan = parse_sqlite_plan(backend.query("EXPLAIN QUERY PLAN " + query, params)['detail'], aliases)
+        for i, row in plan.iterrows():
+            if row['access'] in SCAN_ACCESS and row['table']:
+                if row['table'] not in counts:
+                    counts[row['table']] = int(backend.query(f"SELECT COUNT(*) as n FROM {row['table']}")['n'].iloc[0])
+                plan.at[i, 'rows'] = counts[row['table']]
+        return plan
+    return explain
+
+
+def mariadb_explainer(query_func: Callable[..., pd.DataFrame]) -> Callable[[str, Optional[List], Dict[str, str]], pd.DataFrame]:
+    """Plans de la base MariaDB (EXPLAIN n'exécute pas la requête; estimation de rows par InnoDB)"""
+    def explain(query: str, params: Optional[List], aliases: Dict[str, str]) -> pd.DataFrame:
+        return parse_mariadb_plan(query_func("EXPLAIN " + query, params), aliases)
+    return explain
+
+
+# ========== CAPTURE ==========
+
+@dataclass
+class AuditedQuery:
+    """Requête capturée, son plan et ce qu'il révèle"""
+    sql: str
+    params: Optional[List]
+    sources: List[str]                         # indicateurs (ou 'snapshot') qui l'émettent
+    runs: int = 0                              # exécutions pendant la capture
+    plan: List[Dict] = field(default_factory=list)
+    findings: List[str] = field(default_factory=list)
+    rows_scanned: int = 0                      # lignes lues par les parcours complets
+    rows_per_hour: float = 0.0                 # au rythme du KPIWorker
+    critical: bool = False
+
+
+def dashboard_periods(tables: Dict[str, pd.DataFrame], days: int = DASHBOARD_DAYS) -> List[Tuple]:
+    """Historique complet (None, None) et fenêtre des days derniers jours de données (OF terminés)"""
+    periods: List[Tuple] = [(None, None)]
+    ends = tables.get('tblfinorder', pd.DataFrame()).get('End')
+    if ends is not None and ends.notna().any():
+        end = pd.Timestamp(ends.max()).normalize() + pd.Timedelta(days=1)
+        periods.append(((end - pd.Timedelta(days=days)).date(), end.date()))
+    return periods
+
+
+def capture_queries(backend: EmbeddedBackend, csv_robot_path: str,
+                    periods: Iterable[Tuple]) -> List[AuditedQuery]:
+    """
+    Exécute les 15 indicateurs (modes direct et snapshot) pour chaque période sur la copie
+    locale et relève les requêtes distinctes (SQL normalisé, paramètres) avec leur origine
+    """
+    mes = MESIndicators({}, csv_robot_path, backend=backend, query_cache_mb=None)
+    mes.query_log = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for start, end in periods:
+            for snapshot in (False, True):
+                mes.compute_all(snapshot=snapshot, start=start, end=end)
+    captured: Dict[Tuple, AuditedQuery] = {}
+    for query, params, indicator in mes.query_log:
+        key = (normalize_sql(query), tuple(str(p) for p in params or ()))
+        entry = captured.setdefault(key, AuditedQuery(key[0], list(params) if params else None, []))
+        entry.runs += 1
+        source = indicator or 'snapshot'
+        if source not in entry.sources:
+            entry.sources.append(source)
+    return list(captured.values())
+
+
+# ========== PROPOSITIONS ==========
+
+@dataclass
+class IndexProposal:
+    """Index ou colonne générée proposé pour une table, et sa validation chronométrée"""
+    table: str
+    name: str
+    columns: List[str]
+    kind: str                                  # 'index', 'covering_index', 'generated_column', 'rewrite'
+    reason: str
+    ddl: Optional[str] = None                  # instruction MariaDB (None pour une réécriture)
+    local_ddl: Optional[str] = None            # équivalent mesurable sur la copie SQLite
+    queries: List[int] = field(default_factory=list)
+    before_ms: Optional[float] = None
+    after_ms: Optional[float] = None
+    speedup: Optional[float] = None
+    accepted: Optional[bool] = None
+
+
+def _index_name(table: str, columns: Iterable[str]) -> str:
+    """Nom dans la convention de PERIOD_INDEXES: idx_<table sans tbl>_<colonnes>"""
+    short = table[3:] if table.startswith('tbl') else table
+    return f"idx_{short}_" + '_'.join(c.lower() for c in columns)
+
+
+def _is_indexed(indexes: List[Tuple[str, List[str]]], equality: List[str], range_column: Optional[str]) -> bool:
+    """Un index existant commence-t-il par les colonnes d'égalité (tout ordre) puis la colonne d'intervalle ?"""
+    wanted = {c.lower() for c in equality}
+    for _, columns in indexes:
+        lowered = [c.lower() for c in columns]
+        if set(lowered[:len(wanted)]) != wanted:
+            continue
+        if range_column is None or lowered[len(wanted):len(wanted) + 1] == [range_column.lower()]:
+            return True
+    return False
+
+
+def propose_for_scope(scope: QueryScope, table: str, sort: bool,
+                      indexes: Dict[str, List[Tuple[str, List[str]]]]) -> List[IndexProposal]:
+    """
+    Propositions pour une table parcourue entièrement (ou triée) dans un SELECT
+
+    - clé = colonnes d'égalité + première colonne d'intervalle; l'index devient couvrant si
+      toutes les colonnes lues tiennent dans MAX_INDEX_COLUMNS (clé primaire exclue: InnoDB
+      la range déjà dans chaque index secondaire)
+    - fonction d'une colonne (DATE(End)) en WHERE ou GROUP BY: colonne générée indexée
+    - index déjà présent mais inutilisé à cause d'un OR: réécriture
+    """
+    existing = indexes.get(table, [])
+    primary = {c.lower() for name, cols in existing if name == 'PRIMARY' for c in cols}
+    equality = scope.equality.get(table, [])
+    ranges = [c for c in scope.range.get(table, []) if c not in equality]
+    proposals = []
+    if equality or ranges:
+        key = equality + ranges[:1]
+        if _is_indexed(existing, equality, ranges[0] if ranges else None):
+            if scope.has_or:
+                proposals.append(IndexProposal(
+                    table, _index_name(table, key), key, 'rewrite',
+                    f"index sur ({', '.join(key)}) présent mais écarté par un OR (ex: End >= ? OR End IS NULL): "
+                    "réécrire en UNION ALL de deux requêtes indexées"))
+        else:
+            covering = key + [c for c in scope.referenced.get(table, [])
+                              if c not in key and c.lower() not in primary]
+            if len(key) < len(covering) <= MAX_INDEX_COLUMNS:
+                proposals.append(IndexProposal(
+                    table, _index_name(table, key[:2]) + '_cov', covering, 'covering_index',
+                    f"filtre sur ({', '.join(key)}); index couvrant: la requête ne lit plus la table"))
+            proposals.append(IndexProposal(table, _index_name(table, key), key, 'index',
+                                           f"filtre sur ({', '.join(key)}) sans index"))
+    for function, column in scope.functions.get(table, []):
+        generated = f"{column}{function.title()}" if function != 'DATE' else f"{column}Day"
+        name = _index_name(table, [generated])
+        if sort or not (equality or ranges):
+            proposals.append(IndexProposal(
+                table, name, [generated], 'generated_column',
+                f"{function}({column}) en WHERE / GROUP BY n'utilise pas d'index: colonne générée "
+                f"{generated} indexée (requête à réécrire sur {generated})",
+                ddl=(f"ALTER TABLE {table} ADD COLUMN `{generated}` {GENERATED_FUNCTIONS[function]} "
+                     f"AS ({function}(`{column}`)) PERSISTENT, ADD INDEX {name} (`{generated}`)"),
+                # Équivalent SQLite: index sur l'expression, utilisé sans réécrire la requête
+                local_ddl=f'CREATE INDEX {name} ON {table} ({function}("{column}"))'))
+    for proposal in proposals:
+        if proposal.kind in ('index', 'covering_index'):
+            columns = ', '.join(f"`{c}`" for c in proposal.columns)
+            proposal.ddl = f"CREATE INDEX {proposal.name} ON {table} ({columns})"
+            proposal.local_ddl = proposal.ddl
+    return proposals
+
+
+def audit(queries: List[AuditedQuery], explain: Callable, schemas: Dict[str, List[str]],
+          indexes: Dict[str, List[Tuple[str, List[str]]]], interval: float = DEFAULT_INTERVAL,
+          min_rows: int = MIN_SCAN_ROWS) -> List[IndexProposal]:
+    """
+    Explique chaque requête, signale parcours complets et tris, et regroupe les propositions
+
+    Returns: propositions distinctes (table, colonnes), avec les requêtes concernées
+    """
+    proposals: Dict[Tuple, IndexProposal] = {}
+    for number, query in enumerate(queries):
+        scopes = analyze_sql(query.sql, schemas)
+        try:
+            plan = explain(query.sql, query.params, _aliases(scopes))
+        except Exception as e:
+            query.findings.append(f"EXPLAIN impossible: {e}")
+            continue
+        query.plan = plan.astype(object).where(plan.notna(), None).to_dict('records')
+        sorted_plan = bool((plan['filesort'] | plan['temporary']).any())
+        flagged = []
+        for row in query.plan:
+            rows = int(row['rows']) if row['rows'] is not None else 0
+            if row['access'] in SCAN_ACCESS and row['table'] and rows >= min_rows:
+                what = 'parcours complet' if row['access'] == 'full_scan' else "parcours complet de l'index"
+                query.findings.append(f"{row['table']}: {what} ({rows:,} lignes)".replace(',', ' '))
+                query.rows_scanned += rows
+                flagged.append(row['table'])
+        if sorted_plan:
+            query.findings.append("tri " + ', '.join(
+                sorted({'filesort' if row['filesort'] else 'table temporaire' for row in query.plan
+                        if row['filesort'] or row['temporary']})))
+        query.rows_per_hour = query.rows_scanned * 3600 / interval
+        query.critical = bool(flagged)
+
+        for table in dict.fromkeys(flagged + ([scope_table for scope in scopes
+                                               for scope_table in scope.functions] if sorted_plan else [])):
+            for scope in scopes:
+                if table not in scope.tables.values():
+                    continue
+                if not scope.filters(table):
+                    query.findings.append(
+                        f"{table}: lecture sans filtre, aucun index ne l'évite (limiter à la période "
+                        "ou synchroniser incrémentalement: cache_dir / mes_sync)")
+                    continue
+                for proposal in propose_for_scope(scope, table, sorted_plan, indexes):
+                    key = (proposal.table, proposal.kind, tuple(c.lower() for c in proposal.columns))
+                    known = proposals.setdefault(key, proposal)
+                    if number not in known.queries:
+                        known.queries.append(number)
+        query.findings = list(dict.fromkeys(query.findings))
+    return list(proposals.values())
+
+
+# ========== VALIDATION CHRONOMÉTRÉE ==========
+
+def _median_ms(backend: EmbeddedBackend, query: AuditedQuery, repeat: int) -> float:
+    backend.query(query.sql, query.params)    # première exécution: cache de pages
+    timings = []
+    for _ in range(max(repeat, 1)):
+        began = time.perf_counter()
+        backend.query(query.sql, query.params)
+        timings.append(time.perf_counter() - began)
+    return statistics.median(timings) * 1000
+
+
+def validate(backend: EmbeddedBackend, proposals: List[IndexProposal], queries: List[AuditedQuery],
+             repeat: int = DEFAULT_REPEAT, min_speedup: float = MIN_SPEEDUP):
+    """
+    Chronomètre les requêtes concernées avant / après chaque proposition, isolément sur la copie
+    mise à l'échelle (index supprimé après la mesure). Retenue si le gain atteint min_speedup
+    """
+    for proposal in proposals:
+        if proposal.local_ddl is None:
+            continue
+        affected = [queries[i] for i in proposal.queries]
+        try:
+            before = sum(_median_ms(backend, q, repeat) for q in affected)
+            backend.execute(proposal.local_ddl)
+            try:
+                after = sum(_median_ms(backend, q, repeat) for q in affected)
+            finally:
+                backend.execute(f"DROP INDEX IF EXISTS {proposal.name}")
+        except Exception as e:
+            print(f"   ❌ {proposal.name}: {e}")
+            continue
+        proposal.before_ms, proposal.after_ms = round(before, 3), round(after, 3)
+        proposal.speedup = round(before / after, 2) if after > 0 else None
+        proposal.accepted = proposal.speedup is not None and proposal.speedup >= min_speedup
+
+
+# ========== COPIE LOCALE ET RAPPORT ==========
+
+def dump_indexes(dump: MySQLDump) -> Dict[str, List[Tuple[str, List[str]]]]:
+    """Clés du schéma MES4 déclarées dans le dump: table -> [(nom, colonnes)]"""
+    return {table.lower(): [(name, columns) for name, columns, _ in keys] for table, keys in dump.indexes.items()}
+
+
+def mariadb_indexes(query_func: Callable[..., pd.DataFrame]) -> Dict[str, List[Tuple[str, List[str]]]]:
+    """Index présents sur la base MariaDB (information_schema.STATISTICS)"""
+    statistics_frame = query_func(INDEX_STATISTICS)
+    indexes: Dict[str, List[Tuple[str, List[str]]]] = defaultdict(list)
+    if statistics_frame.empty:
+        return indexes
+    for (table, name), group in statistics_frame.groupby(['table_name', 'index_name'], sort=False):
+        indexes[table].append((name, list(group['column_name'])))
+    return indexes
+
+
+def apply_indexes(backend: EmbeddedBackend, indexes: Dict[str, List[Tuple[str, List[str]]]]) -> int:
+    """
+    Recrée les index sur la copie SQLite (non uniques: les copies mises à l'échelle peuvent
+    répéter des clés de tables de référence). Returns: nombre d'index créés
+    """
+    created = 0
+    for table, keys in indexes.items():
+        for name, columns in keys:
+            cols = ', '.join(f'"{c}"' for c in columns)
+            try:
+                backend.execute(f'CREATE INDEX IF NOT EXISTS "{table}_{name}" ON {table} ({cols})')
+                created += 1
+            except Exception:
+                continue
+    return created
+
+
+def print_report(queries: List[AuditedQuery], proposals: List[IndexProposal], interval: float):
+    flagged = [(n, q) for n, q in enumerate(queries) if q.findings]
+    print(f"\n🔎 {len(queries)} requêtes expliquées, {sum(q.critical for q in queries)} avec parcours complet")
+    for number, query in sorted(flagged, key=lambda item: -item[1].rows_per_hour):
+        print(f"\n{'🔴' if query.critical else '🟠'} #{number} {', '.join(query.sources)}")
+        print(f"    {query.sql[:160]}{'...' if len(query.sql) > 160 else ''}")
+        for finding in query.findings:
+            print(f"    - {finding}")
+        if query.rows_per_hour:
+            print(f"    - ~{query.rows_per_hour / 1e6:.2f} M lignes/h si rafraîchie toutes les {interval:g} s")
+    if not proposals:
+        print("\n✅ Aucun index à proposer")
+        return
+    print("\n💡 Propositions")
+    for proposal in proposals:
+        targets = ', '.join(f"#{n}" for n in proposal.queries)
+        if proposal.accepted is None:
+            print(f"   📝 {proposal.table}: {proposal.reason} ({targets})")
+            continue
+        mark = '✅' if proposal.accepted else '❌'
+        print(f"   {mark} {proposal.name} ON {proposal.table} ({', '.join(proposal.columns)}): "
+              f"{proposal.before_ms:.1f} ms -> {proposal.after_ms:.1f} ms (x{proposal.speedup}) [{targets}]")
+        print(f"      {proposal.reason}")
+
+
+def write_sql(path: str, proposals: List[IndexProposal], factor: int):
+    """Script des propositions retenues (à appliquer hors production: droits INDEX / ALTER)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"-- Index conseillés par index_advisor.py ({datetime.now():%Y-%m-%d %H:%M}), "
+                f"gains mesurés sur une copie x{factor}\n")
+        for proposal in proposals:
+            if proposal.accepted:
+                f.write(f"\n-- {proposal.reason} (x{proposal.speedup})\n{proposal.ddl};\n")
+
+
+def run_audit(dump_path: str = DUMP_PATH, csv_robot_path: str = CSV_ROBOT_PATH,
+              factor: int = DEFAULT_FACTOR, repeat: int = DEFAULT_REPEAT,
+              interval: float = DEFAULT_INTERVAL, min_rows: int = MIN_SCAN_ROWS,
+              min_speedup: float = MIN_SPEEDUP, query_func: Optional[Callable[..., pd.DataFrame]] = None,
+              work_dir: Optional[str] = None) -> Tuple[List[AuditedQuery], List[IndexProposal], Dict]:
+    """
+    Audit complet: capture (copie 1x), EXPLAIN (copie SQLite xfactor ou MariaDB si query_func),
+    propositions, validation chronométrée sur la copie xfactor
+
+    Args:
+        query_func: Requêtes sur MariaDB (MESIndicators.query_db) pour expliquer les requêtes
+                    sur la base réelle; None = plans de la copie SQLite
+    Returns: (requêtes auditées, propositions, métadonnées de l'audit)
+    """
+    dump = MySQLDump(dump_path)
+    tables = dump.read(SCALED_TABLES + REFERENCE_TABLES)
+    schemas = {table.lower(): [c for c, _ in columns] for table, columns in dump.schemas.items()}
+    indexes = mariadb_indexes(query_func) if query_func is not None else dump_indexes(dump)
+
+    began = time.perf_counter()
+    capture_backend = EmbeddedBackend.from_tables(tables, engine='sqlite')
+    apply_indexes(capture_backend, indexes)
+    queries = capture_queries(capture_backend, csv_robot_path, dashboard_periods(tables))
+    capture_backend.close()
+    print(f"📋 {len(queries)} requêtes distinctes capturées en {time.perf_counter() - began:.1f}s")
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        backend = EmbeddedBackend('sqlite', database=os.path.join(tmp, f'mes4_x{factor}.sqlite'))
+        for name, frame in scaled_tables(tables, factor):
+            backend.load_table(name, frame)
+            del frame
+        apply_indexes(backend, indexes)
+        print(f"📦 Copie x{factor} prête (index du schéma {'MariaDB' if query_func else 'MES4 du dump'})")
+        explain = mariadb_explainer(query_func) if query_func is not None else sqlite_explainer(backend)
+        proposals = audit(queries, explain, schemas, indexes, interval, min_rows)
+        print(f"⏱️  Validation de {sum(p.local_ddl is not None for p in proposals)} proposition(s) "
+              f"({repeat} exécutions par requête)")
+        validate(backend, proposals, queries, repeat, min_speedup)
+        backend.close()
+
+    meta = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'plans': 'mariadb' if query_func is not None else 'sqlite',
+        'factor': factor,
+        'repeat': repeat,
+        'interval_s': interval,
+        'min_rows': min_rows,
+        'min_speedup': min_speedup,
+        'dump': os.path.basename(dump_path),
+    }
+    return queries, proposals, meta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit EXPLAIN des requêtes des indicateurs et conseil d'index")
+    parser.add_argument('--dump', default=DUMP_PATH)
+    parser.add_argument('--robot', default=CSV_ROBOT_PATH)
+    parser.add_argument('--factor', type=int, default=DEFAULT_FACTOR,
+                        help="Volume de la copie de validation (x historique du dump)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help="Délai (s) entre deux rafraîchissements du KPIWorker")
+    parser.add_argument('--min-rows', type=int, default=MIN_SCAN_ROWS)
+    parser.add_argument('--min-speedup', type=float, default=MIN_SPEEDUP)
+    parser.add_argument('--mariadb', action='store_true',
+                        help="Plans EXPLAIN de la base MES4 (DB_CONFIG) au lieu de la copie SQLite")
+    parser.add_argument('--work-dir', default=None, help="Dossier de la copie SQLite temporaire")
+    parser.add_argument('--output', default=None, help="Rapport JSON")
+    parser.add_argument('--sql', default=None, help="Script des index retenus")
+    args = parser.parse_args()
+
+    live = None
+    if args.mariadb:
+        DB_CONFIG = {
+            'host': 'localhost',
+            'port': 3306,
+            'user': 'example_user',
+            'password': 'example_password',
+            'database': 'MES4'
+        }
+        live = MESIndicators(DB_CONFIG, args.robot, query_cache_mb=None)
+    queries, proposals, meta = run_audit(args.dump, args.robot, args.factor, args.repeat, args.interval,
+                                         args.min_rows, args.min_speedup,
+                                         live.query_db if live is not None else None, args.work_dir)
+    print_report(queries, proposals, args.interval)
+    if args.output:
+        report = {'meta': meta, 'queries': [asdict(q) for q in queries],
+                  'proposals': [asdict(p) for p in proposals]}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        print(f"\n✅ Rapport écrit dans {args.output}")
+    if args.sql:
+        write_sql(args.sql, proposals, args.factor)
+        print(f"✅ {sum(bool(p.accepted) for p in proposals)} index retenus écrits dans {args.sql}")
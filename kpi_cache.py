@@ -0,0 +1,162 @@
+"""
+Cache des indicateurs du dashboard avec une durée de vie (TTL) par onglet
+Clé: (indicateur, période, site). Un rerun Streamlit (changement de thème, navigation
+depuis l'Admin, clic sur un widget) relit le cache au lieu de recharger la base ou le CSV
+"""
+
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from kpi_metrics import MetricsRecorder
+
+
+# Durée de vie des valeurs par onglet (secondes)
+TAB_TTL: Dict[str, float] = {
+    'Temps Réel (Opérateur)': 10,
+    'Robot': 5 * 60,
+    'Qualité': 60 * 60,
+    'Stockage': 24 * 60 * 60,
+}
+DEFAULT_TTL = 5 * 60
+
+
+def _period_key(date_range) -> Tuple[str, ...]:
+    """Période normalisée en tuple de chaînes ISO (le date_input peut renvoyer 1 ou 2 dates)"""
+    if date_range is None:
+        return ()
+    if isinstance(date_range, (date, datetime, str)):
+        date_range = [date_range]
+    return tuple(d.isoformat() if isinstance(d, (date, datetime)) else str(d) for d in date_range)
+
+
+class KPICache:
+    """Cache mémoire partagé (thread-safe) des valeurs d'indicateurs"""
+
+    def __init__(self, ttl_by_tab: Optional[Dict[str, float]] = None, default_ttl: float = DEFAULT_TTL,
+                 clock: Callable[[], float] = time.monotonic, metrics: Optional[MetricsRecorder] = None):
+        """
+        Args:
+            ttl_by_tab: TTL (s) par onglet (défaut: TAB_TTL)
+            default_ttl: TTL des onglets non listés
+            clock: Horloge (monotone) utilisée pour l'expiration
+            metrics: Instrumentation (lectures en cache et durées de calcul par indicateur)
+        """
+        self.ttl_by_tab = dict(TAB_TTL if ttl_by_tab is None else ttl_by_tab)
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self.metrics = metrics
+        # clé -> (valeur, onglet, instant du calcul)
+        self._entries: Dict[Tuple, Tuple[Any, str, float]] = {}
+        self._lock = threading.Lock()
+        # Un verrou par clé en cours de calcul: deux sessions qui demandent la même valeur ne la
+        # calculent qu'une fois (retiré une fois la valeur mémorisée)
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(indicator: Hashable, date_range=None, site: Optional[str] = None) -> Tuple:
+        return (indicator, _period_key(date_range), site)
+
+    def ttl(self, tab: str) -> float:
+        return self.ttl_by_tab.get(tab, self.default_ttl)
+
+    def _fresh(self, key: Tuple) -> Optional[Tuple[Any, str, float]]:
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() - entry[2] < self.ttl(entry[1]):
+            return entry
+        return None
+
+    def get(self, indicator: Hashable, tab: str, compute: Callable[[], Any],
+            date_range=None, site: Optional[str] = None) -> Any:
+        """
+        Retourne la valeur en cache si elle est encore valide, sinon la calcule et la mémorise
+
+        Args:
+            indicator: Identifiant de l'indicateur (ex: '1. Autonomie Robot')
+            tab: Onglet qui affiche l'indicateur (détermine le TTL)
+            compute: Fonction sans argument qui charge / calcule la valeur
+            date_range: Période d'analyse (filtre global)
+            site: Site sélectionné (filtre global)
+        """
+        key = self.key(indicator, date_range, site)
+        with self._lock:
+            entry = self._fresh(key)
+            if entry is not None:
+                self.hits += 1
+            else:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+        if entry is not None:
+            self._record(indicator, tab, True)
+            return entry[0]
+
+        with key_lock:
+            # Une autre session a pu calculer la valeur pendant l'attente du verrou
+            with self._lock:
+                entry = self._fresh(key)
+                if entry is not None:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if entry is not None:
+                self._record(indicator, tab, True)
+                return entry[0]
+            try:
+                began = time.perf_counter()
+                value = compute()
+                self._record(indicator, tab, False, time.perf_counter() - began, value)
+                with self._lock:
+                    self._purge_expired()
+                    self._entries[key] = (value, tab, self.clock())
+            finally:
+                # Les sessions déjà en attente relisent la valeur sous l'ancien verrou, les suivantes
+                # la trouvent en cache: le verrou n'est plus utile
+                with self._lock:
+                    if self._key_locks.get(key) is key_lock:
+                        del self._key_locks[key]
+            return value
+
+    def _purge_expired(self):
+        """Supprime les valeurs expirées (sous self._lock): périodes et sites abandonnés ne restent pas en mémoire"""
+        now = self.clock()
+        for k in [k for k, (_, tab, computed) in self._entries.items() if now - computed >= self.ttl(tab)]:
+            del self._entries[k]
+
+    def _record(self, indicator: Hashable, tab: str, hit: bool, wall_s: float = 0.0, value=None):
+        if self.metrics is not None:
+            self.metrics.record_cache(indicator, hit, wall_s, value, source=tab)
+
+    def invalidate(self, indicator: Optional[Hashable] = None, tab: Optional[str] = None) -> int:
+        """
+        Supprime des valeurs du cache (toutes si aucun filtre)
+
+        Args:
+            indicator: Ne supprime que cet indicateur (toutes périodes et sites)
+            tab: Ne supprime que les indicateurs de cet onglet
+        Returns: nombre de valeurs supprimées
+        """
+        with self._lock:
+            keys = [k for k, (_, entry_tab, _) in self._entries.items()
+                    if (indicator is None or k[0] == indicator) and (tab is None or entry_tab == tab)]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def age(self, indicator: Hashable) -> Optional[float]:
+        """Âge (s) de la valeur la plus récente de l'indicateur, None si absente ou expirée"""
+        with self._lock:
+            ages = [self.clock() - computed for k, (_, tab, computed) in self._entries.items()
+                    if k[0] == indicator and self.clock() - computed < self.ttl(tab)]
+        return min(ages) if ages else None
+
+    def entries(self) -> List[Dict]:
+        """État du cache (page Admin)"""
+        now = self.clock()
+        with self._lock:
+            return [
+                {'indicateur': k[0], 'periode': ' → '.join(k[1]), 'site': k[2], 'onglet': tab,
+                 'age_s': round(now - computed, 1), 'ttl_s': self.ttl(tab)}
+                for k, (_, tab, computed) in self._entries.items()
+            ]
@@ -0,0 +1,239 @@
+"""
+Instrumentation des indicateurs et des requêtes
+Chaque calcul d'indicateur, chaque requête SQL et chaque lecture du cache KPI produit un
+enregistrement structuré (durée, temps SQL, lignes, octets, cache, mémoire des DataFrames)
+conservé dans un tampon circulaire, exportable (CSV / JSON) et affiché sur la page Admin
+"""
+
+import json
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
+
+# pandas n'est importé qu'à la lecture des mesures (to_frame, summary): la mesure d'une page
+# légère du dashboard (Connexion) ne le charge pas
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Nombre d'enregistrements conservés (les plus anciens sont écrasés)
+DEFAULT_CAPACITY = 5000
+# Longueur maximale du texte SQL conservé
+SQL_PREVIEW_LENGTH = 160
+
+RECORD_KINDS = ['indicator', 'query', 'cache', 'snapshot', 'robot', 'page']
+
+
+def frame_bytes(value: Any) -> int:
+    """Mémoire (octets) des DataFrames / Series contenus dans une valeur (dict, tuple, list)"""
+    pd = sys.modules.get('pandas')
+    if pd is None:
+        # Aucune valeur ne peut contenir de DataFrame tant que pandas n'est pas importé
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sum(frame_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(frame_bytes(v) for v in value)
+    return 0
+
+
+def _sql_preview(query: str) -> str:
+    """Requête sur une ligne, tronquée (les paramètres ne sont jamais enregistrés)"""
+    text = re.sub(r"\s+", " ", query).strip()
+    return text if len(text) <= SQL_PREVIEW_LENGTH else text[:SQL_PREVIEW_LENGTH - 1] + "…"
+
+
+@dataclass
+class MetricRecord:
+    """Un événement mesuré"""
+    kind: str
+    name: str
+    at: datetime
+    wall_s: float
+    sql_s: float = 0.0
+    queries: int = 0
+    rows: int = 0
+    bytes: int = 0
+    memory_bytes: int = 0
+    cache: Optional[str] = None
+    source: Optional[str] = None
+    indicator: Optional[str] = None
+    error: Optional[str] = None
+    thread: str = field(default_factory=lambda: threading.current_thread().name)
+
+
+class MetricsRecorder:
+    """Tampon circulaire thread-safe des mesures (partagé par le worker KPI et les sessions)"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, enabled: bool = True):
+        """
+        Args:
+            capacity: Nombre d'enregistrements conservés
+            enabled: False = aucun enregistrement (coût nul hors chronométrage)
+        """
+        self.enabled = enabled
+        self._records: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        # Indicateur en cours dans le thread courant: ses requêtes lui sont rattachées
+        self._local = threading.local()
+
+    def _add(self, record: MetricRecord):
+        if self.enabled:
+            with self._lock:
+                self._records.append(record)
+
+    # ---------- Enregistrement ----------
+
+    def call(self, name: str, func: Callable, *args, cache: Optional[str] = None, **kwargs):
+        """
+        Exécute un indicateur et enregistre sa durée, le temps et le volume de ses requêtes
+        et la mémoire du résultat (l'exception éventuelle est enregistrée puis relancée)
+
+        Args:
+            name: Nom de l'indicateur (ex: 'indicator_2_of_realises')
+            func: Fonction de calcul
+            cache: Origine des données ('snapshot', 'hit', 'miss'...)
+        """
+        totals = {'sql_s': 0.0, 'queries': 0, 'rows': 0, 'bytes': 0}
+        parent = getattr(self._local, 'totals', None)
+        parent_name = getattr(self._local, 'name', None)
+        self._local.totals, self._local.name = totals, name
+        began, at = time.perf_counter(), datetime.now()
+        result, error = None, None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self._local.totals, self._local.name = parent, parent_name
+            self._add(MetricRecord('indicator', name, at, time.perf_counter() - began,
+                                   cache=cache, memory_bytes=frame_bytes(result), error=error, **totals))
+
+    def current_indicator(self) -> Optional[str]:
+        """Indicateur en cours de calcul dans ce thread (None hors de call)"""
+        return getattr(self._local, 'name', None)
+
+    def record_query(self, query: str, wall_s: float, result: Optional['pd.DataFrame'] = None,
+                     source: Optional[str] = None, error: Optional[str] = None,
+                     cache: Optional[str] = None):
+        """
+        Enregistre une requête (rattachée à l'indicateur en cours dans ce thread)
+        Octets = mémoire du DataFrame reçu (le connecteur n'expose pas le volume réseau)
+        cache='hit': résultat servi par le cache des requêtes (ni temps SQL, ni requête comptée)
+        """
+        rows = len(result) if result is not None else 0
+        size = frame_bytes(result)
+        executed = cache != 'hit'
+        totals = getattr(self._local, 'totals', None)
+        if totals is not None:
+            totals['sql_s'] += wall_s if executed else 0.0
+            totals['queries'] += int(executed)
+            totals['rows'] += rows
+            totals['bytes'] += size
+        self._add(MetricRecord('query', _sql_preview(query), datetime.now(), wall_s,
+                               sql_s=wall_s if executed else 0.0, queries=int(executed), rows=rows,
+                               bytes=size, cache=cache, source=source,
+                               indicator=self.current_indicator(), error=error))
+
+    def record_cache(self, name: str, hit: bool, wall_s: float = 0.0, value: Any = None,
+                     source: Optional[str] = None):
+        """Lecture du cache KPI (hit) ou calcul de la valeur (miss, avec sa durée)"""
+        self._add(MetricRecord('cache', str(name), datetime.now(), wall_s, cache='hit' if hit else 'miss',
+                               memory_bytes=frame_bytes(value), source=source))
+
+    @contextmanager
+    def measure(self, kind: str, name: str, **fields):
+        """
+        Chronomètre un bloc (chargement du snapshot, du CSV robot...)
+        Le dict produit par le with peut être complété (rows, memory_bytes, cache...)
+        """
+        details = dict(fields)
+        began, at = time.perf_counter(), datetime.now()
+        try:
+            yield details
+        except Exception as e:
+            details['error'] = str(e)
+            raise
+        finally:
+            self._add(MetricRecord(kind, name, at, time.perf_counter() - began, **details))
+
+    # ---------- Lecture / export ----------
+
+    def records(self, kind: Optional[str] = None) -> List[MetricRecord]:
+        with self._lock:
+            records = list(self._records)
+        return [r for r in records if kind is None or r.kind == kind]
+
+    def to_frame(self, kind: Optional[str] = None) -> 'pd.DataFrame':
+        import pandas as pd
+        records = self.records(kind)
+        if not records:
+            return pd.DataFrame(columns=[f for f in MetricRecord.__dataclass_fields__])
+        return pd.DataFrame([asdict(r) for r in records])
+
+    def summary(self, kind: str = 'indicator') -> 'pd.DataFrame':
+        """
+        Agrégats par nom (page Admin): appels, durée moyenne / p95 / max, part du temps SQL,
+        requêtes et lignes par appel, mémoire, taux de lecture en cache, erreurs
+
+        Args:
+            kind: 'indicator', 'query', 'cache', 'snapshot', 'robot' ou 'page' (affichage d'une page)
+        """
+        import pandas as pd
+        frame = self.to_frame(kind)
+        if frame.empty:
+            return pd.DataFrame(columns=['name', 'calls', 'wall_mean_ms', 'wall_p95_ms', 'wall_max_ms',
+                                         'sql_share', 'queries', 'rows', 'memory_mb', 'cache_hit', 'errors'])
+        frame['hit'] = frame['cache'].eq('hit')
+        summary = frame.groupby('name', sort=False).agg(
+            calls=('wall_s', 'size'),
+            wall_mean_ms=('wall_s', lambda s: s.mean() * 1000),
+            wall_p95_ms=('wall_s', lambda s: s.quantile(0.95) * 1000),
+            wall_max_ms=('wall_s', lambda s: s.max() * 1000),
+            sql_s=('sql_s', 'sum'),
+            wall_s=('wall_s', 'sum'),
+            queries=('queries', 'mean'),
+            rows=('rows', 'mean'),
+            memory_mb=('memory_bytes', lambda s: s.max() / 1e6),
+            cache_hit=('hit', 'mean'),
+            errors=('error', 'count'),
+        )
+        summary['sql_share'] = (summary['sql_s'] / summary['wall_s'].where(summary['wall_s'] > 0)).fillna(0)
+        summary = summary.drop(columns=['sql_s', 'wall_s']).reset_index()
+        return summary.sort_values('wall_p95_ms', ascending=False).round(3)[
+            ['name', 'calls', 'wall_mean_ms', 'wall_p95_ms', 'wall_max_ms', 'sql_share',
+             'queries', 'rows', 'memory_mb', 'cache_hit', 'errors']]
+
+    def export(self, path: str) -> int:
+        """
+        Exporte le tampon (CSV, ou JSON lignes si le fichier finit par .json / .jsonl)
+
+        Returns: nombre d'enregistrements écrits
+        """
+        records = self.records()
+        if path.endswith(('.json', '.jsonl')):
+            with open(path, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(asdict(record), default=str, ensure_ascii=False) + "\n")
+        else:
+            self.to_frame().to_csv(path, index=False)
+        return len(records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def __len__(self) -> int:
+        return len(self._records)
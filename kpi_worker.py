@@ -0,0 +1,243 @@
+"""
+Calcul des KPI en tâche de fond, partagé par toutes les sessions du dashboard
+Un thread recalcule périodiquement les 15 indicateurs (MESIndicators.compute_all) et publie
+un snapshot immuable et versionné par période d'analyse: les sessions Streamlit ne font que le lire
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from db_pool import DatabaseUnavailableError
+
+
+# Nombre de périodes d'analyse dont le snapshot est conservé (les moins récemment demandées sont abandonnées)
+DEFAULT_MAX_PERIODS = 4
+
+
+@dataclass(frozen=True)
+class KPISnapshot:
+    """Résultats d'un calcul complet des indicateurs (ne jamais modifier les valeurs lues)"""
+    version: int
+    computed_at: datetime
+    duration_s: float
+    period: Tuple[Any, Any]
+    values: Mapping[str, Any]
+    errors: Mapping[str, str]
+
+    def get(self, indicator: str, default=None):
+        """Valeur d'un indicateur (nom de méthode, ex: 'indicator_2_of_realises')"""
+        return self.values.get(indicator, default)
+
+
+def _freeze(value):
+    """Copie défensive: les sessions partagent le snapshot, aucune ne doit pouvoir le modifier"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class KPIWorker:
+    """
+    Thread de fond qui recalcule les KPI et publie un snapshot par période demandée
+    Les sessions demandent leur période (request) et lisent son dernier snapshot sans jamais
+    attendre: une période nouvelle est calculée en priorité, les périodes conservées (LRU de
+    max_periods) sont recalculées toutes les `interval` secondes
+    """
+
+    # Séries des graphiques publiées avec les indicateurs, calculées sur la même période
+    SERIES: Dict[str, Callable[[Any, Any, Any], Any]] = {
+        'distance_series': lambda mes, start, end: mes.distance_series('day', start=start, end=end),
+    }
+
+    def __init__(self, mes, interval: float = 30.0, snapshot: bool = True,
+                 period: Optional[Tuple[Any, Any]] = None, max_periods: int = DEFAULT_MAX_PERIODS,
+                 activity_days: Optional[int] = None):
+        """
+        Args:
+            mes: Instance MESIndicators utilisée uniquement par ce thread
+            interval: Délai (s) entre deux calculs d'une même période
+            snapshot: Mode snapshot de MESIndicators (une requête par table de base)
+            period: Période (start, end) calculée tant qu'aucune session n'en a demandé
+                    (None: le thread attend la première demande)
+            max_periods: Nombre de périodes dont le snapshot est conservé et recalculé
+            activity_days: Durée (jours) de la période par défaut des sessions, résolue au démarrage
+                           du thread sur les dernières données datées (voir activity_period).
+                           None = pas de période par défaut
+        """
+        self.mes = mes
+        self.interval = interval
+        self.snapshot_mode = snapshot
+        self.period = period
+        self.max_periods = max_periods
+        self.activity_days = activity_days
+        # Dernière période d'activité des données (date, date), None tant qu'elle n'est pas résolue
+        self.activity_period: Optional[Tuple[date, date]] = None
+        self._latest: Optional[KPISnapshot] = None
+        self._snapshots: 'OrderedDict[Tuple, KPISnapshot]' = OrderedDict()
+        # Périodes demandées (la plus récente en dernier) -> instant (monotone) du prochain calcul
+        self._due: 'OrderedDict[Tuple, float]' = OrderedDict()
+        self._version = 0
+        self._published = threading.Condition()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+
+    # ---------- Côté sessions (lecture seule) ----------
+
+    def latest(self) -> Optional[KPISnapshot]:
+        """Dernier snapshot publié, toutes périodes confondues (None avant le premier calcul)"""
+        return self._latest
+
+    def request(self, period: Tuple[Any, Any]) -> Optional[KPISnapshot]:
+        """
+        Demande les snapshots d'une période, sans attendre (calcul prioritaire si elle est nouvelle)
+
+        Returns: dernier snapshot publié pour cette période, None tant qu'il est en calcul
+        """
+        with self._published:
+            if period in self._due:
+                self._due.move_to_end(period)
+            else:
+                self._due[period] = 0.0
+                while len(self._due) > self.max_periods:
+                    evicted, _ = self._due.popitem(last=False)
+                    self._snapshots.pop(evicted, None)
+                self._wake.set()
+            return self._snapshots.get(period)
+
+    def wait_for(self, version: int = 1, timeout: Optional[float] = None) -> Optional[KPISnapshot]:
+        """Attend qu'un snapshot de version >= version soit publié (scripts, pas les sessions)"""
+        with self._published:
+            self._published.wait_for(
+                lambda: self._latest is not None and self._latest.version >= version, timeout)
+            return self._latest
+
+    def request_refresh(self):
+        """Demande un recalcul immédiat de toutes les périodes (ex: bouton de la page Admin)"""
+        with self._published:
+            for period in self._due:
+                self._due[period] = 0.0
+        self._wake.set()
+
+    # ---------- Côté thread de calcul ----------
+
+    def refresh(self, period: Optional[Tuple[Any, Any]] = None) -> KPISnapshot:
+        """Calcule tous les indicateurs sur une période (défaut: self.period, sinon tout l'historique)"""
+        period = period or self.period or (None, None)
+        start, end = period
+        began = time.perf_counter()
+        # Affichage détaillé des 15 indicateurs écarté: il irait dans le journal du serveur à chaque calcul
+        values, errors = self.mes.compute_all(snapshot=self.snapshot_mode, start=start, end=end, quiet=True)
+        for name, compute in self.SERIES.items():
+            try:
+                values[name] = compute(self.mes, start, end)
+            except DatabaseUnavailableError:
+                raise
+            except Exception as e:
+                errors[name] = str(e)
+        with self._published:
+            # Publication atomique: les lecteurs voient l'ancien ou le nouveau snapshot, jamais un mélange
+            snapshot = KPISnapshot(
+                version=self._version + 1,
+                computed_at=datetime.now(),
+                duration_s=time.perf_counter() - began,
+                period=(start, end),
+                values=MappingProxyType({k: _freeze(v) for k, v in values.items()}),
+                errors=MappingProxyType(dict(errors)),
+            )
+            self._version = snapshot.version
+            self._latest = snapshot
+            self._snapshots[period] = snapshot
+            self._snapshots.move_to_end(period)
+            while len(self._snapshots) > self.max_periods:
+                self._snapshots.popitem(last=False)
+            self._published.notify_all()
+        return snapshot
+
+    def _next_period(self) -> Tuple[Optional[Tuple], float]:
+        """
+        Prochaine période à calculer: échéance la plus proche, la plus récemment demandée
+        d'abord à échéance égale (périodes nouvelles: échéance 0)
+
+        Returns: (période, 0) si un calcul est dû, sinon (None, délai avant la prochaine échéance)
+        """
+        with self._published:
+            if not self._due:
+                if self.period is None:
+                    return None, self.interval
+                self._due[self.period] = 0.0
+            period = min(reversed(self._due), key=self._due.get)
+            wait = self._due[period] - time.monotonic()
+            return (period, 0.0) if wait <= 0 else (None, wait)
+
+    def _resolve_activity_period(self):
+        """
+        Résout la période par défaut des sessions et la calcule en priorité
+        Repli sur les derniers jours du calendrier si aucune donnée n'est datée ou si la base ne répond pas
+        """
+        try:
+            period = self.mes.last_active_period(self.activity_days)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️  Dernière période d'activité non résolue: {e}")
+            period = None
+        if period is None:
+            today = date.today()
+            period = (today - timedelta(days=self.activity_days - 1), today)
+        self.request(period)
+        self.activity_period = period
+
+    def _run(self):
+        if self.activity_days is not None:
+            self._resolve_activity_period()
+        while not self._stop.is_set():
+            period, wait = self._next_period()
+            if period is None:
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+            try:
+                snapshot = self.refresh(period)
+                self.last_error = None
+                print(f"🛰️  Snapshot KPI v{snapshot.version} publié ({snapshot.duration_s:.2f}s)")
+            except DatabaseUnavailableError as e:
+                # Le snapshot précédent reste servi aux sessions jusqu'au retour de MariaDB
+                self.last_error = str(e)
+                print(f"⚠️  Snapshot KPI non rafraîchi: {e}")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Erreur du calcul des KPI en tâche de fond: {e}")
+            with self._published:
+                if period in self._due:
+                    self._due[period] = time.monotonic() + self.interval
+
+    def start(self) -> 'KPIWorker':
+        """Démarre le thread (sans effet s'il tourne déjà)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="kpi-worker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Arrête le thread après le calcul en cours"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
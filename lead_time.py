@@ -0,0 +1,162 @@
+"""
+Décomposition du temps de cycle des OF à partir des étapes (tblfinstep)
+Le délai d'un OF (première étape commencée -> dernière étape terminée) est découpé en
+temps de traitement (valeur ajoutée), transport et attente entre étapes (non valeur ajoutée).
+Les positions d'un OF pouvant avancer en parallèle, chaque catégorie est une union
+d'intervalles par OF (balayage trié), et non une somme: VA + transport + attente = délai
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Ressources de transport (AGV=1 dans tblresource): leurs étapes sont du transport, pas de la VA
+TRANSPORT_RESOURCES: Tuple[int, ...] = (10,)
+
+STEP_COLUMNS = ['ONo', 'OPos', 'StepNo', 'ResourceID', 'Start', 'End', 'TransportTime']
+BREAKDOWN_COLUMNS = ['lead_s', 'va_s', 'transport_s', 'waiting_s']
+
+
+def step_segments(steps: pd.DataFrame,
+                  transport_resources: Sequence[int] = TRANSPORT_RESOURCES) -> pd.DataFrame:
+    """
+    Temps de chaque étape et de l'écart qui la précède dans sa position d'OF (ONo, OPos)
+
+    L'écart entre la fin de l'étape précédente et le début de l'étape est du transport à
+    hauteur de TransportTime (s, temps de transport vers la ressource de l'étape), le reste
+    est de l'attente (file devant la ressource). Étapes non commencées ou non terminées ignorées
+
+    Args:
+        steps: Étapes (ONo, OPos, StepNo, ResourceID, Start, End, TransportTime optionnelle)
+        transport_resources: Ressources dont les étapes comptent comme transport
+    Returns: DataFrame trié par (ONo, OPos, Start) avec gap_start, processing_s, transport_s,
+             waiting_s, is_transport
+    """
+    columns = [c for c in STEP_COLUMNS if c in steps.columns]
+    steps = steps[columns].dropna(subset=['ONo', 'Start', 'End'])
+    if 'OPos' not in steps.columns:
+        steps = steps.assign(OPos=0)
+    ono = steps['ONo'].to_numpy(dtype='int64')
+    opos = steps['OPos'].fillna(0).to_numpy(dtype='int64')
+    t0 = steps['Start'].to_numpy(dtype='datetime64[ns]').astype('int64')
+    t1 = np.maximum(steps['End'].to_numpy(dtype='datetime64[ns]').astype('int64'), t0)
+    order = np.lexsort((t0, opos, ono))
+    result = steps.iloc[order].reset_index(drop=True)
+    ono, opos, t0, t1 = ono[order], opos[order], t0[order], t1[order]
+
+    # Écart avec l'étape précédente de la même position (décalage trié, pas de boucle)
+    same_prev = np.zeros(len(result), dtype=bool)
+    same_prev[1:] = (ono[1:] == ono[:-1]) & (opos[1:] == opos[:-1])
+    prev_end = np.where(same_prev, np.roll(t1, 1), t0)
+    gap_start = np.minimum(prev_end, t0)
+    gap = (t0 - gap_start) / 1e9
+    if 'TransportTime' in result.columns:
+        planned = result['TransportTime'].fillna(0).clip(lower=0).to_numpy(dtype='float64')
+    else:
+        planned = np.zeros(len(result))
+    transport_gap = np.minimum(gap, planned)
+
+    result['Start'] = t0.astype('datetime64[ns]')
+    result['End'] = t1.astype('datetime64[ns]')
+    result['gap_start'] = gap_start.astype('datetime64[ns]')
+    result['is_transport'] = result['ResourceID'].isin(transport_resources).to_numpy()
+    duration = (t1 - t0) / 1e9
+    result['processing_s'] = np.where(result['is_transport'], 0.0, duration)
+    result['transport_s'] = transport_gap + np.where(result['is_transport'], duration, 0.0)
+    result['waiting_s'] = gap - transport_gap
+    return result
+
+
+def _union_seconds(groups: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> pd.Series:
+    """
+    Durée (s) de l'union des intervalles [start, stop[ de chaque groupe
+
+    Balayage: intervalles triés par (groupe, début), fin maximale cumulée par groupe,
+    un nouveau bloc commence quand un intervalle débute après cette fin
+    """
+    keep = stops > starts
+    groups, starts, stops = groups[keep], starts[keep], stops[keep]
+    if len(groups) == 0:
+        return pd.Series(dtype='float64')
+    order = np.lexsort((starts, groups))
+    groups, starts, stops = groups[order], starts[order], stops[order]
+    reach = pd.Series(stops).groupby(groups).cummax().to_numpy()
+    new_block = np.ones(len(groups), dtype=bool)
+    new_block[1:] = (groups[1:] != groups[:-1]) | (starts[1:] > reach[:-1])
+    last = np.append(new_block[1:], True)
+    lengths = (reach[last] - starts[new_block]) / 1e9
+    return pd.Series(lengths).groupby(groups[new_block]).sum()
+
+
+def order_breakdown(segments: pd.DataFrame) -> pd.DataFrame:
+    """
+    Délai de chaque OF découpé en VA, transport et attente
+
+    Args:
+        segments: Sortie de step_segments
+    Returns: DataFrame (ONo, start, end, day, lead_s, va_s, transport_s, waiting_s),
+             day = jour de fin du dernier traitement
+    """
+    columns = ['ONo', 'start', 'end', 'day'] + BREAKDOWN_COLUMNS
+    if segments.empty:
+        return pd.DataFrame(columns=columns)
+    ono = segments['ONo'].to_numpy(dtype='int64')
+    t0 = segments['Start'].to_numpy(dtype='datetime64[ns]').astype('int64')
+    t1 = segments['End'].to_numpy(dtype='datetime64[ns]').astype('int64')
+    gap_start = segments['gap_start'].to_numpy(dtype='datetime64[ns]').astype('int64')
+    is_transport = segments['is_transport'].to_numpy()
+    # Part de transport_s située dans l'écart avant l'étape (hors durée des étapes de transport)
+    transport_gap = segments['transport_s'].to_numpy() * 1e9 - np.where(is_transport, t1 - t0, 0)
+    transport_gap = np.round(transport_gap).astype('int64')
+
+    # Intervalles de traitement, puis traitement + transport (étapes de transport et
+    # transport en amont de chaque étape): le transport est ce qui n'est pas déjà de la VA
+    va_mask = ~is_transport
+    busy_groups = np.concatenate([ono, ono])
+    busy_starts = np.concatenate([t0, gap_start])
+    busy_stops = np.concatenate([t1, gap_start + transport_gap])
+
+    orders = pd.DataFrame({'start': pd.Series(t0).groupby(ono).min(),
+                           'end': pd.Series(t1).groupby(ono).max()})
+    orders['va_s'] = _union_seconds(ono[va_mask], t0[va_mask], t1[va_mask])
+    orders['transport_s'] = _union_seconds(busy_groups, busy_starts, busy_stops)
+    orders = orders.fillna(0)
+    orders['lead_s'] = (orders['end'] - orders['start']) / 1e9
+    orders['transport_s'] -= orders['va_s']
+    orders['waiting_s'] = (orders['lead_s'] - orders['va_s'] - orders['transport_s']).clip(lower=0)
+    orders['start'] = orders['start'].astype('datetime64[ns]')
+    orders['end'] = orders['end'].astype('datetime64[ns]')
+    orders['day'] = orders['end'].dt.date
+    return orders.rename_axis('ONo').reset_index()[columns]
+
+
+def breakdown_by_day(orders: pd.DataFrame) -> pd.DataFrame:
+    """
+    Moyennes par jour de fin des OF
+
+    Returns: DataFrame (day, orders, lead_s, va_s, transport_s, waiting_s, va_pct)
+    """
+    if orders.empty:
+        return pd.DataFrame(columns=['day', 'orders'] + BREAKDOWN_COLUMNS + ['va_pct'])
+    result = orders.groupby('day')[BREAKDOWN_COLUMNS].mean()
+    result.insert(0, 'orders', orders.groupby('day').size())
+    result['va_pct'] = (result['va_s'] / result['lead_s'].where(result['lead_s'] > 0) * 100).fillna(0)
+    return result.reset_index()
+
+
+def breakdown_by_resource(segments: pd.DataFrame) -> pd.DataFrame:
+    """
+    Temps par ressource: traitement de ses étapes, transport et attente avant ses étapes
+    (sommes par étape, les positions parallèles s'additionnent)
+
+    Returns: DataFrame (ResourceID, steps, processing_s, transport_s, waiting_s)
+    """
+    columns = ['ResourceID', 'steps', 'processing_s', 'transport_s', 'waiting_s']
+    if segments.empty:
+        return pd.DataFrame(columns=columns)
+    grouped = segments.groupby('ResourceID')
+    result = grouped[['processing_s', 'transport_s', 'waiting_s']].sum()
+    result.insert(0, 'steps', grouped.size())
+    return result.reset_index()[columns]
@@ -0,0 +1,181 @@
+"""
+États des postes MES à partir des rapports machine (tblmachinereport)
+Chaque rapport donne l'état d'un poste (ResourceID) jusqu'au rapport suivant du même poste:
+les événements sont transformés en intervalles occupé / libre / erreur / manuel, découpés sur la
+période demandée puis agrégés par poste et par jour. Calcul vectorisé, linéaire en nombre
+de rapports (les rapports arrivent déjà triés par ID, donc par date)
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# États d'un poste, par priorité: un poste en erreur n'est ni occupé ni libre, un poste en mode
+# manuel (ManualMode) n'est pas disponible pour la production et sort du temps observé
+STATES = ['busy', 'idle', 'error', 'manual']
+# États comptés dans le temps observé (dénominateur du taux d'occupation)
+OBSERVED_STATES = ['busy', 'idle', 'error']
+ERROR_COLUMNS = ['ErrorL0', 'ErrorL1', 'ErrorL2']
+REPORT_COLUMNS = ['ResourceID', 'TimeStamp', 'AutomaticMode', 'ManualMode', 'Busy'] + ERROR_COLUMNS
+
+# Durée maximale (s) pendant laquelle un rapport fait foi sans nouveau rapport du poste:
+# au-delà (nuit, week-end, poste éteint), le temps n'est pas observé et n'entre pas dans le taux
+MAX_HOLD_SECONDS = 4 * 3600
+
+
+def _empty_intervals() -> pd.DataFrame:
+    return pd.DataFrame({
+        'ResourceID': pd.Series(dtype='int64'),
+        'state': pd.Categorical([], categories=STATES),
+        'start': pd.Series(dtype='datetime64[ns]'),
+        'end': pd.Series(dtype='datetime64[ns]'),
+        'duration_s': pd.Series(dtype='float64'),
+    })
+
+
+def report_states(reports: pd.DataFrame) -> np.ndarray:
+    """
+    Code d'état (indice dans STATES) de chaque rapport
+
+    Args:
+        reports: Rapports machine (colonnes Busy, ManualMode et ErrorL0..L2, absentes = 0)
+    Returns: tableau d'entiers aligné sur les lignes de reports
+    """
+    def flag(column: str) -> np.ndarray:
+        if column not in reports.columns:
+            return np.zeros(len(reports), dtype=bool)
+        return reports[column].fillna(0).to_numpy().astype(bool)
+
+    error = flag(ERROR_COLUMNS[0]) | flag(ERROR_COLUMNS[1]) | flag(ERROR_COLUMNS[2])
+    manual = flag('ManualMode')
+    busy = flag('Busy')
+    return np.where(error, STATES.index('error'),
+                    np.where(manual, STATES.index('manual'),
+                             np.where(busy, STATES.index('busy'), STATES.index('idle')))).astype('int8')
+
+
+def machine_intervals(reports: pd.DataFrame, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None,
+                      max_hold: float = MAX_HOLD_SECONDS) -> pd.DataFrame:
+    """
+    Intervalles d'état de chaque poste, restreints à la période [start, end[
+
+    Un rapport ouvre un intervalle qui se termine au rapport suivant du même poste, au plus
+    tard max_hold secondes après (le dernier rapport d'un poste est borné de la même façon).
+    Les intervalles consécutifs de même état sont fusionnés. Pour connaître l'état au début
+    de la période, reports doit contenir les rapports depuis start - max_hold
+
+    Args:
+        reports: Rapports machine (ResourceID, TimeStamp, Busy, ManualMode, ErrorL0..L2)
+        start, end: Période d'analyse (None = non bornée)
+        max_hold: Durée maximale (s) de validité d'un rapport
+    Returns: DataFrame (ResourceID, state, start, end, duration_s) trié par poste puis date
+    """
+    if len(reports) == 0 or not {'ResourceID', 'TimeStamp'} <= set(reports.columns):
+        return _empty_intervals()
+    reports = reports.dropna(subset=['ResourceID', 'TimeStamp'])
+    timestamps = pd.to_datetime(reports['TimeStamp'])
+    if not timestamps.is_monotonic_increasing:
+        order = np.argsort(timestamps.to_numpy(), kind='stable')
+        reports, timestamps = reports.iloc[order], timestamps.iloc[order]
+    # Tri stable par poste: l'ordre chronologique est conservé à l'intérieur de chaque poste.
+    # Codes de poste sur 16 bits: numpy trie alors par base (radix), en temps linéaire
+    codes, resources = pd.factorize(reports['ResourceID'].to_numpy(dtype='int64'))
+    if len(resources) < np.iinfo(np.int16).max:
+        codes = codes.astype('int16')
+    order = np.argsort(codes, kind='stable')
+    resource = resources[codes[order]]
+    t = timestamps.to_numpy(dtype='datetime64[ns]')[order].astype('int64')
+    state = report_states(reports)[order]
+
+    # Fin de chaque intervalle: rapport suivant du même poste, au plus max_hold plus tard
+    same_next = np.append(resource[1:] == resource[:-1], False)
+    hold = int(max_hold * 1e9)
+    next_t = np.append(t[1:], 0)
+    stop = np.where(same_next, np.minimum(next_t, t + hold), t + hold)
+
+    # Fusion des intervalles contigus de même état (un seul passage)
+    new_run = np.ones(len(t), dtype=bool)
+    new_run[1:] = (resource[1:] != resource[:-1]) | (state[1:] != state[:-1]) | (t[1:] != stop[:-1])
+    last_of_run = np.append(new_run[1:], True)
+    run_start = t[new_run]
+    run_stop = stop[last_of_run]
+    run_resource = resource[new_run]
+    run_state = state[new_run]
+
+    # Restriction à la période
+    if start is not None:
+        run_start = np.maximum(run_start, pd.Timestamp(start).value)
+    if end is not None:
+        run_stop = np.minimum(run_stop, pd.Timestamp(end).value)
+    keep = run_stop > run_start
+    run_start, run_stop = run_start[keep], run_stop[keep]
+
+    return pd.DataFrame({
+        'ResourceID': run_resource[keep],
+        'state': pd.Categorical.from_codes(run_state[keep], categories=STATES),
+        'start': run_start.astype('datetime64[ns]'),
+        'end': run_stop.astype('datetime64[ns]'),
+        'duration_s': (run_stop - run_start) / 1e9,
+    })
+
+
+def split_by_day(intervals: pd.DataFrame) -> pd.DataFrame:
+    """
+    Découpe les intervalles à minuit (un morceau par jour touché) et ajoute la colonne 'day'
+
+    Returns: DataFrame (ResourceID, state, start, end, duration_s, day)
+    """
+    if intervals.empty:
+        return intervals.assign(day=pd.Series(dtype='object'))
+    day_ns = 24 * 3600 * 10 ** 9
+    starts = intervals['start'].to_numpy(dtype='datetime64[ns]').astype('int64')
+    # Fin exclusive: un intervalle qui s'arrête à minuit pile n'entame pas le jour suivant
+    stops = intervals['end'].to_numpy(dtype='datetime64[ns]').astype('int64')
+    first_day = starts // day_ns
+    pieces = (stops - 1) // day_ns - first_day + 1
+
+    rows = np.repeat(np.arange(len(intervals)), pieces)
+    offset = np.arange(len(rows)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    day_start = (first_day[rows] + offset) * day_ns
+    piece_start = np.maximum(starts[rows], day_start)
+    piece_stop = np.minimum(stops[rows], day_start + day_ns)
+
+    result = intervals.iloc[rows].reset_index(drop=True)
+    result['start'] = piece_start.astype('datetime64[ns]')
+    result['end'] = piece_stop.astype('datetime64[ns]')
+    result['duration_s'] = (piece_stop - piece_start) / 1e9
+    result['day'] = pd.to_datetime(day_start).date
+    return result
+
+
+def occupancy(intervals: pd.DataFrame, by: Sequence[str] = ('ResourceID',)) -> pd.DataFrame:
+    """
+    Taux d'occupation = temps occupé / temps observé (occupé + libre + erreur, hors mode manuel)
+
+    Args:
+        intervals: Sortie de machine_intervals (ou de split_by_day pour grouper par 'day')
+        by: Colonnes de regroupement (ex: ['ResourceID'], ['day'], ['ResourceID', 'day'])
+    Returns: DataFrame (by..., busy_h, idle_h, error_h, manual_h, observed_h, occupation_pct, erreur_pct)
+    """
+    by = list(by)
+    columns = by + ['busy_h', 'idle_h', 'error_h', 'manual_h', 'observed_h', 'occupation_pct', 'erreur_pct']
+    if intervals.empty:
+        return pd.DataFrame(columns=columns)
+    hours = intervals.groupby(by + ['state'], observed=False)['duration_s'].sum().unstack('state')
+    hours = hours.reindex(columns=STATES, fill_value=0).fillna(0) / 3600
+    result = hours.rename(columns={s: f"{s}_h" for s in STATES})
+    result['observed_h'] = result[[f"{s}_h" for s in OBSERVED_STATES]].sum(axis=1)
+    result = result[result['observed_h'] > 0]
+    result['occupation_pct'] = result['busy_h'] / result['observed_h'] * 100
+    result['erreur_pct'] = result['error_h'] / result['observed_h'] * 100
+    result.columns.name = None
+    return result.reset_index()[columns]
+
+
+def lookback_start(start: Optional[datetime], max_hold: float = MAX_HOLD_SECONDS) -> Optional[datetime]:
+    """Premier instant dont les rapports peuvent encore décrire l'état au début de la période"""
+    return None if start is None else start - timedelta(seconds=max_hold)
@@ -0,0 +1,294 @@
+"""
+Backends d'exécution des requêtes des indicateurs
+MESIndicators n'a besoin que de query(requête, paramètres) -> DataFrame: le SQL des indicateurs
+peut donc tourner sur MariaDB (pool partagé) ou sur une base analytique embarquée (DuckDB/SQLite)
+construite à partir des tables MES4, sans charger la base de production qui pilote les automates
+"""
+
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from db_pool import MESConnectionPool, get_pool
+from mes_dump import MySQLDump
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+
+class MESBackend(ABC):
+    """Interface commune des backends (MariaDB, base embarquée)"""
+
+    name = 'backend'
+
+    @abstractmethod
+    def query(self, query: str, params: Optional[List] = None) -> pd.DataFrame:
+        """Exécute une requête au dialecte MariaDB (placeholders %s) et retourne un DataFrame"""
+
+    @abstractmethod
+    def execute(self, statement: str, params: Optional[List] = None):
+        """Exécute une instruction sans résultat"""
+
+    def ping(self) -> bool:
+        return True
+
+    def table_versions(self, tables: Iterable[str]) -> Optional[Dict[str, Hashable]]:
+        """Version courante de chaque table (cache des requêtes), None = à relever par des sondes SQL"""
+        return None
+
+    def close(self):
+        pass
+
+
+class MariaDBBackend(MESBackend):
+    """Base MES4 de production via le pool de connexions partagé"""
+
+    name = 'mariadb'
+
+    def __init__(self, db_config: Dict[str, str], pool_size: Optional[int] = None):
+        self.pool: MESConnectionPool = get_pool(db_config, pool_size)
+
+    def query(self, query: str, params: Optional[List] = None) -> pd.DataFrame:
+        return self.pool.query(query, params)
+
+    def execute(self, statement: str, params: Optional[List] = None):
+        self.pool.execute(statement, params)
+
+    def ping(self) -> bool:
+        return self.pool.ping()
+
+
+# ========== TRADUCTION DU DIALECTE MARIADB ==========
+
+# TIMESTAMPDIFF(unité, début, fin) avec des arguments simples (colonnes, paramètres)
+TIMESTAMPDIFF_RE = re.compile(r"TIMESTAMPDIFF\s*\(\s*(\w+)\s*,\s*([^,()]+?)\s*,\s*([^,()]+?)\s*\)", re.I)
+DATE_RE = re.compile(r"\bDATE\s*\(\s*([^()]+?)\s*\)", re.I)
+# Division par une constante entière: décimale sous MariaDB, entière sous SQLite
+INT_DIVISION_RE = re.compile(r"/\s*(\d+)\b(?!\.)")
+# Chaînes et identifiants quotés (laissés tels quels) ou mots
+TOKEN_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"[^\"]*\"|`[^`]*`|\b\w+\b", re.S)
+
+UNIT_SECONDS = {'SECOND': 1, 'MINUTE': 60, 'HOUR': 3600, 'DAY': 86400, 'WEEK': 604800}
+
+
+def translate_sql(query: str, engine: str, reserved: Iterable[str] = ()) -> str:
+    """
+    Traduit une requête des indicateurs (dialecte MariaDB) vers DuckDB ou SQLite
+
+    - placeholders %s -> ?
+    - TIMESTAMPDIFF(unité, a, b) -> date_diff (DuckDB) / julianday (SQLite)
+    - DATE(x) -> CAST(x AS DATE) (DuckDB)
+    - backquotes et noms de colonnes réservés (ex: End sous DuckDB) -> identifiants quotés
+    - division par une constante entière -> division décimale (SQLite)
+
+    Args:
+        query: Requête SQL MariaDB
+        engine: 'duckdb' ou 'sqlite'
+        reserved: Noms de colonnes qui sont des mots réservés du moteur cible
+    """
+    def timestampdiff(match):
+        unit, start, end = match.group(1).upper(), match.group(2), match.group(3)
+        if engine == 'duckdb':
+            return f"date_diff('{unit.lower()}', {start}, {end})"
+        # Nombre entier d'unités écoulées (troncature), comme MariaDB
+        seconds = f"ROUND((julianday({end}) - julianday({start})) * 86400)"
+        return f"CAST({seconds} / {UNIT_SECONDS.get(unit, 1)} AS INTEGER)"
+
+    query = query.replace('%s', '?')
+    if engine == 'sqlite':
+        query = INT_DIVISION_RE.sub(lambda m: f"/ {m.group(1)}.0", query)
+        return TIMESTAMPDIFF_RE.sub(timestampdiff, query)
+    query = TIMESTAMPDIFF_RE.sub(timestampdiff, query)
+
+    query = DATE_RE.sub(r"CAST(\1 AS DATE)", query)
+    reserved = {word.lower() for word in reserved}
+    case_depth = 0
+
+    def identifier(match):
+        nonlocal case_depth
+        token = match.group(0)
+        word = token.lower()
+        if token.startswith('`'):
+            return f'"{token[1:-1]}"'
+        if word == 'case':
+            case_depth += 1
+        elif word == 'end' and case_depth > 0 and not _expects_operand(match.string[:match.start()]):
+            case_depth -= 1
+        elif word in reserved:
+            return f'"{token}"'
+        return token
+
+    return TOKEN_RE.sub(identifier, query)
+
+
+# Mots et symboles après lesquels un END est une colonne et non la fin d'un CASE
+OPERAND_KEYWORDS = {'when', 'then', 'else', 'and', 'or', 'not', 'select', 'by', 'on', 'is', 'in', 'between'}
+
+
+def _expects_operand(before: str) -> bool:
+    before = before.rstrip()
+    if not before or before[-1] in '(,=<>+-*/':
+        return True
+    words = re.findall(r"\w+$", before)
+    return bool(words) and words[0].lower() in OPERAND_KEYWORDS
+
+
+def _sqlite_param(value):
+    """Dates au format texte de pandas.to_sql (comparaisons lexicographiques correctes)"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+class EmbeddedBackend(MESBackend):
+    """
+    Copie analytique locale des tables MES4 (DuckDB en priorité, SQLite sinon)
+    Les requêtes des indicateurs y tournent en processus, sur une copie en lecture seule
+    """
+
+    def __init__(self, engine: Optional[str] = None, database: str = ':memory:', read_only: bool = False):
+        """
+        Args:
+            engine: 'duckdb' ou 'sqlite' (défaut: duckdb s'il est installé)
+            database: Fichier de la base (':memory:' = en mémoire)
+            read_only: Ouvre une base existante en lecture seule
+        """
+        self.engine = engine or ('duckdb' if DUCKDB_AVAILABLE else 'sqlite')
+        if self.engine == 'duckdb' and not DUCKDB_AVAILABLE:
+            raise ImportError("duckdb n'est pas installé (pip install duckdb) - utiliser engine='sqlite'")
+        if self.engine not in ('duckdb', 'sqlite'):
+            raise ValueError(f"Moteur embarqué inconnu: {self.engine}")
+        self.name = self.engine
+        self.database = database
+        self._lock = threading.Lock()
+        if self.engine == 'duckdb':
+            self.conn = duckdb.connect(database, read_only=read_only and database != ':memory:')
+            self._reserved = set(self.conn.execute(
+                "SELECT keyword_name FROM duckdb_keywords() WHERE keyword_category = 'reserved'"
+            ).df()['keyword_name'].str.lower())
+        else:
+            uri = f"file:{database}?mode=ro" if read_only and database != ':memory:' else database
+            self.conn = sqlite3.connect(uri, uri=uri.startswith('file:'), check_same_thread=False)
+            self._reserved = set()
+        self._columns: set = set()
+        # Versions des tables pour le cache des requêtes: la copie ne change que par load_table
+        # et execute (une instruction quelconque peut écrire: toutes les tables changent de version)
+        self._versions: Dict[str, int] = {}
+        self._generation = 0
+        self._refresh_columns()
+
+    # ---------- Construction de la copie ----------
+
+    @classmethod
+    def from_tables(cls, tables: Dict[str, pd.DataFrame], engine: Optional[str] = None,
+                    database: str = ':memory:') -> 'EmbeddedBackend':
+        """Crée la base embarquée à partir de DataFrames (dump, cache Parquet, copie MariaDB)"""
+        backend = cls(engine, database)
+        for name, frame in tables.items():
+            backend.load_table(name, frame)
+        return backend
+
+    @classmethod
+    def from_dump(cls, dump_path: str, tables: Optional[Iterable[str]] = None,
+                  engine: Optional[str] = None, database: str = ':memory:') -> 'EmbeddedBackend':
+        """Crée la base embarquée depuis un dump mysqldump (voir mes_dump)"""
+        backend = cls(engine, database)
+        for name, frame in MySQLDump(dump_path).iter_tables(tables):
+            backend.load_table(name, frame)
+        return backend
+
+    @classmethod
+    def from_mariadb(cls, query_func: Callable[..., pd.DataFrame], tables: Iterable[str],
+                     engine: Optional[str] = None, database: str = ':memory:') -> 'EmbeddedBackend':
+        """Copie les tables demandées depuis MariaDB (une requête par table, hors des heures de pointe)"""
+        backend = cls(engine, database)
+        for name in tables:
+            frame = query_func(f"SELECT * FROM {name}")
+            if len(frame.columns) > 0:
+                backend.load_table(name, frame)
+        return backend
+
+    def load_table(self, name: str, frame: pd.DataFrame):
+        """Remplace une table de la copie locale par le contenu du DataFrame"""
+        with self._lock:
+            if self.engine == 'duckdb':
+                self.conn.register('_mes_frame', frame)
+                self.conn.execute(f'CREATE OR REPLACE TABLE "{name}" AS SELECT * FROM _mes_frame')
+                self.conn.unregister('_mes_frame')
+            else:
+                frame.to_sql(name, self.conn, if_exists='replace', index=False)
+            self._versions[name.lower()] = self._versions.get(name.lower(), 0) + 1
+        self._refresh_columns()
+
+    def _refresh_columns(self):
+        """Noms de colonnes connus (pour quoter ceux qui sont des mots réservés du moteur)"""
+        if self.engine != 'duckdb':
+            return
+        with self._lock:
+            names = self.conn.execute("SELECT DISTINCT column_name FROM duckdb_columns()").df()
+        self._columns = set(names['column_name'].str.lower())
+
+    def create_indexes(self, indexes: List[Tuple[str, str, str]]) -> List[str]:
+        """
+        Crée les index de période sur la copie locale (tables absentes ignorées)
+
+        Args:
+            indexes: liste de (table, nom_index, colonne), ex: MESIndicators.PERIOD_INDEXES
+        Returns: instructions exécutées
+        """
+        created = []
+        for table, name, column in indexes:
+            statement = f'CREATE INDEX IF NOT EXISTS {name} ON {table} ("{column}")'
+            try:
+                self.execute(statement)
+                created.append(statement)
+            except Exception:
+                continue
+        return created
+
+    # ---------- Exécution ----------
+
+    def translate(self, query: str) -> str:
+        return translate_sql(query, self.engine, self._reserved & self._columns)
+
+    def query(self, query: str, params: Optional[List] = None) -> pd.DataFrame:
+        sql = self.translate(query)
+        params = list(params or [])
+        with self._lock:
+            if self.engine == 'duckdb':
+                cursor = self.conn.execute(sql, params)
+                dates = [d[0] for d in cursor.description if str(d[1]) == 'DATE']
+                result = cursor.df()
+                # Colonnes DATE en objets date, comme le connecteur MariaDB (et non en Timestamp)
+                for column in dates:
+                    result[column] = result[column].dt.date
+                return result
+            return pd.read_sql(sql, self.conn, params=[_sqlite_param(p) for p in params])
+
+    def execute(self, statement: str, params: Optional[List] = None):
+        sql = self.translate(statement)
+        with self._lock:
+            self._generation += 1
+            if self.engine == 'duckdb':
+                self.conn.execute(sql, list(params or []))
+            else:
+                self.conn.execute(sql, [_sqlite_param(p) for p in params or []])
+                self.conn.commit()
+
+    def table_versions(self, tables: Iterable[str]) -> Optional[Dict[str, Hashable]]:
+        with self._lock:
+            return {table: (self._generation, self._versions.get(table.lower(), 0)) for table in tables}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,208 @@
+"""
+Lecture directe des dumps MariaDB de MES4 (mysqldump, ex: TELEFAN/FestoMES-2025-03-27.sql)
+Le fichier est parcouru ligne par ligne: les CREATE TABLE donnent les colonnes et leurs types,
+les INSERT INTO étendus sont convertis en DataFrames typés, sans démarrer MariaDB
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+
+# Type SQL (sans taille) -> famille de conversion pandas
+SQL_TYPE_FAMILIES = {
+    'tinyint': 'int', 'smallint': 'int', 'mediumint': 'int', 'int': 'int', 'integer': 'int',
+    'bigint': 'int', 'bit': 'int', 'year': 'int',
+    'float': 'float', 'double': 'float', 'real': 'float', 'decimal': 'float', 'numeric': 'float',
+    'datetime': 'datetime', 'timestamp': 'datetime', 'date': 'datetime',
+}
+
+CREATE_TABLE_RE = re.compile(r"^CREATE TABLE `([^`]+)`")
+COLUMN_RE = re.compile(r"^\s+`([^`]+)` (\w+)")
+# Clés de la DDL: PRIMARY KEY (...), UNIQUE KEY `nom` (...), KEY `nom` (...)
+INDEX_RE = re.compile(r"^\s+(PRIMARY|UNIQUE KEY `([^`]+)`|KEY `([^`]+)`)\s*(?:KEY\s*)?\((.+)\)")
+INSERT_RE = re.compile(r"^INSERT INTO `([^`]+)`(?: \(([^)]*)\))? VALUES ")
+# Valeurs d'un INSERT étendu: chaîne quotée, NULL/nombre, ou fin de ligne de valeurs
+VALUE_RE = re.compile(r"'((?:[^'\\]|\\.)*)'|([^,()'\s]+)|(\))", re.S)
+ESCAPE_RE = re.compile(r"\\(.)", re.S)
+ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+
+def _unescape(value: str) -> str:
+    """Décode les échappements mysqldump (\\' \\\\ \\n ...)"""
+    if '\\' not in value:
+        return value
+    return ESCAPE_RE.sub(lambda m: ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def parse_values(payload: str) -> List[List[Optional[str]]]:
+    """
+    Découpe la partie VALUES (...),(...) d'un INSERT en lignes de valeurs texte
+
+    Returns: liste de lignes (None pour NULL, les conversions de type sont faites par colonne)
+    """
+    rows = []
+    row: List[Optional[str]] = []
+    for match in VALUE_RE.finditer(payload):
+        quoted, bare, closing = match.groups()
+        if closing:
+            rows.append(row)
+            row = []
+        elif quoted is not None:
+            row.append(_unescape(quoted))
+        elif bare != ';':
+            row.append(None if bare == 'NULL' else bare)
+    return rows
+
+
+def _typed_frame(rows: List[List[Optional[str]]], columns: List[Tuple[str, str]],
+                 names: Optional[List[str]] = None) -> pd.DataFrame:
+    """Convertit les valeurs texte selon les types de la DDL"""
+    names = names or [name for name, _ in columns]
+    frame = pd.DataFrame(rows, columns=names, dtype=object)
+    families = dict(columns)
+    for name in names:
+        family = SQL_TYPE_FAMILIES.get(families.get(name, ''), 'str')
+        if family in ('int', 'float'):
+            # Comme pd.read_sql: entiers sans NULL -> int64, sinon float64
+            frame[name] = pd.to_numeric(frame[name])
+        elif family == 'datetime':
+            # Les dates '0000-00-00 ...' de MariaDB deviennent NaT
+            frame[name] = pd.to_datetime(frame[name], errors='coerce')
+    return frame
+
+
+class MySQLDump:
+    """Parseur en flux d'un fichier mysqldump (schéma + données)"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Chemin du fichier .sql
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Dump introuvable: {path}")
+        self.path = path
+        self.schemas: Dict[str, List[Tuple[str, str]]] = {}
+        # table -> [(nom de l'index, colonnes, unique)], renseigné pendant le parcours du dump
+        self.indexes: Dict[str, List[Tuple[str, List[str], bool]]] = {}
+
+    def _lines(self) -> Iterable[str]:
+        # utf-8-sig: les dumps exportés sous Windows commencent par un BOM
+        with open(self.path, encoding='utf-8-sig', errors='replace') as f:
+            yield from f
+
+    def iter_tables(self, tables: Optional[Iterable[str]] = None) -> Iterable[Tuple[str, pd.DataFrame]]:
+        """
+        Parcourt le dump et produit chaque table dès que ses données sont lues
+
+        Args:
+            tables: Tables à convertir (None = toutes). Les INSERT des autres tables ne sont pas parsés
+        Returns: itérateur de (nom_table, DataFrame typé)
+        """
+        wanted = {t.lower() for t in tables} if tables is not None else None
+        current = None
+        in_create = False
+        rows: List[List[Optional[str]]] = []
+        names: Optional[List[str]] = None
+
+        def flush():
+            if current is not None and (wanted is None or current.lower() in wanted):
+                return current, _typed_frame(rows, self.schemas.get(current, []), names)
+            return None
+
+        for line in self._lines():
+            if in_create:
+                column = COLUMN_RE.match(line)
+                key = INDEX_RE.match(line)
+                if column:
+                    self.schemas[current].append((column.group(1), column.group(2).lower()))
+                elif key:
+                    kind, unique_name, name, columns = key.groups()
+                    # Longueur de préfixe (`col`(10)) ignorée
+                    key_columns = [re.sub(r"\(\d+\)$", '', c.strip()).strip('`') for c in columns.split(',')]
+                    self.indexes[current].append(
+                        (unique_name or name or 'PRIMARY', key_columns, name is None))
+                elif line.startswith(')'):
+                    in_create = False
+                continue
+
+            create = CREATE_TABLE_RE.match(line)
+            if create:
+                result = flush()
+                if result:
+                    yield result
+                current, rows, names = create.group(1), [], None
+                self.schemas[current] = []
+                self.indexes[current] = []
+                in_create = True
+                continue
+
+            if line.startswith('INSERT INTO'):
+                insert = INSERT_RE.match(line)
+                if insert is None or (wanted is not None and insert.group(1).lower() not in wanted):
+                    continue
+                if insert.group(2):
+                    names = [c.strip().strip('`') for c in insert.group(2).split(',')]
+                rows.extend(parse_values(line[insert.end():]))
+
+        result = flush()
+        if result:
+            yield result
+
+    def read(self, tables: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Convertit le dump en DataFrames
+
+        Args:
+            tables: Tables à lire (None = toutes)
+        Returns: dict {nom_table: DataFrame} (tables vides incluses, avec leurs colonnes)
+        """
+        return dict(self.iter_tables(tables))
+
+    def to_parquet(self, out_dir: str, tables: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Écrit un fichier Parquet par table (une table en mémoire à la fois)
+
+        Returns: chemins des fichiers écrits
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        written = []
+        for table, frame in self.iter_tables(tables):
+            path = os.path.join(out_dir, f"{table}.parquet")
+            frame.to_parquet(path, index=False)
+            written.append(path)
+        return written
+
+
+class DumpBackend:
+    """Tables MES lues depuis un dump: remplace MariaDB pour le mode snapshot de MESIndicators"""
+
+    def __init__(self, path: str, tables: Optional[Iterable[str]] = None):
+        """
+        Args:
+            path: Dump .sql, ou dossier de fichiers Parquet produits par MySQLDump.to_parquet
+            tables: Tables à charger (None = toutes)
+        """
+        self.path = path
+        self.tables: Dict[str, pd.DataFrame] = {}
+        if os.path.isdir(path):
+            wanted = {t.lower() for t in tables} if tables is not None else None
+            for name in sorted(os.listdir(path)):
+                table = name[:-len('.parquet')]
+                if name.endswith('.parquet') and (wanted is None or table.lower() in wanted):
+                    self.tables[table] = pd.read_parquet(os.path.join(path, name))
+        else:
+            self.tables = MySQLDump(path).read(tables)
+        # MariaDB n'est pas sensible à la casse des noms de tables sous Windows
+        self._names = {name.lower(): name for name in self.tables}
+
+    def table(self, name: str) -> pd.DataFrame:
+        """Retourne une table du dump (DataFrame vide sans colonnes si absente, comme query_db en erreur)"""
+        key = self._names.get(name.lower())
+        return self.tables[key] if key is not None else pd.DataFrame()
+
+    def row_counts(self) -> Dict[str, int]:
+        return {name: len(frame) for name, frame in self.tables.items()}
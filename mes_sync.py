@@ -0,0 +1,225 @@
+"""
+Synchronisation incrémentale des tables MES dans un cache local Parquet
+Seules les lignes au-delà du watermark sont relues dans MariaDB à chaque rafraîchissement
+"""
+
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (moteur Parquet de pandas)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+class MESTableSync:
+    """Copie locale (Parquet) des tables MES qui ne changent plus une fois écrites"""
+
+    # Tables synchronisées: clé primaire et type de watermark
+    #   'ID'    -> max(ID) (AUTO_INCREMENT des tables de rapports)
+    #   'End'   -> max(End) des OF terminés (bornes incluses, dédoublonnage sur la clé)
+    #   'ONo'   -> étapes des OF récupérés lors de la même synchronisation
+    TABLES = {
+        'tblfinorder': {'key': ['ONo'], 'watermark': 'End'},
+        'tblfinstep': {'key': ['StepNo', 'ONo', 'OPos'], 'watermark': 'ONo'},
+        'tblmachinereport': {'key': ['ID'], 'watermark': 'ID'},
+        'tblpartsreport': {'key': ['ID'], 'watermark': 'ID'},
+    }
+
+    # Taille maximale d'une liste IN (...) envoyée à MariaDB
+    IN_CHUNK = 1000
+
+    def __init__(self, query_func: Callable[..., pd.DataFrame], cache_dir: str,
+                 compact_every: int = 20):
+        """
+        Args:
+            query_func: Fonction (requête, paramètres) -> DataFrame (ex: MESIndicators.query_db)
+            cache_dir: Dossier du cache local (un sous-dossier de fichiers Parquet par table)
+            compact_every: Nombre de fichiers incrémentaux au-delà duquel une table est compactée
+        """
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow est requis pour le cache local Parquet (pip install pyarrow)")
+        self.query_func = query_func
+        self.cache_dir = cache_dir
+        self.compact_every = compact_every
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.last_sync_rows: Dict[str, int] = {}
+
+    # ---------- Stockage local ----------
+
+    def _table_dir(self, table: str) -> str:
+        return os.path.join(self.cache_dir, table)
+
+    def _parts(self, table: str) -> List[str]:
+        folder = self._table_dir(table)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith('.parquet'))
+
+    def load(self, table: str) -> Optional[pd.DataFrame]:
+        """Relit la copie locale d'une table (None si jamais synchronisée)"""
+        if table not in self.frames:
+            parts = self._parts(table)
+            if not parts:
+                return None
+            frame = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+            self.frames[table] = self._deduplicate(table, frame)
+        return self.frames[table]
+
+    def _deduplicate(self, table: str, frame: pd.DataFrame) -> pd.DataFrame:
+        """Garde la dernière version de chaque ligne (bornes de watermark incluses)"""
+        key = [k for k in self.TABLES[table]['key'] if k in frame.columns]
+        if not key:
+            return frame
+        return frame.drop_duplicates(subset=key, keep='last').reset_index(drop=True)
+
+    def _append(self, table: str, new_rows: pd.DataFrame):
+        """Écrit les nouvelles lignes dans un fichier incrémental et met à jour la copie mémoire"""
+        folder = self._table_dir(table)
+        os.makedirs(folder, exist_ok=True)
+        new_rows.to_parquet(os.path.join(folder, f"part-{time.time_ns()}.parquet"), index=False)
+
+        current = self.frames.get(table)
+        combined = new_rows if current is None else pd.concat([current, new_rows], ignore_index=True)
+        self.frames[table] = self._deduplicate(table, combined)
+
+        parts = self._parts(table)
+        if len(parts) > self.compact_every:
+            self._compact(table, parts)
+
+    def _compact(self, table: str, parts: List[str]):
+        """Fusionne les fichiers incrémentaux d'une table en un seul fichier"""
+        target = os.path.join(self._table_dir(table), f"part-{time.time_ns()}.parquet")
+        self.frames[table].to_parquet(target, index=False)
+        for part in parts:
+            os.remove(part)
+
+    # ---------- Synchronisation ----------
+
+    @staticmethod
+    def _max(frame: Optional[pd.DataFrame], column: str, is_datetime: bool = False):
+        """Valeur maximale d'une colonne de la copie locale (None si vide)"""
+        if frame is None or frame.empty or column not in frame.columns:
+            return None
+        values = pd.to_datetime(frame[column]) if is_datetime else frame[column]
+        value = values.max()
+        if pd.isna(value):
+            return None
+        return value.to_pydatetime() if is_datetime else int(value)
+
+    def _fetch(self, table: str, new_orders: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """Récupère dans MariaDB les lignes au-delà du watermark local"""
+        local = self.load(table)
+        if local is None:
+            return self.query_func(f"SELECT * FROM {table}")
+
+        watermark = self.TABLES[table]['watermark']
+        if watermark == 'ID':
+            max_id = self._max(local, 'ID')
+            if max_id is None:
+                return self.query_func(f"SELECT * FROM {table}")
+            return self.query_func(f"SELECT * FROM {table} WHERE ID > %s", [max_id])
+
+        if watermark == 'End':
+            max_end = self._max(local, 'End', is_datetime=True)
+            if max_end is None:
+                return self.query_func(f"SELECT * FROM {table}")
+            # Les OF encore sans date de fin sont relus (ils sont peu nombreux), y compris ceux
+            # ouverts localement et terminés depuis avec une date antérieure au watermark
+            open_orders = [int(o) for o in local.loc[local['End'].isna(), 'ONo'].unique()]
+            if not open_orders:
+                return self.query_func(f"SELECT * FROM {table} WHERE End >= %s OR End IS NULL", [max_end])
+            # Première tranche de IN_CHUNK OF jointe à la requête du watermark, les suivantes relues à part
+            chunks = []
+            for i in range(0, len(open_orders), self.IN_CHUNK):
+                chunk = open_orders[i:i + self.IN_CHUNK]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                if i == 0:
+                    chunks.append(self.query_func(
+                        f"SELECT * FROM {table} WHERE End >= %s OR End IS NULL OR ONo IN ({placeholders})",
+                        [max_end] + chunk))
+                else:
+                    chunks.append(self.query_func(f"SELECT * FROM {table} WHERE ONo IN ({placeholders})", chunk))
+            # Requête du watermark en erreur: signalée telle quelle, la copie locale est conservée
+            if len(chunks[0].columns) == 0:
+                return chunks[0]
+            chunks = [c for c in chunks if len(c.columns) > 0]
+            # Un OF encore ouvert revient aussi par End IS NULL
+            return pd.concat(chunks, ignore_index=True).drop_duplicates(self.TABLES[table]['key'])
+
+        # Étapes: uniquement celles des OF récupérés pendant cette synchronisation
+        if new_orders is None or new_orders.empty or 'ONo' not in new_orders.columns:
+            return pd.DataFrame()
+        order_numbers = [int(o) for o in new_orders['ONo'].unique()]
+        chunks = []
+        for i in range(0, len(order_numbers), self.IN_CHUNK):
+            chunk = order_numbers[i:i + self.IN_CHUNK]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            chunks.append(self.query_func(f"SELECT * FROM {table} WHERE ONo IN ({placeholders})", chunk))
+        chunks = [c for c in chunks if len(c.columns) > 0]
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+    def _new_only(self, table: str, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Écarte les lignes déjà présentes localement (bornes incluses du watermark)
+        Les OF sans date de fin sont conservés: ils peuvent encore changer. Les étapes des OF relus
+        sont toutes conservées: elles remplacent leur version locale (une étape relue pendant son
+        exécution n'a pas encore de date de fin)
+        """
+        local = self.frames.get(table)
+        key = self.TABLES[table]['key']
+        watermark = self.TABLES[table]['watermark']
+        if (watermark == 'ONo' or local is None or local.empty or rows.empty
+                or not set(key) <= set(rows.columns)):
+            return rows
+        known = local
+        if watermark == 'End':
+            known = local[local['End'].notna()]
+        known_keys = pd.MultiIndex.from_frame(known[key])
+        return rows[~pd.MultiIndex.from_frame(rows[key]).isin(known_keys)]
+
+    def _changed(self, table: str, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Écarte les lignes relues identiques à leur version locale (OF encore ouverts, étapes
+        inchangées): un rafraîchissement sans changement n'écrit pas de fichier incrémental
+        """
+        local = self.frames.get(table)
+        key = self.TABLES[table]['key']
+        if local is None or local.empty or rows.empty or not set(key) <= set(rows.columns):
+            return rows
+        local = local[pd.MultiIndex.from_frame(local[key]).isin(pd.MultiIndex.from_frame(rows[key]))]
+        columns = [c for c in rows.columns if c in local.columns]
+        if local.empty or len(columns) < len(rows.columns):
+            return rows
+
+        def stamp(frame: pd.DataFrame) -> pd.Series:
+            # Comparaison sur le texte des valeurs: types relus (MariaDB) et relus du Parquet peuvent différer
+            return pd.util.hash_pandas_object(frame[columns].astype(str), index=False)
+
+        return rows[~stamp(rows).isin(stamp(local)).to_numpy()]
+
+    def refresh(self) -> Dict[str, pd.DataFrame]:
+        """
+        Synchronise toutes les tables (tblfinorder avant tblfinstep)
+
+        Returns: dict {nom_table: copie locale complète}
+        """
+        new_orders = None
+        for table in self.TABLES:
+            new_rows = self._new_only(table, self._fetch(table, new_orders))
+            if table == 'tblfinorder':
+                # Étapes relues pour tous les OF nouveaux ou encore ouverts, modifiés ou non
+                new_orders = new_rows
+            if self.TABLES[table]['watermark'] in ('End', 'ONo'):
+                new_rows = self._changed(table, new_rows)
+            self.last_sync_rows[table] = len(new_rows)
+            # Un DataFrame sans colonnes signale une requête en erreur: la copie locale est conservée
+            if len(new_rows.columns) > 0 and not new_rows.empty:
+                self._append(table, new_rows)
+            elif table not in self.frames and len(new_rows.columns) > 0:
+                self.frames[table] = new_rows
+        return {table: self.frames[table] for table in self.TABLES if table in self.frames}
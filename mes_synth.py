@@ -0,0 +1,656 @@
+"""
+Générateur de données synthétiques MES4 + Robotino pour les tests de charge
+Les distributions (arrivée des OF, gammes, durées d'étapes, erreurs machine, décharge de la
+batterie, déplacements du robot) sont ajustées sur les fichiers réels (dump MES4 et
+robotino_data.csv), puis échantillonnées de façon vectorisée: plusieurs mois d'historique
+en quelques secondes, avec des clés ONo/OPos/ResourceID cohérentes entre les tables
+
+Usage:
+    python mes_synth.py --start 2025-01-06 --days 90 --orders-per-day 40 --format sql --out synth.sql
+    python mes_synth.py --days 30 --format parquet --out TELEFAN/synth --robot-out TELEFAN/synth/robot.csv
+"""
+
+import argparse
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from mes_dump import MySQLDump
+
+
+DUMP_PATH = 'TELEFAN/FestoMES-2025-03-27.sql'
+CSV_ROBOT_PATH = 'TELEFAN/robotino_data.csv'
+
+# Tables générées (historique) et tables recopiées du dump (référentiel, état du magasin)
+GENERATED_TABLES = ['tblfinorder', 'tblfinorderpos', 'tblfinstep', 'tblmachinereport',
+                    'tblpartsreport', 'tblbufferpos']
+REFERENCE_TABLES = ['tblboxpos', 'tblbuffer', 'tblresource', 'tblerrorcodes']
+
+ROBOT_OUTPUT_COLUMNS = ['timestamp', 'device_potAccuChargeState_centiPercent',
+                        'festool_charger_capacities_0', 'festool_charger_capacities_1',
+                        'power_voltage', 'power_ext_power', 'power_output_current',
+                        'odometry_x', 'odometry_y', 'odometry_phi', 'odometry_vx', 'odometry_vy',
+                        'odometry_omega', 'odometry_seq']
+
+# Bornes de la décharge ajustée (%/h): le log réel ne couvre que quelques minutes
+# et les capacités du chargeur Festool y varient par paliers
+DEFAULT_DISCHARGE_PER_HOUR = 12.0
+DISCHARGE_BOUNDS = (2.0, 30.0)
+# Seuil de retour à la station de charge (%)
+RECHARGE_THRESHOLD = 20.0
+
+# Types MariaDB utilisés pour recréer les tables dans le fichier .sql généré
+SQL_DDL_TYPES = {'int': 'int(11)', 'tinyint': 'tinyint(4)', 'smallint': 'smallint(6)',
+                 'bigint': 'bigint(20)', 'varchar': 'varchar(255)', 'timestamp': 'timestamp NULL'}
+SQL_ROWS_PER_INSERT = 1000
+
+
+@dataclass
+class LogNormal:
+    """Loi d'une durée (s): part de zéros, puis log-normale bornée"""
+    p_zero: float = 0.0
+    mu: float = 0.0
+    sigma: float = 1.0
+    cap: float = 3600.0
+
+    @classmethod
+    def fit(cls, seconds: pd.Series, default: Optional['LogNormal'] = None) -> 'LogNormal':
+        values = seconds.dropna().clip(lower=0).to_numpy(dtype='float64')
+        positive = values[values > 0]
+        if len(positive) < 2:
+            return default or cls()
+        logs = np.log(positive)
+        return cls(p_zero=float((values == 0).mean()), mu=float(logs.mean()),
+                   sigma=float(max(logs.std(), 0.05)), cap=float(np.quantile(positive, 0.99)))
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        values = np.exp(self.mu + self.sigma * rng.standard_normal(n)).clip(max=self.cap)
+        values[rng.random(n) < self.p_zero] = 0.0
+        return values
+
+
+def _pmf(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Loi empirique (valeurs, probabilités)"""
+    counts = values.dropna().value_counts()
+    if counts.empty:
+        return np.array([0]), np.array([1.0])
+    return counts.index.to_numpy(), (counts / counts.sum()).to_numpy()
+
+
+def _gather(starts: np.ndarray, lengths: np.ndarray, picks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lignes des modèles tirés, concaténées sans boucle Python
+
+    Args:
+        starts, lengths: Première ligne et nombre de lignes de chaque modèle
+        picks: Modèle tiré pour chaque nouvel objet
+    Returns: (indices des lignes des modèles, n° de l'objet auquel appartient chaque ligne)
+    """
+    counts = lengths[picks]
+    owner = np.repeat(np.arange(len(picks)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts[picks], counts) + offset, owner
+
+
+def _group_bounds(keys: np.ndarray, groups: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Première ligne et nombre de lignes de chaque groupe (keys triées)"""
+    starts = np.searchsorted(keys, groups, side='left')
+    return starts, np.searchsorted(keys, groups, side='right') - starts
+
+
+@dataclass
+class SyntheticProfile:
+    """Distributions ajustées sur les fichiers réels (voir fit_profile)"""
+    # Modèles d'OF: OF réels avec leurs postes et leurs étapes (gammes réelles)
+    orders: pd.DataFrame
+    positions: pd.DataFrame
+    steps: pd.DataFrame
+    # Arrivée des OF
+    orders_per_day: float
+    hour_pmf: np.ndarray
+    weekday_factor: np.ndarray
+    lead: LogNormal
+    planned_duration: float
+    # Durées d'étapes par ressource et attentes entre étapes
+    step_durations: Dict[int, LogNormal]
+    default_duration: LogNormal
+    step_gap: LogNormal
+    # Rapports machine et pièces
+    machine_resources: np.ndarray
+    machine_error_rate: float
+    error_level_pmf: Tuple[np.ndarray, np.ndarray]
+    downtime: LogNormal
+    parts_resources: np.ndarray
+    parts_error_rate: Dict[int, float]
+    parts_error_pmf: Tuple[np.ndarray, np.ndarray]
+    # Magasin
+    buffer_layout: pd.DataFrame
+    occupancy_by_zone: Dict[int, float]
+    pno_pmf: Tuple[np.ndarray, np.ndarray]
+    quantity_pmf: Tuple[np.ndarray, np.ndarray]
+    # Robot
+    robot_period: float = 0.38
+    discharge_per_hour: float = DEFAULT_DISCHARGE_PER_HOUR
+    voltage_fit: Tuple[float, float] = (0.0, 18.8)
+    moving_share: float = 0.3
+    speed: LogNormal = field(default_factory=lambda: LogNormal(0.0, np.log(0.3), 0.5, 0.5))
+    segment_seconds: float = 5.0
+    current_moving: Tuple[float, float] = (0.25, 0.025)
+    current_idle: Tuple[float, float] = (0.29, 0.015)
+    odometry_bounds: Tuple[float, float, float, float] = (-6.0, 1.0, 0.0, 4.5)
+    # Tables recopiées telles quelles et schémas (pour l'export SQL)
+    reference: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    schemas: Dict[str, List[Tuple[str, str]]] = field(default_factory=dict)
+
+
+def _fit_robot(csv_path: str) -> Dict:
+    """Paramètres du robot ajustés sur robotino_data.csv (colonnes utiles seulement)"""
+    wanted = {'timestamp', 'festool_charger_capacities_0', 'festool_charger_capacities_1', 'power_voltage',
+              'power_output_current', 'odometry_x', 'odometry_y', 'odometry_vx', 'odometry_vy'}
+    robot = pd.read_csv(csv_path, usecols=lambda c: c in wanted)
+    robot['timestamp'] = pd.to_datetime(robot['timestamp'], format='ISO8601', errors='coerce')
+    robot = robot.dropna(subset=['timestamp']).sort_values('timestamp')
+    fitted = {}
+    seconds = robot['timestamp'].diff().dt.total_seconds()
+    if seconds.notna().any():
+        fitted['robot_period'] = float(seconds.median())
+
+    capacities = [c for c in ('festool_charger_capacities_0', 'festool_charger_capacities_1') if c in robot]
+    if capacities:
+        level = robot[capacities].mean(axis=1)
+        hours = (robot['timestamp'] - robot['timestamp'].iloc[0]).dt.total_seconds() / 3600
+        valid = level.notna()
+        if valid.sum() > 2 and hours[valid].max() > 0:
+            slope = np.polyfit(hours[valid], level[valid], 1)[0]
+            fitted['discharge_per_hour'] = float(np.clip(-slope, *DISCHARGE_BOUNDS)) if slope < 0 \
+                else DEFAULT_DISCHARGE_PER_HOUR
+        if 'power_voltage' in robot:
+            valid &= robot['power_voltage'].notna()
+            if valid.sum() > 2 and level[valid].std() > 0:
+                slope, intercept = np.polyfit(level[valid], robot['power_voltage'][valid], 1)
+                fitted['voltage_fit'] = (float(slope), float(intercept))
+
+    if {'odometry_vx', 'odometry_vy'} <= set(robot.columns):
+        speed = np.hypot(robot['odometry_vx'], robot['odometry_vy'])
+        moving = speed > 0.01
+        fitted['moving_share'] = float(moving.mean())
+        fitted['speed'] = LogNormal.fit(speed[moving])
+        runs = (moving != moving.shift()).cumsum()
+        durations = robot.groupby(runs)['timestamp'].agg(lambda t: (t.iloc[-1] - t.iloc[0]).total_seconds())
+        fitted['segment_seconds'] = float(max(durations.mean(), 1.0))
+        if 'power_output_current' in robot:
+            current = robot['power_output_current']
+            fitted['current_moving'] = (float(current[moving].mean()), float(current[moving].std()))
+            fitted['current_idle'] = (float(current[~moving].mean()), float(current[~moving].std()))
+        fitted['odometry_bounds'] = (float(robot['odometry_x'].min()), float(robot['odometry_x'].max()),
+                                     float(robot['odometry_y'].min()), float(robot['odometry_y'].max()))
+    return fitted
+
+
+def fit_profile(dump_path: str = DUMP_PATH, csv_robot_path: Optional[str] = CSV_ROBOT_PATH) -> SyntheticProfile:
+    """
+    Ajuste les distributions du générateur sur les fichiers réels
+
+    Args:
+        dump_path: Dump MES4 (mysqldump)
+        csv_robot_path: Log Robotino (None = paramètres robot par défaut)
+    Returns: SyntheticProfile
+    """
+    dump = MySQLDump(dump_path)
+    tables = dump.read(GENERATED_TABLES + REFERENCE_TABLES)
+
+    orders = tables['tblfinorder'].sort_values('ONo', kind='stable').reset_index(drop=True)
+    positions = tables['tblfinorderpos'].sort_values(['ONo', 'OPos'], kind='stable').reset_index(drop=True)
+    steps = tables['tblfinstep'].sort_values(['ONo', 'OPos', 'Start', 'StepNo'], kind='stable',
+                                             na_position='last').reset_index(drop=True)
+    started = orders['Start'].dropna()
+
+    # Arrivées: OF par jour actif, heure de lancement, jour de semaine
+    per_day = started.groupby(started.dt.normalize()).size()
+    hours = np.bincount(started.dt.hour, minlength=24).astype('float64')
+    weekdays = np.bincount(started.dt.weekday, minlength=7).astype('float64')
+
+    # Durées d'étapes par ressource, attentes entre étapes d'un même poste
+    executed = steps.dropna(subset=['Start', 'End'])
+    duration = (executed['End'] - executed['Start']).dt.total_seconds()
+    default_duration = LogNormal.fit(duration)
+    step_durations = {int(resource): LogNormal.fit(values, default_duration)
+                      for resource, values in duration.groupby(executed['ResourceID'])}
+    same_position = (executed['ONo'] == executed['ONo'].shift()) & (executed['OPos'] == executed['OPos'].shift())
+    gaps = (executed['Start'] - executed['End'].shift()).dt.total_seconds()[same_position]
+
+    # Rapports machine: erreurs (fronts montants) rapportées aux démarrages de cycle
+    report = tables['tblmachinereport'].sort_values(['ResourceID', 'TimeStamp'], kind='stable')
+    error = report[['ErrorL0', 'ErrorL1', 'ErrorL2']].to_numpy() > 0
+    any_error = pd.Series(error.any(axis=1), index=report.index)
+    new_resource = report['ResourceID'] != report['ResourceID'].shift()
+    rising = any_error & (~any_error.shift(fill_value=False) | new_resource)
+    busy = report['Busy'] > 0
+    busy_rising = busy & (~busy.shift(fill_value=False) | new_resource)
+    cleared_at = report['TimeStamp'].where(~any_error).groupby(report['ResourceID']).bfill()
+    downtime = (cleared_at - report['TimeStamp']).dt.total_seconds()[rising]
+    levels = np.argmax(error[rising.to_numpy()], axis=1) if rising.any() else np.array([0])
+
+    parts = tables['tblpartsreport']
+    parts_error = parts['ErrorID'] != 0
+
+    # Magasin: disposition réelle, taux d'occupation par zone
+    buffer = tables['tblbufferpos']
+    occupied = buffer['PNo'] != 0
+
+    profile = SyntheticProfile(
+        orders=orders, positions=positions, steps=steps,
+        orders_per_day=float(per_day.mean()) if len(per_day) else 1.0,
+        hour_pmf=hours / hours.sum() if hours.sum() else np.full(24, 1 / 24),
+        weekday_factor=7 * weekdays / weekdays.sum() if weekdays.sum() else np.ones(7),
+        lead=LogNormal.fit((orders['Start'] - orders['PlannedStart']).dt.total_seconds()),
+        planned_duration=float((orders['PlannedEnd'] - orders['PlannedStart']).dt.total_seconds().median()),
+        step_durations=step_durations, default_duration=default_duration,
+        step_gap=LogNormal.fit(gaps),
+        machine_resources=np.sort(report['ResourceID'].unique()),
+        machine_error_rate=float(min(rising.sum() / max(busy_rising.sum(), 1), 1.0)),
+        error_level_pmf=_pmf(pd.Series(levels)),
+        downtime=LogNormal.fit(downtime),
+        parts_resources=np.sort(parts['ResourceID'].unique()),
+        parts_error_rate=parts_error.groupby(parts['ResourceID']).mean().to_dict(),
+        parts_error_pmf=_pmf(parts.loc[parts_error, 'ErrorID']),
+        buffer_layout=buffer,
+        occupancy_by_zone=occupied.groupby(buffer['Zone']).mean().to_dict(),
+        pno_pmf=_pmf(buffer.loc[occupied, 'PNo']),
+        quantity_pmf=_pmf(buffer.loc[occupied, 'Quantity']),
+        reference={name: tables[name] for name in REFERENCE_TABLES if name in tables},
+        schemas=dict(dump.schemas),
+    )
+    if csv_robot_path and os.path.exists(csv_robot_path):
+        for name, value in _fit_robot(csv_robot_path).items():
+            setattr(profile, name, value)
+    return profile
+
+
+class MESDataGenerator:
+    """Échantillonne des tables MES4 et un log Robotino à partir d'un SyntheticProfile"""
+
+    def __init__(self, profile: SyntheticProfile, seed: Optional[int] = None,
+                 orders_per_day: Optional[float] = None, first_ono: int = 1):
+        """
+        Args:
+            profile: Distributions ajustées (fit_profile)
+            seed: Graine du générateur aléatoire (jeu de données reproductible)
+            orders_per_day: Charge de la ligne (défaut: moyenne réelle des jours actifs)
+            first_ono: Premier numéro d'OF généré
+        """
+        self.profile = profile
+        self.rng = np.random.default_rng(seed)
+        self.orders_per_day = orders_per_day or profile.orders_per_day
+        self.first_ono = first_ono
+        p = profile
+        self._order_keys = p.orders['ONo'].to_numpy()
+        self._position_bounds = _group_bounds(p.positions['ONo'].to_numpy(), self._order_keys)
+        self._step_bounds = _group_bounds(p.steps['ONo'].to_numpy(), self._order_keys)
+
+    # ---------- OF, postes et étapes ----------
+
+    def _arrivals(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DatetimeIndex:
+        """Instants de lancement des OF: Poisson par jour, heure et jour de semaine réels"""
+        days = pd.date_range(start.normalize(), end, freq='D', inclusive='left')
+        rates = self.orders_per_day * self.profile.weekday_factor[days.weekday]
+        counts = self.rng.poisson(rates)
+        day = np.repeat(days.to_numpy(), counts)
+        hour = self.rng.choice(24, size=counts.sum(), p=self.profile.hour_pmf)
+        seconds = hour * 3600 + self.rng.integers(0, 3600, size=counts.sum())
+        arrivals = pd.DatetimeIndex(day + pd.to_timedelta(seconds, unit='s')).sort_values()
+        return arrivals[(arrivals >= start) & (arrivals < end)]
+
+    def _sample_durations(self, resources: np.ndarray) -> np.ndarray:
+        durations = np.empty(len(resources))
+        for resource in np.unique(resources):
+            mask = resources == resource
+            model = self.profile.step_durations.get(int(resource), self.profile.default_duration)
+            durations[mask] = model.sample(self.rng, int(mask.sum()))
+        return durations
+
+    def generate_orders(self, start, end) -> Dict[str, pd.DataFrame]:
+        """
+        OF terminés sur [start, end[ avec leurs postes et leurs étapes
+
+        Chaque OF reprend la gamme d'un OF réel tiré au hasard (postes, étapes, ressources,
+        étapes non exécutées); les durées et les attentes sont retirées selon les lois ajustées
+        Returns: {'tblfinorder', 'tblfinorderpos', 'tblfinstep'}
+        """
+        p = self.profile
+        arrivals = self._arrivals(pd.Timestamp(start), pd.Timestamp(end))
+        n_orders = len(arrivals)
+        picks = self.rng.integers(0, len(p.orders), size=n_orders)
+        onos = np.arange(self.first_ono, self.first_ono + n_orders)
+        self.first_ono += n_orders
+        planned_start = arrivals.to_numpy()
+
+        # Étapes: exécutées en séquence, la première après le délai de lancement de l'OF
+        rows, owner = _gather(*self._step_bounds, picks)
+        steps = p.steps.iloc[rows].reset_index(drop=True)
+        executed = steps['Start'].notna().to_numpy()
+        duration = np.where(executed, self._sample_durations(steps['ResourceID'].to_numpy()), 0.0)
+        gap = np.where(executed, p.step_gap.sample(self.rng, len(steps)), 0.0)
+        first = executed & (pd.Series(executed).groupby(owner).cumsum().to_numpy() == 1)
+        gap[first] = p.lead.sample(self.rng, int(first.sum()))
+        # Cumul par OF: cumul global moins le cumul à la fin de l'OF précédent
+        totals = np.concatenate([[0.0], np.cumsum(gap + duration)])
+        counts = np.bincount(owner, minlength=n_orders)
+        base = np.repeat(totals[np.cumsum(counts) - counts], counts)
+        step_end = planned_start[owner] + pd.to_timedelta(totals[1:] - base, unit='s').to_numpy()
+        step_start = step_end - pd.to_timedelta(duration, unit='s').to_numpy()
+        steps['ONo'] = onos[owner]
+        steps['Start'] = pd.Series(step_start).where(executed).dt.round('s')
+        steps['End'] = pd.Series(step_end).where(executed).dt.round('s')
+
+        # OF: début = première étape exécutée, fin = dernière
+        lead = pd.to_timedelta(p.lead.sample(self.rng, n_orders), unit='s')
+        by_order = pd.DataFrame({'owner': owner, 'Start': steps['Start'], 'End': steps['End']}) \
+            .groupby('owner').agg(Start=('Start', 'min'), End=('End', 'max')).reindex(np.arange(n_orders))
+        order_start = by_order['Start'].fillna(pd.Series(planned_start + lead.to_numpy()).dt.round('s'))
+        order_end = by_order['End'].fillna(order_start + pd.Timedelta(seconds=max(p.planned_duration, 1)))
+        orders = p.orders.iloc[picks].reset_index(drop=True)
+        orders['ONo'] = onos
+        orders['PlannedStart'] = pd.Series(planned_start).dt.round('s')
+        orders['PlannedEnd'] = orders['PlannedStart'] + pd.Timedelta(seconds=p.planned_duration)
+        orders['Start'] = order_start.to_numpy()
+        orders['End'] = order_end.to_numpy()
+        orders['Release'] = pd.NaT
+
+        # Postes: mêmes OPos que le modèle, bornés par leurs étapes
+        rows, position_owner = _gather(*self._position_bounds, picks)
+        positions = p.positions.iloc[rows].reset_index(drop=True)
+        positions['ONo'] = onos[position_owner]
+        span = steps.groupby(['ONo', 'OPos']).agg(first=('Start', 'min'), last=('End', 'max'))
+        span = span.reindex(pd.MultiIndex.from_frame(positions[['ONo', 'OPos']]))
+        positions['PlannedStart'] = orders['PlannedStart'].to_numpy()[position_owner]
+        positions['PlannedEnd'] = orders['PlannedEnd'].to_numpy()[position_owner]
+        positions['Start'] = pd.Series(span['first'].to_numpy()).where(positions['Start'].notna())
+        positions['End'] = pd.Series(span['last'].to_numpy()).fillna(pd.Series(order_end.to_numpy()[position_owner]))
+        steps['PlannedStart'] = orders['PlannedStart'].to_numpy()[owner]
+        steps['PlannedEnd'] = orders['PlannedEnd'].to_numpy()[owner]
+        return {'tblfinorder': orders, 'tblfinorderpos': positions, 'tblfinstep': steps}
+
+    # ---------- Rapports machine et pièces ----------
+
+    def machine_report(self, steps: pd.DataFrame) -> pd.DataFrame:
+        """
+        Événements des automates déduits des étapes: Busy à 1 au début, à 0 à la fin,
+        erreur (ErrorL0/L1/L2) en fin d'étape au taux réel, effacée après la durée d'arrêt
+        """
+        p = self.profile
+        done = steps.dropna(subset=['Start', 'End'])
+        done = done[np.isin(done['ResourceID'], p.machine_resources)]
+        n = len(done)
+        failed = self.rng.random(n) < p.machine_error_rate
+        level = self.rng.choice(p.error_level_pmf[0], size=int(failed.sum()), p=p.error_level_pmf[1])
+        resource = done['ResourceID'].to_numpy()
+
+        def events(timestamps, busy, errors=None):
+            frame = pd.DataFrame({'ResourceID': timestamps[0], 'TimeStamp': timestamps[1],
+                                  'AutomaticMode': 1, 'ManualMode': 0, 'Busy': busy, 'Reset': 0,
+                                  'ErrorL0': 0, 'ErrorL1': 0, 'ErrorL2': 0})
+            if errors is not None:
+                for i, column in enumerate(['ErrorL0', 'ErrorL1', 'ErrorL2']):
+                    frame[column] = (errors == i).astype('int64')
+            return frame
+
+        cleared = done['End'].to_numpy()[failed] + pd.to_timedelta(
+            p.downtime.sample(self.rng, int(failed.sum())), unit='s').round('s').to_numpy()
+        errors = np.full(n, -1)
+        errors[failed] = level
+        report = pd.concat([
+            events((resource, done['Start'].to_numpy()), 1),
+            events((resource, done['End'].to_numpy()), 0, errors=errors),
+            events((resource[failed], cleared), 0),
+        ], ignore_index=True).sort_values(['TimeStamp', 'ResourceID'], kind='stable').reset_index(drop=True)
+        report['ID'] = np.arange(1, len(report) + 1)
+        return report
+
+    def parts_report(self, steps: pd.DataFrame, positions: pd.DataFrame) -> pd.DataFrame:
+        """Une pièce par étape terminée sur les postes qui rapportent, ErrorID au taux réel par ressource"""
+        p = self.profile
+        done = steps.dropna(subset=['End'])
+        done = done[np.isin(done['ResourceID'], p.parts_resources)]
+        pno = positions.set_index(['ONo', 'OPos'])['PNo']
+        pno = pno[~pno.index.duplicated()].reindex(pd.MultiIndex.from_frame(done[['ONo', 'OPos']]))
+        rate = done['ResourceID'].map(p.parts_error_rate).fillna(0).to_numpy()
+        failed = self.rng.random(len(done)) < rate
+        error_id = np.zeros(len(done), dtype='int64')
+        error_id[failed] = self.rng.choice(p.parts_error_pmf[0], size=int(failed.sum()), p=p.parts_error_pmf[1])
+        report = pd.DataFrame({'ResourceID': done['ResourceID'].to_numpy(), 'TimeStamp': done['End'].to_numpy(),
+                               'PNo': pno.fillna(0).astype('int64').to_numpy(), 'ErrorID': error_id})
+        report = report.sort_values('TimeStamp', kind='stable').reset_index(drop=True)
+        report['ID'] = np.arange(1, len(report) + 1)
+        return report
+
+    def buffer_positions(self, start, end) -> pd.DataFrame:
+        """État du magasin en fin de période: disposition réelle, occupation par zone tirée"""
+        p = self.profile
+        buffer = p.buffer_layout.copy()
+        rate = buffer['Zone'].map(p.occupancy_by_zone).fillna(0).to_numpy()
+        occupied = self.rng.random(len(buffer)) < rate
+        n = int(occupied.sum())
+        buffer['PNo'] = 0
+        buffer.loc[occupied, 'PNo'] = self.rng.choice(p.pno_pmf[0], size=n, p=p.pno_pmf[1])
+        buffer['Quantity'] = 0
+        buffer.loc[occupied, 'Quantity'] = self.rng.choice(p.quantity_pmf[0], size=n, p=p.quantity_pmf[1])
+        # Emplacements à caisse: caisses distinctes du référentiel tblboxpos (BoxID existants uniquement)
+        boxes = p.reference.get('tblboxpos', pd.DataFrame({'BoxId': []}))['BoxId'].unique()
+        slots = np.flatnonzero(occupied & (buffer['BoxID'].to_numpy() != 0))[:len(boxes)]
+        buffer['BoxID'] = 0
+        buffer.loc[buffer.index[slots], 'BoxID'] = self.rng.permutation(boxes)[:len(slots)]
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        seconds = self.rng.integers(0, max(int((end - start).total_seconds()), 1), size=len(buffer))
+        buffer['TimeStamp'] = (start + pd.to_timedelta(seconds, unit='s')).to_numpy()
+        return buffer
+
+    def generate(self, start, end) -> Dict[str, pd.DataFrame]:
+        """
+        Jeu complet de tables MES4 sur [start, end[
+
+        Returns: {nom_table: DataFrame} (tables générées + tables de référence du dump)
+        """
+        tables = self.generate_orders(start, end)
+        tables['tblmachinereport'] = self.machine_report(tables['tblfinstep'])
+        tables['tblpartsreport'] = self.parts_report(tables['tblfinstep'], tables['tblfinorderpos'])
+        tables['tblbufferpos'] = self.buffer_positions(start, end)
+        tables.update(self.profile.reference)
+        return tables
+
+    # ---------- Robot ----------
+
+    def iter_robot(self, start, end, first_hour: int = 6, last_hour: int = 22,
+                   period: Optional[float] = None) -> Iterator[pd.DataFrame]:
+        """
+        Télémétrie Robotino sur [start, end[, un DataFrame par jour de fonctionnement
+        (à la période réelle, un mois représente plusieurs millions de mesures)
+
+        - batterie en dents de scie: décharge ajustée, recharge au seuil RECHARGE_THRESHOLD
+        - déplacements par segments (arrêt / mouvement) à la vitesse réelle, odométrie
+          remise à zéro chaque jour (redémarrage du robot)
+
+        Args:
+            first_hour, last_hour: Heures de fonctionnement du robot
+            period: Période d'échantillonnage (s), défaut: période réelle
+        Returns: itérateur de DataFrames aux colonnes de robotino_data.csv (ROBOT_OUTPUT_COLUMNS)
+        """
+        p = self.profile
+        period = period or p.robot_period
+        n = int((last_hour - first_hour) * 3600 / period)
+        if n == 0:
+            return
+        for day in pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end), freq='D', inclusive='left'):
+            elapsed = np.arange(n) * period + self.rng.uniform(-0.1, 0.1, n) * period
+            elapsed[0] = 0.0
+            timestamp = day.to_datetime64() + pd.to_timedelta(first_hour * 3600 + elapsed, unit='s').to_numpy()
+
+            # Batterie: pleine au démarrage, recharge instantanée au seuil
+            level = 100.0 - np.mod(elapsed / 3600 * p.discharge_per_hour, 100.0 - RECHARGE_THRESHOLD)
+            capacities = [np.clip(np.round(level + self.rng.normal(0, 1, n)), 0, 100) for _ in range(2)]
+
+            # Segments de mouvement / arrêt de durée exponentielle
+            new_segment = self.rng.random(n) < period / p.segment_seconds
+            new_segment[0] = True
+            segment = np.cumsum(new_segment) - 1
+            n_segments = segment[-1] + 1
+            moving = (self.rng.random(n_segments) < p.moving_share)[segment]
+            speed = np.where(moving, p.speed.sample(self.rng, n_segments)[segment], 0.0)
+            heading = self.rng.uniform(-np.pi, np.pi, n_segments)[segment]
+            dt = np.diff(elapsed, prepend=0.0)
+
+            # Odométrie: cumul des déplacements, repliée dans l'emprise réelle
+            x0, x1, y0, y1 = p.odometry_bounds
+            x = _fold(np.cumsum(speed * np.cos(heading) * dt), x0, x1)
+            y = _fold(np.cumsum(speed * np.sin(heading) * dt), y0, y1)
+            current = np.where(moving, self.rng.normal(*p.current_moving, n),
+                               self.rng.normal(*p.current_idle, n))
+
+            yield pd.DataFrame({
+                'timestamp': timestamp,
+                'device_potAccuChargeState_centiPercent': np.round(level * 100),
+                'festool_charger_capacities_0': capacities[0].astype('int64'),
+                'festool_charger_capacities_1': capacities[1].astype('int64'),
+                'power_voltage': np.round(p.voltage_fit[0] * level + p.voltage_fit[1], 3),
+                'power_ext_power': False,
+                'power_output_current': current.clip(min=0),
+                'odometry_x': x, 'odometry_y': y, 'odometry_phi': heading,
+                'odometry_vx': speed, 'odometry_vy': 0.0, 'odometry_omega': 0.0,
+                'odometry_seq': np.arange(1, n + 1),
+            })
+
+    def generate_robot(self, start, end, **options) -> pd.DataFrame:
+        """Télémétrie Robotino sur [start, end[ en un seul DataFrame (voir iter_robot)"""
+        days = list(self.iter_robot(start, end, **options))
+        return pd.concat(days, ignore_index=True) if days else pd.DataFrame(columns=ROBOT_OUTPUT_COLUMNS)
+
+
+def _fold(values: np.ndarray, low: float, high: float) -> np.ndarray:
+    """Replie une trajectoire dans [low, high] (rebond sur les bords, longueur des pas conservée)"""
+    width = max(high - low, 1e-6)
+    values = np.mod(values - low, 2 * width)
+    return low + np.where(values > width, 2 * width - values, values)
+
+
+# ========== EXPORT ==========
+
+def _sql_column(values: pd.Series) -> pd.Series:
+    """Littéraux SQL d'une colonne (NULL, nombres, dates et chaînes échappées)"""
+    missing = values.isna()
+    if pd.api.types.is_datetime64_any_dtype(values):
+        text = "'" + values.dt.strftime('%Y-%m-%d %H:%M:%S') + "'"
+    elif pd.api.types.is_bool_dtype(values):
+        text = values.astype('int64').astype(str)
+    elif pd.api.types.is_numeric_dtype(values):
+        text = values.astype(str)
+    else:
+        text = "'" + values.astype(str).str.replace(r"[\\'\n\r\t\x00]",
+                                                  lambda m: {'\n': '\\n', '\r': '\\r', '\t': '\\t',
+                                                             '\x00': '\\0'}.get(m.group(0), '\\' + m.group(0)),
+                                                  regex=True) + "'"
+    return text.where(~missing, 'NULL')
+
+
+def _create_table(name: str, frame: pd.DataFrame, schema: List[Tuple[str, str]]) -> str:
+    types = dict(schema)
+    lines = []
+    for column in frame.columns:
+        sql_type = types.get(column)
+        if sql_type is None:
+            dtype = frame[column].dtype
+            sql_type = 'datetime' if pd.api.types.is_datetime64_any_dtype(dtype) else \
+                'int' if pd.api.types.is_integer_dtype(dtype) else \
+                'double' if pd.api.types.is_float_dtype(dtype) else 'varchar'
+        lines.append(f"  `{column}` {SQL_DDL_TYPES.get(sql_type, sql_type)} DEFAULT NULL")
+    return f"DROP TABLE IF EXISTS `{name}`;\nCREATE TABLE `{name}` (\n" + ",\n".join(lines) + "\n);\n"
+
+
+def write_sql(tables: Dict[str, pd.DataFrame], path: str,
+              schemas: Optional[Dict[str, List[Tuple[str, str]]]] = None) -> int:
+    """
+    Écrit les tables au format mysqldump (CREATE TABLE + INSERT étendus)
+    Le fichier se recharge dans MariaDB ou se relit avec mes_dump.MySQLDump
+
+    Returns: nombre de lignes écrites
+    """
+    schemas = schemas or {}
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write("-- Données synthétiques MES4 (mes_synth.py)\n\n")
+        for name, frame in tables.items():
+            f.write(_create_table(name, frame, schemas.get(name, [])))
+            if frame.empty:
+                f.write("\n")
+                continue
+            literals = [_sql_column(frame[column]) for column in frame.columns]
+            rows = ('(' + literals[0].str.cat(literals[1:], sep=',') + ')').tolist()
+            for i in range(0, len(rows), SQL_ROWS_PER_INSERT):
+                f.write(f"INSERT INTO `{name}` VALUES {','.join(rows[i:i + SQL_ROWS_PER_INSERT])};\n")
+            f.write("\n")
+            written += len(frame)
+    return written
+
+
+def write_parquet(tables: Dict[str, pd.DataFrame], out_dir: str) -> List[str]:
+    """Un fichier Parquet par table (format lu par mes_dump.DumpBackend)"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for name, frame in tables.items():
+        path = os.path.join(out_dir, f"{name}.parquet")
+        frame.to_parquet(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def write_robot_csv(robot: Union[pd.DataFrame, Iterable[pd.DataFrame]], path: str) -> int:
+    """
+    Log robot au format de robotino_data.csv (timestamps ISO 8601)
+
+    Args:
+        robot: DataFrame ou itérateur de DataFrames (MESDataGenerator.iter_robot), écrits à la suite
+    Returns: nombre de mesures écrites
+    """
+    chunks = [robot] if isinstance(robot, pd.DataFrame) else robot
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=written == 0, date_format='%Y-%m-%dT%H:%M:%S.%f')
+            written += len(chunk)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère des données MES4 + Robotino synthétiques")
+    parser.add_argument('--dump', default=DUMP_PATH, help="Dump réel servant à l'ajustement")
+    parser.add_argument('--robot', default=CSV_ROBOT_PATH, help="Log robot réel servant à l'ajustement")
+    parser.add_argument('--start', default='2025-01-06')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--orders-per-day', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--format', choices=['sql', 'parquet'], default='sql')
+    parser.add_argument('--out', required=True, help="Fichier .sql ou dossier Parquet")
+    parser.add_argument('--robot-out', default=None, help="CSV robot généré (optionnel)")
+    parser.add_argument('--robot-period', type=float, default=None,
+                        help="Période d'échantillonnage du robot (s), défaut: période réelle")
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    profile = fit_profile(args.dump, args.robot)
+    generator = MESDataGenerator(profile, seed=args.seed, orders_per_day=args.orders_per_day)
+    start = pd.Timestamp(args.start)
+    end = start + pd.Timedelta(days=args.days)
+    tables = generator.generate(start, end)
+    if args.format == 'sql':
+        write_sql(tables, args.out, profile.schemas)
+    else:
+        write_parquet(tables, args.out)
+    for name in GENERATED_TABLES:
+        print(f"   {name}: {len(tables[name])} lignes")
+    if args.robot_out:
+        rows = write_robot_csv(generator.iter_robot(start, end, period=args.robot_period), args.robot_out)
+        print(f"   robot: {rows} mesures")
+    print(f"✅ {args.days} jours générés en {time.perf_counter() - began:.1f}s → {args.out}")
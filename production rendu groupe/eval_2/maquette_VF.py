@@ -1,8 +1,53 @@
+import os
+import sys
+
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import datetime
+
+# Modules partagés à la racine du projet (kpi_cache, test_indicators, ...) et pages (vues/)
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(APP_DIR, "..", ".."))
+for path in (ROOT_DIR, APP_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from kpi_metrics import MetricsRecorder
+# Les pages (Plotly, graphiques) sont importées à leur première visite: voir vues.afficher_page.
+# Le calcul des KPI (pandas, numpy, duckdb, pyarrow, mysql.connector) n'est importé et démarré
+# qu'à la première page qui lit un snapshot: voir get_kpi_worker
+from vues import PAGES, Contexte, afficher_page
+
+# Sources de données des indicateurs (hors ligne sur le dump tant que MariaDB n'est pas branchée)
+DB_CONFIG = {
+    'host': 'localhost',
+    'port': 3306,
+    'user': 'example_user',
+    'password': 'example_password',
+    'database': 'MES4'
+}
+CSV_ROBOT_PATH = os.path.join(ROOT_DIR, "TELEFAN", "robotino_data.csv")
+DUMP_PATH = os.path.join(ROOT_DIR, "TELEFAN", "FestoMES-2025-03-27.sql")
+KPI_REFRESH_SECONDS = 30
+# Durée (jours) de la période par défaut: dernière semaine d'activité des données (voir periode_par_defaut)
+PERIODE_DEFAUT_JOURS = 7
+# Âge (s) au-delà duquel un snapshot est signalé comme ancien (recalculs en échec)
+KPI_SNAPSHOT_ANCIEN_S = 3 * KPI_REFRESH_SECONDS
+
+# Thèmes CSS injectés en tête de page
+THEMES_CSS = {
+    "dark": """
+        <style>
+            :root { --primary-color: #1f77b4; --background-color: #0e1117; --secondary-background-color: #161b22; }
+            [data-testid="stAppViewContainer"] { background-color: var(--secondary-background-color); }
+        </style>
+    """,
+    "light": """
+        <style>
+            :root { --primary-color: #1f77b4; --background-color: #ffffff; --secondary-background-color: #f8f9fa; }
+            [data-testid="stAppViewContainer"] { background-color: var(--secondary-background-color); }
+        </style>
+    """,
+}
 
 # Configuration de la page (Mode Large + Dark Mode)
 st.set_page_config(
@@ -14,28 +59,62 @@ st.set_page_config(
 # Initialiser session_state pour refresh des données et thème
 if "last_refresh" not in st.session_state:
     st.session_state.last_refresh = datetime.now()
-    st.session_state.random_seed = np.random.randint(0, 1000000)
     st.session_state.theme = "dark"  # dark ou light
 
-# Force regeneration des nombres random à chaque page
-st.session_state.random_seed = np.random.randint(0, 1000000)
-np.random.seed(st.session_state.random_seed)
 
-# Appliquer le thème CSS
-if st.session_state.theme == "dark":
-    st.markdown("""
-        <style>
-            :root { --primary-color: #1f77b4; --background-color: #0e1117; --secondary-background-color: #161b22; }
-            [data-testid="stAppViewContainer"] { background-color: var(--secondary-background-color); }
-        </style>
-    """, unsafe_allow_html=True)
-else:
-    st.markdown("""
-        <style>
-            :root { --primary-color: #1f77b4; --background-color: #ffffff; --secondary-background-color: #f8f9fa; }
-            [data-testid="stAppViewContainer"] { background-color: var(--secondary-background-color); }
-        </style>
-    """, unsafe_allow_html=True)
+@st.cache_resource
+def get_kpi_metrics() -> MetricsRecorder:
+    """Mesures des indicateurs, des requêtes et du cache (tampon circulaire affiché sur la page Admin)"""
+    return MetricsRecorder()
+
+
+kpi_metrics = get_kpi_metrics()
+
+
+@st.cache_resource
+def get_kpi_cache() -> "KPICache":
+    """Cache des indicateurs partagé par toutes les sessions (TTL par onglet, voir kpi_cache.TAB_TTL)"""
+    from kpi_cache import KPICache
+    return KPICache(metrics=kpi_metrics)
+
+
+@st.cache_resource
+def get_kpi_worker() -> "KPIWorker":
+    """
+    Thread unique de calcul des KPI pour tout le serveur: chaque session ne lit que le dernier
+    snapshot publié pour sa période, le coût d'un rerun ne dépend donc ni du nombre d'écrans
+    connectés ni de leurs périodes (un snapshot par période, voir KPIWorker.request)
+    Créé à la première page qui lit un snapshot: la page de connexion n'importe pas le calcul
+    """
+    from kpi_worker import KPIWorker
+    from test_indicators import MESIndicators
+    dump_path = DUMP_PATH if os.path.exists(DUMP_PATH) else None
+    mes = MESIndicators(DB_CONFIG, CSV_ROBOT_PATH, dump_path=dump_path, metrics=kpi_metrics)
+    return KPIWorker(mes, interval=KPI_REFRESH_SECONDS, activity_days=PERIODE_DEFAUT_JOURS).start()
+
+
+def periode_par_defaut():
+    """
+    Dernière semaine d'activité des données (valeur initiale du filtre de période), résolue par
+    le worker à son démarrage: le dump hors ligne ne couvre pas les sept derniers jours
+
+    Returns: (début, fin), None tant qu'elle n'est pas résolue (la page de connexion ne démarre pas le calcul)
+    """
+    if "periode_defaut" not in st.session_state and page != "Connexion":
+        activite = get_kpi_worker().activity_period
+        if activite is not None:
+            st.session_state.periode_defaut = activite
+    return st.session_state.get("periode_defaut")
+
+
+def periode_analyse(date_range):
+    """(début, fin) du filtre de période: une seule date = cette journée, aucune = tout l'historique"""
+    if not date_range:
+        return (None, None)
+    return (date_range[0], date_range[-1])
+
+# Appliquer le thème CSS (réémis à chaque rerun complet: Streamlit ne conserve pas les éléments)
+st.markdown(THEMES_CSS[st.session_state.theme], unsafe_allow_html=True)
 
 # Simulation Sidebar
 st.sidebar.title("📱 T'EleFan MES")
@@ -49,8 +128,7 @@ if "nav_target" in st.session_state:
 if "current_page" not in st.session_state:
     st.session_state["current_page"] = "Connexion"
 
-page = st.sidebar.radio("Navigation", ["Connexion", "Temps Réel (Opérateur)", "Stockage", "Robot", "Qualité", "Admin"], 
-                        index=["Connexion", "Temps Réel (Opérateur)", "Stockage", "Robot", "Qualité", "Admin"].index(st.session_state["current_page"]))
+page = st.sidebar.radio("Navigation", list(PAGES), index=list(PAGES).index(st.session_state["current_page"]))
 
 # Mettre à jour la page courante si l'utilisateur a changé la sélection
 st.session_state["current_page"] = page
@@ -58,8 +136,63 @@ st.sidebar.markdown("---")
 
 # Filtres Globaux
 st.sidebar.subheader("🔍 Filtres")
-date_range = st.sidebar.date_input("Période d'analyse", [datetime.now() - timedelta(days=7), datetime.now()])
+# Filtre sans clé: recréé sur la période par défaut dès qu'elle est résolue, puis le choix de l'utilisateur est conservé
+defaut = periode_par_defaut()
+date_range = st.sidebar.date_input("Période d'analyse", list(defaut) if defaut else [])
 site = st.sidebar.selectbox("Site", ["Tous", "Site A - Festo", "Site B"])
+# None: période par défaut pas encore résolue, aucun snapshot demandé
+periode = periode_analyse(date_range) if defaut else None
+
+
+def snapshot_courant():
+    """
+    Dernier snapshot de la période sélectionnée, sans attendre: la période est demandée au
+    worker (calculée en priorité si elle est nouvelle), None tant que son calcul est en cours
+    """
+    if periode is None:
+        return None
+    return get_kpi_worker().request(periode)
+
+
+def bandeau_snapshot():
+    """
+    Signale en tête de page les données qui ne sont pas à jour: calcul en cours pour la période
+    sélectionnée (valeurs simulées en attendant) ou snapshot ancien (recalculs en échec)
+
+    Returns: snapshot de la période sélectionnée, None pendant son premier calcul
+    """
+    snapshot = snapshot_courant()
+    if snapshot is None:
+        st.info("⏳ Calcul des KPI en cours pour la période sélectionnée: valeurs simulées en attendant")
+    elif (datetime.now() - snapshot.computed_at).total_seconds() > KPI_SNAPSHOT_ANCIEN_S:
+        erreur = get_kpi_worker().last_error
+        st.warning(f"⚠️ Données du {snapshot.computed_at.strftime('%d/%m/%Y %H:%M:%S')}, non recalculées depuis"
+                   + (f": {erreur}" if erreur else ""))
+    return snapshot
+
+
+def valeur_snapshot(methode: str, simulation):
+    """Résultat d'un indicateur dans le dernier snapshot, valeur simulée tant qu'il n'y en a pas"""
+    snapshot = snapshot_courant()
+    if snapshot is None or methode not in snapshot.values:
+        return simulation()
+    return snapshot.values[methode]
+
+
+def kpi(indicateur: str, charger):
+    """
+    Valeur d'un indicateur pour la page courante, servie par le cache tant qu'elle est valide
+    Les reruns (thème, navigation, widgets) ne rappellent pas `charger`. La clé de cache porte
+    la période du snapshot servi: une valeur simulée ou d'une autre période n'est plus resservie
+    une fois le snapshot de la période sélectionnée publié
+
+    Args:
+        indicateur: Libellé de l'indicateur (ex: "1. Autonomie Robot")
+        charger: Fonction sans argument qui charge la donnée (base, CSV ou simulation)
+    """
+    snapshot = snapshot_courant()
+    return get_kpi_cache().get(indicateur, page, charger, date_range=snapshot.period if snapshot else None, site=site)
+
 
 st.sidebar.markdown("---")
 
@@ -79,500 +212,17 @@ def display_header():
     with col2:
         st.markdown("<div style='text-align: right;'><strong>Groupe 6</strong><br><em>Admin</em></div>", unsafe_allow_html=True)
 
-# PAGE 1: CONNEXION
-if page == "Connexion":
-    # Date/Heure en haut à gauche
-    now = datetime.now()
-    jour_fr = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
-    st.markdown(f"**{jour_fr[now.weekday()]} {now.strftime('%d/%m/%Y %H:%M')}**")
-    
-    # Centrer le formulaire
-    col1, col2, col3 = st.columns([1,1,1])
-    with col2:
-        st.markdown("## 🔒 Authentification")
-        st.text_input("Identifiant", placeholder="ex: benoit.riou")
-        st.text_input("Mot de passe", type="password")
-        st.button("SE CONNECTER", type="primary", use_container_width=True)
-        
-        # Mot de passe oublié en bas à droite
-        st.markdown("<div style='text-align: right;'><a href='#'>Mot de passe oublié ?</a></div>", unsafe_allow_html=True)
-
-# PAGE 2: TEMPS RÉEL
-elif page == "Temps Réel (Opérateur)":
-    display_header()
-    
-    st.title("🏭 Suivi Production - Temps Réel")
-    st.info(f"Dernière mise à jour : {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-    
-    # Générer nombres random (nouvelles valeurs à chaque changement de page)
-    autonomie_restante = np.random.randint(50, 95)
-    autonomie_utilisee = 100 - autonomie_restante
-    of_realises = np.random.randint(8, 16)
-    of_total = 16
-    production_realisee = np.random.randint(400, 650)
-    production_objectif = 720
-    
-    # KPIs verticaux avec barres personnalisées
-    # KPI 1 : Autonomie Robot
-    pct_vert = (autonomie_restante / 100) * 100
-    pct_rouge = (autonomie_utilisee / 100) * 100
-    st.markdown(f"""
-        <div style="width: 100%; margin-bottom: 30px;">
-            <div style="text-align: center; font-weight: bold; font-size: 18px; margin-bottom: 10px;">
-                🔋 Autonomie Robot
-            </div>
-            <div style="width: 100%; height: 50px; background-color: #333; border-radius: 5px; overflow: hidden; display: flex;">
-                <div style="width: {pct_vert}%; background-color: #00cc00; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
-                    {autonomie_restante}% Restant
-                </div>
-                <div style="width: {pct_rouge}%; background-color: #cc0000; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
-                    {autonomie_utilisee}% Utilisé
-                </div>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
-    
-    # KPI 2 : OF Réalisés
-    pct_of_fait = (of_realises / of_total) * 100
-    pct_of_reste = ((of_total - of_realises) / of_total) * 100
-    st.markdown(f"""
-        <div style="width: 100%; margin-bottom: 30px;">
-            <div style="text-align: center; font-weight: bold; font-size: 18px; margin-bottom: 10px;">
-                ✅ OF Réalisés (Jour)
-            </div>
-            <div style="width: 100%; height: 50px; background-color: #333; border-radius: 5px; overflow: hidden; display: flex;">
-                <div style="width: {pct_of_fait}%; background-color: #00cc00; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
-                    {of_realises} Réalisés
-                </div>
-                <div style="width: {pct_of_reste}%; background-color: #cc0000; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
-                    {of_total - of_realises} Restants
-                </div>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
-    
-    # KPI 3 : Production
-    pct_prod_fait = (production_realisee / production_objectif) * 100
-    pct_prod_reste = 100 - pct_prod_fait if pct_prod_fait < 100 else 0
-    st.markdown(f"""
-        <div style="width: 100%; margin-bottom: 30px;">
-            <div style="text-align: center; font-weight: bold; font-size: 18px; margin-bottom: 10px;">
-                📱 Production (Unités)
-            </div>
-            <div style="width: 100%; height: 50px; background-color: #333; border-radius: 5px; overflow: hidden; display: flex;">
-                <div style="width: {min(pct_prod_fait, 100)}%; background-color: #00cc00; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
-                    {production_realisee} unités
-                </div>
-                <div style="width: {pct_prod_reste}%; background-color: #cc0000; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
-                    {'Objectif: ' + str(production_objectif) if pct_prod_reste > 0 else ''}
-                </div>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("### ⚠️ Alertes en cours")
-    if autonomie_restante < 30:
-        st.error("🔴 ALERTE : Batterie robot critique (<30%)")
-    elif autonomie_restante < 50:
-        st.warning("🟠 ATTENTION : Batterie robot faible (30-50%)")
-    elif production_realisee < (production_objectif * 0.5):
-        st.warning("⚠️ Production en retard par rapport à l'objectif")
-    else:
-        st.success("✅ Aucune alerte critique. Ligne nominale.")
-
-# PAGE 3: STOCKAGE
-elif page == "Stockage":
-    display_header()
-    
-    st.title("📦 Logistique")
-    
-    # Section Stockage
-    st.markdown("### 📦 Stockage")
-    with st.container():
-        col_stock1, col_stock2 = st.columns(2)
-        
-        with col_stock1:
-            st.subheader("Taux d'occupation de l'espace de stockage")
-            occupation = np.random.randint(45, 95)
-            
-            # Jauge demi-cercle simple avec Plotly
-            gauge_fig = go.Figure(go.Indicator(
-                mode="gauge+number",
-                value=occupation,
-                number={"suffix": "%", "font": {"size": 20}},
-                gauge={
-                    "shape": "angular",
-                    "axis": {
-                        "range": [0, 100],
-                        "tickwidth": 1,
-                        "tickcolor": "#888",
-                        "nticks": 6
-                    },
-                    "bar": {"color": "#161b22", "thickness": 0.99},
-                    "steps": [
-                        {"range": [0, 70], "color": "#00aa00"},
-                        {"range": [70, 85], "color": "#ff9900"},
-                        {"range": [85, 100], "color": "#cc0000"}
-                    ],
-                },
-                domain={"x": [0, 1], "y": [0, 1]},
-            ))
-            gauge_fig.update_layout(margin=dict(l=10, r=10, t=10, b=10), height=280)
-            st.plotly_chart(gauge_fig, width='stretch')
-        
-        with col_stock2:
-            st.subheader("Mouvements Stocks (7j)")
-            chart_data = pd.DataFrame(np.random.randint(10, 50, size=(7, 2)), columns=['Entrées', 'Sorties'])
-            st.line_chart(chart_data)
-
-# PAGE 4: ROBOT
-elif page == "Robot":
-    display_header()
-    
-    st.title("🤖 Robotino")
-    
-    # Section Robot
-    st.markdown("### 🤖 Robotino")
-    with st.container():
-        col_robot1, col_robot2 = st.columns(2)
-        
-        with col_robot1:
-            st.subheader("Autonomie du Robot")
-            temps_utilisation_data = pd.DataFrame({
-                "Jour": ["Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim"],
-                "Temps util. (h)": [0.75, 2.0, 1.58, 1.83, 1.42, 1.0, 0.5],
-                "Batterie (%)": [95, 85, 70, 60, 45, 30, 20]
-            })
-            
-            # Graphique mixte avec Plotly
-            fig_mixed = go.Figure()
-            fig_mixed.add_trace(go.Bar(
-                x=temps_utilisation_data["Jour"],
-                y=temps_utilisation_data["Temps util. (h)"],
-                name="Temps utilisation (h)",
-                marker_color="#1f77b4",
-                yaxis="y1"
-            ))
-            fig_mixed.add_trace(go.Scatter(
-                x=temps_utilisation_data["Jour"],
-                y=temps_utilisation_data["Batterie (%)"],
-                name="Batterie restante (%)",
-                line=dict(color="#ff7f0e", width=3),
-                yaxis="y2"
-            ))
-            fig_mixed.update_layout(
-                title_text="Activité et Batterie",
-                xaxis=dict(title="Jour de la semaine"),
-                yaxis=dict(
-                    title=dict(text="Temps utilisation (h)", font=dict(color="#1f77b4")),
-                    tickfont=dict(color="#1f77b4")
-                ),
-                yaxis2=dict(
-                    title=dict(text="Batterie (%)", font=dict(color="#ff7f0e")),
-                    tickfont=dict(color="#ff7f0e"),
-                    overlaying="y",
-                    side="right"
-                ),
-                hovermode="x unified",
-                height=350,
-                margin=dict(l=40, r=60, t=40, b=40)
-            )
-            st.plotly_chart(fig_mixed, width='stretch')
-        
-        with col_robot2:
-            st.subheader("Distance parcourue")
-            distance_data = pd.DataFrame({
-                "Jour": ["Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim"],
-                "Distance (m)": [120, 350, 600, 850, 1100, 1320, 1450]
-            })
-            
-            fig_distance = go.Figure()
-            fig_distance.add_trace(go.Scatter(
-                x=distance_data["Jour"],
-                y=distance_data["Distance (m)"],
-                name="Distance totale (m)",
-                line=dict(color="#2ca02c", width=3)
-            ))
-            fig_distance.update_layout(
-                title_text="Distance cumulée",
-                xaxis_title="Jour de la semaine",
-                yaxis_title="Distance (m)",
-                height=350,
-                margin=dict(l=40, r=40, t=40, b=40),
-                hovermode="x"
-            )
-            st.plotly_chart(fig_distance, width='stretch')
-
-# PAGE 5: ADMIN
-elif page == "Admin":
-    display_header()
-    
-    st.title("📊 Gestion de Production (Admin)")
-
-    st.subheader("📋 Récapitulatif des 15 KPIs")
-    def set_nav_target(dest_page: str) -> None:
-        st.session_state["nav_target"] = dest_page
-
-    kpi_rows = [
-        ("1. Autonomie Robot", "Temps Réel (Opérateur)"),
-        ("2. OF Réalisés", "Temps Réel (Opérateur)"),
-        ("3. Production Réalisée", "Temps Réel (Opérateur)"),
-        ("4. Taux Occupation Stockage", "Stockage"),
-        ("5. Mouvements Stocks", "Stockage"),
-        ("6. Historique Autonomie", "Robot"),
-        ("7. Distance Parcourue", "Robot"),
-        ("8. Production Hebdo", "Qualité"),
-        ("9. Production Détaillée", "Qualité"),
-        ("10. Occupation Machine", "Qualité"),
-        ("11. Temps Cycle & NVA", "Qualité"),
-        ("12. Taux Défaut", "Qualité"),
-        ("13. Causes NC", "Qualité"),
-        ("14. Taux Conforme", "Qualité"),
-        ("15. Conso Énergie", "Qualité"),
-    ]
-
-    # Initialiser les droits d'accès si nécessaire
-    if "kpi_permissions" not in st.session_state:
-        st.session_state["kpi_permissions"] = {
-            label: ["Admin", "Opérateur"] for label, _ in kpi_rows
-        }
-
-    # En-têtes du tableau
-    col_label, col_perms, col_data = st.columns([2, 2.5, 0.5])
-    with col_label:
-        st.markdown("<div style='text-align: center; font-size: 12px; font-weight: bold; color: #888;'>KPI</div>", unsafe_allow_html=True)
-    with col_perms:
-        st.markdown("<div style='text-align: center; font-size: 12px; font-weight: bold; color: #888;'>Droits d'accès</div>", unsafe_allow_html=True)
-    with col_data:
-        st.markdown("<div style='text-align: center; font-size: 12px; font-weight: bold; color: #888;'>Données</div>", unsafe_allow_html=True)
-
-    # Lignes du tableau
-    table_container = st.container()
-    with table_container:
-        for label, dest in kpi_rows:
-            col_label, col_perms, col_data = st.columns([2, 2.5, 0.5])
-            with col_label:
-                st.button(label, key=f"kpi_nav_{label}", on_click=set_nav_target, args=(dest,), use_container_width=True)
-            with col_perms:
-                current_perms = st.session_state["kpi_permissions"][label]
-                selected_perms = st.multiselect(
-                    "Rôles",
-                    ["Admin", "Opérateur", "Superviseur", "Chef de production"],
-                    default=current_perms,
-                    key=f"kpi_perms_{label}",
-                    label_visibility="collapsed"
-                )
-                st.session_state["kpi_permissions"][label] = selected_perms
-            with col_data:
-                st.write("Random")
-    
-    # Rerun après avoir défini la cible
-    if "nav_target" in st.session_state:
-        st.rerun()
 
-# PAGE 6: QUALITÉ
-elif page == "Qualité":
-    display_header()
-    
-    st.title("📊 Production Réel vs Prévisionnel | ✨ Qualité")
-    
-    # Layout 2 colonnes principales
-    col_prod, col_qual = st.columns(2, gap="large")
-    
-    # ===== COLONNE GAUCHE: PRODUCTION =====
-    with col_prod:
-        st.markdown("### Production réel vs prévisionnel")
-        
-        # Ligne 1: KPI 8 + KPI 9
-        p1, p2 = st.columns([1, 1.5])
-        
-        with p1:
-            st.markdown("**Production de la semaine**")
-            production_hebdo = np.random.randint(600, 800)
-            objectif_hebdo = 720
-            
-            # Cadre 2x2
-            st.markdown("""
-            <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 10px; margin-top: 10px;">
-                <div style="border: 1px solid #444; padding: 15px; text-align: center; background-color: #0d1117; border-radius: 5px;">
-                    <div style="color: #888; font-size: 12px; margin-bottom: 8px;">Réel</div>
-                    <div style="font-size: 32px; font-weight: bold; color: #00cc00;">""" + str(production_hebdo) + """</div>
-                </div>
-                <div style="border: 1px solid #444; padding: 15px; text-align: center; background-color: #0d1117; border-radius: 5px;">
-                    <div style="color: #888; font-size: 12px; margin-bottom: 8px;">OBJ</div>
-                    <div style="font-size: 32px; font-weight: bold; color: #1f77b4;">""" + str(objectif_hebdo) + """</div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with p2:
-            st.markdown("**Production détaillée de la semaine**")
-            prod_detail = pd.DataFrame({
-                "OBJ/PDP": [150, 120, 100, 170, 180],
-                "Réel": [120, 120, 90, 160, 180],
-                "Écart": [30, 0, 10, 10, 0]
-            }, index=["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"])
-            st.dataframe(prod_detail, use_container_width=True)
-        
-        st.divider()
-        
-        # Ligne 2: KPI 10 + KPI 11
-        p3, p4 = st.columns([1, 1])
-        
-        with p3:
-            st.markdown("**Taux d'occupation**")
-            st.caption("taux d'occupation de la ligne de production")
-            
-            occupation_data = pd.DataFrame({
-                "Jour": ["lundi", "mardi", "mercredi", "jeudi", "vendredi"],
-                "Taux": [85, 78, 72, 89, 65]
-            })
-            
-            fig_occupation = go.Figure()
-            fig_occupation.add_trace(go.Bar(
-                x=occupation_data["Jour"],
-                y=occupation_data["Taux"],
-                name="Taux occupation",
-                marker=dict(color="#1f77b4")
-            ))
-            fig_occupation.add_hline(y=80, line_dash="dash", line_color="red", 
-                                     annotation_text="taux", annotation_position="right")
-            fig_occupation.update_layout(
-                height=300, margin=dict(l=30, r=30, t=20, b=50),
-                xaxis_title="", yaxis_title="",
-                showlegend=True, hovermode="x", legend=dict(x=0.5, y=-0.3, xanchor="center", yanchor="top", orientation="h")
-            )
-            st.plotly_chart(fig_occupation, width='stretch')
-        
-        with p4:
-            st.markdown("**Temps de cycle**")
-            st.caption("Les temps de la journée entre NVA et VA")
-            
-            cycle_data = pd.DataFrame({
-                "Jour": ["lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"],
-                "VA": [6, 5, 6, 5, 4],
-                "NVA": [1, 2, 1, 2, 3]
-            })
-            
-            fig_cycle = go.Figure()
-            fig_cycle.add_trace(go.Bar(
-                x=cycle_data["Jour"],
-                y=cycle_data["VA"],
-                name="VA",
-                marker=dict(color="#1f77b4")
-            ))
-            fig_cycle.add_trace(go.Bar(
-                x=cycle_data["Jour"],
-                y=cycle_data["NVA"],
-                name="NVA",
-                marker=dict(color="#ff7f0e")
-            ))
-            fig_cycle.update_layout(
-                barmode="stack",
-                height=300, margin=dict(l=30, r=30, t=20, b=50),
-                xaxis_title="", yaxis_title="",
-                showlegend=True, hovermode="x", legend=dict(x=0.5, y=-0.3, xanchor="center", yanchor="top", orientation="h")
-            )
-            st.plotly_chart(fig_cycle, width='stretch')
-    
-    # ===== COLONNE DROITE: QUALITÉ =====
-    with col_qual:
-        st.markdown("### Qualité")
-        
-        # KPI 12: Nombre de NC
-        st.markdown("**Nombre de NC**")
-        nc_data = pd.DataFrame({
-            "Jour": ["lundi", "mardi", "mercredi", "jeudi", "vendredi"],
-            "NC": [2.5, 1.5, 2.0, 2.5, 1.8]
-        })
-        
-        fig_nc = go.Figure()
-        
-        # Zones de couleur (fond)
-        # Zone verte (0 à 2.25)
-        fig_nc.add_trace(go.Scatter(
-            x=nc_data["Jour"],
-            y=[2.25] * len(nc_data),
-            fill="tozeroy",
-            fillcolor="rgba(0, 204, 0, 0.2)",
-            line=dict(color="rgba(0,0,0,0)"),
-            showlegend=False,
-            hoverinfo="skip"
-        ))
-        
-        # Zone rouge (2.25 à 3)
-        fig_nc.add_trace(go.Scatter(
-            x=nc_data["Jour"],
-            y=[3] * len(nc_data),
-            fill="tonexty",
-            fillcolor="rgba(204, 0, 0, 0.2)",
-            line=dict(color="rgba(0,0,0,0)"),
-            showlegend=False,
-            hoverinfo="skip"
-        ))
-        
-        # Courbe de données
-        fig_nc.add_trace(go.Scatter(
-            x=nc_data["Jour"],
-            y=nc_data["NC"],
-            name="NC",
-            line=dict(color="#1f77b4", width=3),
-            mode="lines+markers",
-            marker=dict(size=8)
-        ))
-        
-        fig_nc.update_layout(
-            height=250, margin=dict(l=30, r=30, t=10, b=30),
-            xaxis_title="", yaxis_title="",
-            yaxis=dict(range=[0, 3]),
-            showlegend=False, hovermode="x"
-        )
-        st.plotly_chart(fig_nc, width='stretch')
-        
-        st.divider()
-        
-        # KPI 13 + KPI 14 (côte à côte)
-        q1, q2 = st.columns([2.5, 1])
-        
-        with q1:
-            st.markdown("**Causes des NC**")
-            causes_data = pd.DataFrame({
-                "Cause": ["Mauvaise couleur", "Mauvaise hauteur", "Autres"],
-                "Pourcentage": [60, 30, 10]
-            })
-            
-            fig_causes = go.Figure()
-            fig_causes.add_trace(go.Bar(
-                x=causes_data["Cause"],
-                y=causes_data["Pourcentage"],
-                name="%",
-                marker=dict(color="#ff7f0e")
-            ))
-            fig_causes.add_trace(go.Scatter(
-                x=causes_data["Cause"],
-                y=np.cumsum(causes_data["Pourcentage"]),
-                name="% cumulé",
-                line=dict(color="#888888", width=2),
-                yaxis="y2"
-            ))
-            fig_causes.update_layout(
-                height=250, margin=dict(l=30, r=30, t=10, b=30),
-                xaxis_title="", yaxis_title="",
-                yaxis2=dict(overlaying="y", side="right"),
-                showlegend=False, hovermode="x"
-            )
-            st.plotly_chart(fig_causes, width='stretch')
-        
-        with q2:
-            st.markdown("**Taux de conforme**")
-            taux_conforme = np.random.uniform(95, 99)
-            st.markdown(f"<div style='text-align: center; font-size: 48px; color: #00cc00; font-weight: bold;'>{taux_conforme:.0f}%</div>", 
-                       unsafe_allow_html=True)
-        
-        st.divider()
-        
-        # KPI 15
-        st.markdown("**Moyenne de la consommation d'énergie**")
-        conso_energie = np.random.uniform(150, 160)
-        st.markdown(f"<div style='text-align: center; font-size: 32px; color: #1f77b4; font-weight: bold;'>{conso_energie:.0f} kW/h</div>", 
-                   unsafe_allow_html=True)
\ No newline at end of file
+# Page courante: module de vues/ importé à sa première visite
+@st.fragment
+def page_courante(ctx: Contexte):
+    """
+    Page affichée dans un fragment: un widget de la page (magasin, filtres Admin...) ne
+    réexécute que la page, sans reconstruire la barre latérale ni réinjecter le thème
+    """
+    afficher_page(ctx.page, ctx)
+
+
+page_courante(Contexte(page=page, kpi=kpi, valeur_snapshot=valeur_snapshot, display_header=display_header,
+                       bandeau_snapshot=bandeau_snapshot, kpi_worker=get_kpi_worker, kpi_cache=get_kpi_cache,
+                       kpi_metrics=kpi_metrics))
@@ -0,0 +1,121 @@
+"""
+Mesure du démarrage à froid et des reruns du tableau de bord (maquette_VF.py), page par page
+Chaque page est ouverte dans un processus Python neuf (imports et ressources partagées à
+construire: démarrage à froid), puis réexécutée plusieurs fois (reruns: clic, thème, widget).
+Les durées sont comparées au budget (vues.BUDGET_COLD_START_S, vues.BUDGET_RERUN_S) et les
+modules chargés sont relevés: une page ne doit pas importer les autres, et seules les pages
+qui lisent un snapshot importent le calcul des KPI (HEAVY_MODULES)
+
+Usage:
+    python mesure_demarrage.py
+    python mesure_demarrage.py --pages "Temps Réel (Opérateur)" Qualité --reruns 10 --output demarrage.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "maquette_VF.py")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from vues import BUDGET_COLD_START_S, BUDGET_RERUN_S, PAGES  # noqa: E402
+
+DEFAULT_RERUNS = 5
+# Attente (s) entre le démarrage à froid et les reruns: premier snapshot KPI publié
+DEFAULT_SETTLE_S = 8.0
+APP_TIMEOUT_S = 120
+# Bibliothèques du calcul des KPI, absentes du démarrage des pages qui ne lisent pas de snapshot
+HEAVY_MODULES = ['pandas', 'numpy', 'test_indicators', 'duckdb', 'pyarrow', 'mysql.connector']
+
+# Exécuté dans un processus neuf: une page, un démarrage à froid puis des reruns
+_PROBE = r"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app_path, page, reruns, settle = sys.argv[1], sys.argv[2], int(sys.argv[3]), float(sys.argv[4])
+heavy = sys.argv[5].split(",")
+began = time.perf_counter()
+at = AppTest.from_file(app_path, default_timeout=%d)
+at.session_state["current_page"] = page
+at.run()
+cold = time.perf_counter() - began
+# Reruns mesurés une fois le premier calcul des KPI terminé (le worker partage le GIL)
+time.sleep(settle)
+timings = []
+for _ in range(reruns):
+    began = time.perf_counter()
+    at.run()
+    timings.append(time.perf_counter() - began)
+print(json.dumps({
+    "page": page, "cold_start_s": cold, "reruns_s": timings,
+    "exceptions": [str(e.value) for e in at.exception],
+    "charts": len(at.get("plotly_chart")),
+    "modules": sorted(m for m in sys.modules if m.startswith("vues.")),
+    "heavy": [m for m in heavy if m in sys.modules],
+}))
+""" % APP_TIMEOUT_S
+
+
+def measure_page(page: str, reruns: int = DEFAULT_RERUNS, settle: float = DEFAULT_SETTLE_S) -> Dict:
+    """
+    Ouvre une page dans un processus neuf
+
+    Returns: dict (page, cold_start_s, rerun_median_s, rerun_max_s, charts, modules, heavy, exceptions)
+    """
+    result = subprocess.run([sys.executable, "-c", _PROBE, APP_PATH, page, str(reruns), str(settle),
+                             ",".join(HEAVY_MODULES)],
+                            capture_output=True, text=True, cwd=APP_DIR,
+                            timeout=APP_TIMEOUT_S * (reruns + 2) + settle)
+    # Le worker KPI écrit aussi sur stdout: la mesure est la dernière ligne JSON
+    lines = [line for line in result.stdout.splitlines() if line.startswith('{"page"')]
+    if result.returncode != 0 or not lines:
+        return {"page": page, "error": result.stderr.strip().splitlines()[-1:] or ["échec"]}
+    row = json.loads(lines[-1])
+    timings = row.pop("reruns_s")
+    row["cold_start_s"] = round(row["cold_start_s"], 3)
+    row["rerun_median_s"] = round(statistics.median(timings), 3) if timings else None
+    row["rerun_max_s"] = round(max(timings), 3) if timings else None
+    row["within_budget"] = (row["cold_start_s"] <= BUDGET_COLD_START_S
+                            and (row["rerun_median_s"] or 0) <= BUDGET_RERUN_S)
+    return row
+
+
+def run(pages: List[str], reruns: int = DEFAULT_RERUNS, settle: float = DEFAULT_SETTLE_S) -> List[Dict]:
+    rows = []
+    for page in pages:
+        row = measure_page(page, reruns, settle)
+        rows.append(row)
+        if "error" in row:
+            print(f"❌ {page}: {row['error'][0]}")
+            continue
+        mark = "✅" if row["within_budget"] and not row["exceptions"] else "❌"
+        print(f"{mark} {page}: démarrage à froid {row['cold_start_s']:.2f}s, rerun {row['rerun_median_s']:.3f}s "
+              f"(max {row['rerun_max_s']:.3f}s), {row['charts']} graphique(s), modules {', '.join(row['modules']) or '-'}, "
+              f"calcul {', '.join(row['heavy']) or '-'}")
+        for exception in row["exceptions"]:
+            print(f"   ❌ {exception}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Démarrage à froid et reruns du tableau de bord, par page")
+    parser.add_argument("--pages", nargs="+", default=list(PAGES), choices=list(PAGES))
+    parser.add_argument("--reruns", type=int, default=DEFAULT_RERUNS)
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_S,
+                        help="Attente (s) avant les reruns (0: reruns pendant le premier calcul des KPI)")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    print(f"⏱️  Budget: démarrage à froid ≤ {BUDGET_COLD_START_S:.1f}s, rerun ≤ {BUDGET_RERUN_S:.2f}s")
+    rows = run(args.pages, args.reruns, args.settle)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Résultats écrits dans {args.output}")
+    failed = [row for row in rows if "error" in row or row["exceptions"] or not row["within_budget"]]
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,53 @@
+"""
+Pages du tableau de bord (maquette_VF.py), chargées à la première visite
+Chaque page est un module de ce package exposant afficher(ctx): ses imports (Plotly, numpy)
+et la construction de ses graphiques ne sont payés qu'à l'ouverture de la page, jamais au
+démarrage de l'application ni sur les autres pages. Chaque affichage est mesuré
+(MetricsRecorder, kind='page'): cache='miss' quand le module vient d'être importé
+"""
+
+import importlib
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+# Libellé de la navigation -> module de la page
+PAGES = {
+    "Connexion": "connexion",
+    "Temps Réel (Opérateur)": "temps_reel",
+    "Stockage": "stockage",
+    "Robot": "robot",
+    "Qualité": "qualite",
+    "Admin": "admin",
+}
+
+# Budgets vérifiés par mesure_demarrage.py: ouverture d'une page dans un processus neuf
+# (imports, ressources partagées, premier rendu; le premier calcul du worker KPI partage le GIL)
+# et rerun d'une page déjà ouverte
+BUDGET_COLD_START_S = 2.0
+BUDGET_RERUN_S = 0.15
+
+
+@dataclass
+class Contexte:
+    """Ressources partagées de l'application, passées aux pages"""
+    page: str
+    kpi: Callable                  # kpi(indicateur, charger): valeur servie par le cache KPI
+    valeur_snapshot: Callable      # valeur_snapshot(methode, simulation): dernier snapshot du worker
+    display_header: Callable
+    bandeau_snapshot: Callable     # bandeau_snapshot(): état des données (calcul en cours, ancien)
+    kpi_worker: Callable           # get_kpi_worker(): worker démarré au premier appel (import du calcul)
+    kpi_cache: Callable            # get_kpi_cache()
+    kpi_metrics: Any
+
+
+def module_page(page: str) -> str:
+    return f"{__name__}.{PAGES[page]}"
+
+
+def afficher_page(page: str, ctx: Contexte):
+    """Importe le module de la page s'il ne l'est pas encore, puis l'affiche (durée mesurée)"""
+    name = module_page(page)
+    with ctx.kpi_metrics.measure('page', page, cache='hit' if name in sys.modules else 'miss'):
+        importlib.import_module(name).afficher(ctx)
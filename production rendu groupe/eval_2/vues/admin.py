@@ -0,0 +1,124 @@
+"""
+Page Admin: récapitulatif des 15 KPI, droits d'accès, profilage et cache des requêtes
+"""
+
+import pandas as pd
+import streamlit as st
+
+from vues import BUDGET_RERUN_S, Contexte
+
+
+def afficher(ctx: Contexte):
+    ctx.display_header()
+    
+    st.title("📊 Gestion de Production (Admin)")
+
+    st.subheader("📋 Récapitulatif des 15 KPIs")
+    
+    # Invalidation explicite du cache (ex: après un import de données)
+    col_refresh, col_cache_info = st.columns([1, 3])
+    with col_refresh:
+        if st.button("🔄 Recharger les données", key="kpi_cache_invalidate", use_container_width=True):
+            supprimees = ctx.kpi_cache().invalidate()
+            ctx.kpi_worker().request_refresh()
+            st.toast(f"{supprimees} valeurs en cache invalidées, recalcul des KPI demandé")
+    with col_cache_info:
+        snapshot_kpi = ctx.kpi_worker().latest()
+        version = f"snapshot v{snapshot_kpi.version} ({snapshot_kpi.duration_s:.1f}s)" if snapshot_kpi else "calcul en cours"
+        kpi_cache = ctx.kpi_cache()
+        st.caption(f"Cache KPI: {kpi_cache.hits} lectures en cache / {kpi_cache.misses} chargements — {version}")
+    
+    def set_nav_target(dest_page: str) -> None:
+        st.session_state["nav_target"] = dest_page
+
+    kpi_rows = [
+        ("1. Autonomie Robot", "Temps Réel (Opérateur)"),
+        ("2. OF Réalisés", "Temps Réel (Opérateur)"),
+        ("3. Production Réalisée", "Temps Réel (Opérateur)"),
+        ("4. Taux Occupation Stockage", "Stockage"),
+        ("5. Mouvements Stocks", "Stockage"),
+        ("6. Historique Autonomie", "Robot"),
+        ("7. Distance Parcourue", "Robot"),
+        ("8. Production Hebdo", "Qualité"),
+        ("9. Production Détaillée", "Qualité"),
+        ("10. Occupation Machine", "Qualité"),
+        ("11. Temps Cycle & NVA", "Qualité"),
+        ("12. Taux Défaut", "Qualité"),
+        ("13. Causes NC", "Qualité"),
+        ("14. Taux Conforme", "Qualité"),
+        ("15. Conso Énergie", "Qualité"),
+    ]
+
+    # Initialiser les droits d'accès si nécessaire
+    if "kpi_permissions" not in st.session_state:
+        st.session_state["kpi_permissions"] = {
+            label: ["Admin", "Opérateur"] for label, _ in kpi_rows
+        }
+
+    # En-têtes du tableau
+    col_label, col_perms, col_data = st.columns([2, 2.5, 0.5])
+    with col_label:
+        st.markdown("<div style='text-align: center; font-size: 12px; font-weight: bold; color: #888;'>KPI</div>", unsafe_allow_html=True)
+    with col_perms:
+        st.markdown("<div style='text-align: center; font-size: 12px; font-weight: bold; color: #888;'>Droits d'accès</div>", unsafe_allow_html=True)
+    with col_data:
+        st.markdown("<div style='text-align: center; font-size: 12px; font-weight: bold; color: #888;'>Données</div>", unsafe_allow_html=True)
+
+    # Lignes du tableau
+    table_container = st.container()
+    with table_container:
+        for label, dest in kpi_rows:
+            col_label, col_perms, col_data = st.columns([2, 2.5, 0.5])
+            with col_label:
+                st.button(label, key=f"kpi_nav_{label}", on_click=set_nav_target, args=(dest,), use_container_width=True)
+            with col_perms:
+                current_perms = st.session_state["kpi_permissions"][label]
+                selected_perms = st.multiselect(
+                    "Rôles",
+                    ["Admin", "Opérateur", "Superviseur", "Chef de production"],
+                    default=current_perms,
+                    key=f"kpi_perms_{label}",
+                    label_visibility="collapsed"
+                )
+                st.session_state["kpi_permissions"][label] = selected_perms
+            with col_data:
+                age = ctx.kpi_cache().age(label)
+                st.write("—" if age is None else f"{age:.0f}s")
+    
+    # Profilage: durée, temps SQL, volume et mémoire par indicateur / requête / lecture du cache
+    st.subheader("⏱️ Profilage des indicateurs")
+    vues = {"Indicateurs (calcul)": "indicator", "Requêtes SQL": "query",
+            "Cache du dashboard": "cache", "Chargements": "snapshot", "Pages": "page"}
+    col_vue, col_export = st.columns([3, 1])
+    with col_vue:
+        vue = st.radio("Mesures", list(vues), horizontal=True, key="kpi_metrics_view",
+                       label_visibility="collapsed")
+    with col_export:
+        st.download_button("⬇️ Exporter (CSV)", ctx.kpi_metrics.to_frame().to_csv(index=False),
+                           file_name="kpi_metrics.csv", mime="text/csv", use_container_width=True)
+    resume = ctx.kpi_metrics.summary(vues[vue])
+    if vues[vue] == "snapshot":
+        resume = pd.concat([resume, ctx.kpi_metrics.summary("robot")], ignore_index=True)
+    if resume.empty:
+        st.info("Aucune mesure pour l'instant (premier calcul des KPI en cours)")
+    else:
+        st.dataframe(resume, use_container_width=True, hide_index=True)
+        st.caption(f"{len(ctx.kpi_metrics)} mesures conservées — triées par durée p95 (ms), "
+                   "sql_share = part du temps passée en SQL")
+        if vues[vue] == "page":
+            lentes = resume.loc[resume['wall_p95_ms'] > BUDGET_RERUN_S * 1000, 'name'].tolist()
+            st.caption(f"Budget d'affichage: {BUDGET_RERUN_S * 1000:.0f} ms par page (cache_hit = module déjà importé) — "
+                       + (f"hors budget: {', '.join(lentes)}" if lentes else "toutes les pages dans le budget"))
+    
+    # Cache des résultats de requêtes du worker (invalidé par les versions des tables)
+    if ctx.kpi_worker().mes.query_cache is not None and vues[vue] == "query":
+        etat_cache = ctx.kpi_worker().mes.query_cache.stats()
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Requêtes en cache", etat_cache['entries'])
+        c2.metric("Mémoire", f"{etat_cache['memory_mb']:.1f} / {etat_cache['max_mb']:.0f} Mo")
+        c3.metric("Taux de lecture en cache", f"{etat_cache['hit_rate'] * 100:.0f}%")
+        c4.metric("Invalidations / évictions", f"{etat_cache['invalidations']} / {etat_cache['evictions']}")
+    
+    # Rerun après avoir défini la cible
+    if "nav_target" in st.session_state:
+        st.rerun()
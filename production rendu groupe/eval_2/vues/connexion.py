@@ -0,0 +1,27 @@
+"""
+Page Connexion: formulaire d'authentification (maquette)
+"""
+
+from datetime import datetime
+
+import streamlit as st
+
+from vues import Contexte
+
+
+def afficher(ctx: Contexte):
+    # Date/Heure en haut à gauche
+    now = datetime.now()
+    jour_fr = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+    st.markdown(f"**{jour_fr[now.weekday()]} {now.strftime('%d/%m/%Y %H:%M')}**")
+    
+    # Centrer le formulaire
+    col1, col2, col3 = st.columns([1,1,1])
+    with col2:
+        st.markdown("## 🔒 Authentification")
+        st.text_input("Identifiant", placeholder="ex: benoit.riou")
+        st.text_input("Mot de passe", type="password")
+        st.button("SE CONNECTER", type="primary", use_container_width=True)
+        
+        # Mot de passe oublié en bas à droite
+        st.markdown("<div style='text-align: right;'><a href='#'>Mot de passe oublié ?</a></div>", unsafe_allow_html=True)
@@ -0,0 +1,244 @@
+"""
+Page Qualité: production réel vs prévisionnel et indicateurs qualité (KPI 8 à 15)
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from vues import Contexte
+
+
+def afficher(ctx: Contexte):
+    ctx.display_header()
+    
+    st.title("📊 Production Réel vs Prévisionnel | ✨ Qualité")
+    ctx.bandeau_snapshot()
+    
+    # Layout 2 colonnes principales
+    col_prod, col_qual = st.columns(2, gap="large")
+    
+    # ===== COLONNE GAUCHE: PRODUCTION =====
+    with col_prod:
+        st.markdown("### Production réel vs prévisionnel")
+        
+        # Ligne 1: KPI 8 + KPI 9
+        p1, p2 = st.columns([1, 1.5])
+        
+        with p1:
+            st.markdown("**Production de la semaine**")
+            production_hebdo, objectif_hebdo = ctx.kpi("8. Production Hebdo", lambda: ctx.valeur_snapshot(
+                'indicator_8_production_hebdo', lambda: (int(np.random.randint(600, 800)), 720)))
+            
+            # Cadre 2x2
+            st.markdown("""
+            <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 10px; margin-top: 10px;">
+                <div style="border: 1px solid #444; padding: 15px; text-align: center; background-color: #0d1117; border-radius: 5px;">
+                    <div style="color: #888; font-size: 12px; margin-bottom: 8px;">Réel</div>
+                    <div style="font-size: 32px; font-weight: bold; color: #00cc00;">""" + str(production_hebdo) + """</div>
+                </div>
+                <div style="border: 1px solid #444; padding: 15px; text-align: center; background-color: #0d1117; border-radius: 5px;">
+                    <div style="color: #888; font-size: 12px; margin-bottom: 8px;">OBJ</div>
+                    <div style="font-size: 32px; font-weight: bold; color: #1f77b4;">""" + str(objectif_hebdo) + """</div>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with p2:
+            st.markdown("**Production détaillée de la semaine**")
+            # Cumuls journaliers (jours sans production compris), simulés en attendant le premier snapshot
+            detail_jours = ctx.kpi("9. Production Détaillée", lambda: ctx.valeur_snapshot(
+                'indicator_9_production_detaillee', lambda: pd.DataFrame()))
+            if len(detail_jours) > 0:
+                prod_detail = pd.DataFrame({
+                    "OBJ/PDP": detail_jours["objectif"].round().astype(int).to_numpy(),
+                    "Réel": detail_jours["production"].to_numpy(),
+                    "Écart": (detail_jours["objectif"] - detail_jours["production"]).round().astype(int).to_numpy()
+                }, index=pd.to_datetime(detail_jours["jour"]).dt.strftime("%a %d/%m").to_numpy())
+            else:
+                prod_detail = pd.DataFrame({
+                    "OBJ/PDP": [150, 120, 100, 170, 180],
+                    "Réel": [120, 120, 90, 160, 180],
+                    "Écart": [30, 0, 10, 10, 0]
+                }, index=["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"])
+            st.dataframe(prod_detail, use_container_width=True)
+        
+        st.divider()
+        
+        # Ligne 2: KPI 10 + KPI 11
+        p3, p4 = st.columns([1, 1])
+        
+        with p3:
+            st.markdown("**Taux d'occupation**")
+            st.caption("taux d'occupation de la ligne de production")
+            
+            occupation_data = pd.DataFrame({
+                "Jour": ["lundi", "mardi", "mercredi", "jeudi", "vendredi"],
+                "Taux": [85, 78, 72, 89, 65]
+            })
+            
+            fig_occupation = go.Figure()
+            fig_occupation.add_trace(go.Bar(
+                x=occupation_data["Jour"],
+                y=occupation_data["Taux"],
+                name="Taux occupation",
+                marker=dict(color="#1f77b4")
+            ))
+            fig_occupation.add_hline(y=80, line_dash="dash", line_color="red", 
+                                     annotation_text="taux", annotation_position="right")
+            fig_occupation.update_layout(
+                height=300, margin=dict(l=30, r=30, t=20, b=50),
+                xaxis_title="", yaxis_title="",
+                showlegend=True, hovermode="x", legend=dict(x=0.5, y=-0.3, xanchor="center", yanchor="top", orientation="h")
+            )
+            st.plotly_chart(fig_occupation, width='stretch')
+        
+        with p4:
+            st.markdown("**Temps de cycle**")
+            st.caption("Les temps de la journée entre NVA et VA")
+            
+            cycle_data = pd.DataFrame({
+                "Jour": ["lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"],
+                "VA": [6, 5, 6, 5, 4],
+                "NVA": [1, 2, 1, 2, 3]
+            })
+            
+            fig_cycle = go.Figure()
+            fig_cycle.add_trace(go.Bar(
+                x=cycle_data["Jour"],
+                y=cycle_data["VA"],
+                name="VA",
+                marker=dict(color="#1f77b4")
+            ))
+            fig_cycle.add_trace(go.Bar(
+                x=cycle_data["Jour"],
+                y=cycle_data["NVA"],
+                name="NVA",
+                marker=dict(color="#ff7f0e")
+            ))
+            fig_cycle.update_layout(
+                barmode="stack",
+                height=300, margin=dict(l=30, r=30, t=20, b=50),
+                xaxis_title="", yaxis_title="",
+                showlegend=True, hovermode="x", legend=dict(x=0.5, y=-0.3, xanchor="center", yanchor="top", orientation="h")
+            )
+            st.plotly_chart(fig_cycle, width='stretch')
+    
+    # ===== COLONNE DROITE: QUALITÉ =====
+    with col_qual:
+        st.markdown("### Qualité")
+        
+        # KPI 12: Nombre de NC
+        st.markdown("**Nombre de NC**")
+        nc_data = pd.DataFrame({
+            "Jour": ["lundi", "mardi", "mercredi", "jeudi", "vendredi"],
+            "NC": [2.5, 1.5, 2.0, 2.5, 1.8]
+        })
+        
+        fig_nc = go.Figure()
+        
+        # Zones de couleur (fond)
+        # Zone verte (0 à 2.25)
+        fig_nc.add_trace(go.Scatter(
+            x=nc_data["Jour"],
+            y=[2.25] * len(nc_data),
+            fill="tozeroy",
+            fillcolor="rgba(0, 204, 0, 0.2)",
+            line=dict(color="rgba(0,0,0,0)"),
+            showlegend=False,
+            hoverinfo="skip"
+        ))
+        
+        # Zone rouge (2.25 à 3)
+        fig_nc.add_trace(go.Scatter(
+            x=nc_data["Jour"],
+            y=[3] * len(nc_data),
+            fill="tonexty",
+            fillcolor="rgba(204, 0, 0, 0.2)",
+            line=dict(color="rgba(0,0,0,0)"),
+            showlegend=False,
+            hoverinfo="skip"
+        ))
+        
+        # Courbe de données
+        fig_nc.add_trace(go.Scatter(
+            x=nc_data["Jour"],
+            y=nc_data["NC"],
+            name="NC",
+            line=dict(color="#1f77b4", width=3),
+            mode="lines+markers",
+            marker=dict(size=8)
+        ))
+        
+        fig_nc.update_layout(
+            height=250, margin=dict(l=30, r=30, t=10, b=30),
+            xaxis_title="", yaxis_title="",
+            yaxis=dict(range=[0, 3]),
+            showlegend=False, hovermode="x"
+        )
+        st.plotly_chart(fig_nc, width='stretch')
+        
+        st.divider()
+        
+        # KPI 13 + KPI 14 (côte à côte)
+        q1, q2 = st.columns([2.5, 1])
+        
+        with q1:
+            st.markdown("**Causes des NC**")
+            causes_data = pd.DataFrame({
+                "Cause": ["Mauvaise couleur", "Mauvaise hauteur", "Autres"],
+                "Pourcentage": [60, 30, 10]
+            })
+            
+            fig_causes = go.Figure()
+            fig_causes.add_trace(go.Bar(
+                x=causes_data["Cause"],
+                y=causes_data["Pourcentage"],
+                name="%",
+                marker=dict(color="#ff7f0e")
+            ))
+            fig_causes.add_trace(go.Scatter(
+                x=causes_data["Cause"],
+                y=np.cumsum(causes_data["Pourcentage"]),
+                name="% cumulé",
+                line=dict(color="#888888", width=2),
+                yaxis="y2"
+            ))
+            fig_causes.update_layout(
+                height=250, margin=dict(l=30, r=30, t=10, b=30),
+                xaxis_title="", yaxis_title="",
+                yaxis2=dict(overlaying="y", side="right"),
+                showlegend=False, hovermode="x"
+            )
+            st.plotly_chart(fig_causes, width='stretch')
+        
+        with q2:
+            st.markdown("**Taux de conforme**")
+            taux_conforme = ctx.kpi("14. Taux Conforme", lambda: float(np.random.uniform(95, 99)))
+            st.markdown(f"<div style='text-align: center; font-size: 48px; color: #00cc00; font-weight: bold;'>{taux_conforme:.0f}%</div>", 
+                       unsafe_allow_html=True)
+        
+        st.divider()
+        
+        # KPI 15
+        st.markdown("**Moyenne de la consommation d'énergie**")
+        # Cumuls journaliers de tblfinstep (kWh), simulés en attendant le premier snapshot
+        conso_energie = ctx.kpi("15. Conso Énergie", lambda: ctx.valeur_snapshot(
+            'indicator_15_consommation_energie', lambda: {
+                "j_1": float(np.random.uniform(150, 160)), "moyenne_jour": float(np.random.uniform(150, 160)),
+                "par_jour": pd.DataFrame(columns=["day", "energy_kwh", "air_nl"])}))
+        st.markdown(f"<div style='text-align: center; font-size: 32px; color: #1f77b4; font-weight: bold;'>{conso_energie['moyenne_jour']:.3f} kWh/jour</div>", 
+                   unsafe_allow_html=True)
+        st.caption(f"J-1 : {conso_energie['j_1']:.3f} kWh")
+        tendance_energie = conso_energie["par_jour"]
+        if len(tendance_energie) > 1:
+            fig_energie = go.Figure(go.Scatter(
+                x=tendance_energie["day"], y=tendance_energie["energy_kwh"],
+                mode="lines+markers", line=dict(color="#1f77b4", width=2)
+            ))
+            fig_energie.update_layout(
+                height=200, margin=dict(l=30, r=30, t=10, b=30),
+                xaxis_title="", yaxis_title="kWh", showlegend=False, hovermode="x"
+            )
+            st.plotly_chart(fig_energie, width='stretch')
@@ -0,0 +1,89 @@
+"""
+Page Robot: activité, batterie et distance parcourue (KPI 6 et 7)
+"""
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from vues import Contexte
+
+
+def afficher(ctx: Contexte):
+    ctx.display_header()
+    
+    st.title("🤖 Robotino")
+    ctx.bandeau_snapshot()
+    
+    # Section Robot
+    st.markdown("### 🤖 Robotino")
+    with st.container():
+        col_robot1, col_robot2 = st.columns(2)
+        
+        with col_robot1:
+            st.subheader("Autonomie du Robot")
+            temps_utilisation_data = pd.DataFrame({
+                "Jour": ["Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim"],
+                "Temps util. (h)": [0.75, 2.0, 1.58, 1.83, 1.42, 1.0, 0.5],
+                "Batterie (%)": [95, 85, 70, 60, 45, 30, 20]
+            })
+            
+            # Graphique mixte avec Plotly
+            fig_mixed = go.Figure()
+            fig_mixed.add_trace(go.Bar(
+                x=temps_utilisation_data["Jour"],
+                y=temps_utilisation_data["Temps util. (h)"],
+                name="Temps utilisation (h)",
+                marker_color="#1f77b4",
+                yaxis="y1"
+            ))
+            fig_mixed.add_trace(go.Scatter(
+                x=temps_utilisation_data["Jour"],
+                y=temps_utilisation_data["Batterie (%)"],
+                name="Batterie restante (%)",
+                line=dict(color="#ff7f0e", width=3),
+                yaxis="y2"
+            ))
+            fig_mixed.update_layout(
+                title_text="Activité et Batterie",
+                xaxis=dict(title="Jour de la semaine"),
+                yaxis=dict(
+                    title=dict(text="Temps utilisation (h)", font=dict(color="#1f77b4")),
+                    tickfont=dict(color="#1f77b4")
+                ),
+                yaxis2=dict(
+                    title=dict(text="Batterie (%)", font=dict(color="#ff7f0e")),
+                    tickfont=dict(color="#ff7f0e"),
+                    overlaying="y",
+                    side="right"
+                ),
+                hovermode="x unified",
+                height=350,
+                margin=dict(l=40, r=60, t=40, b=40)
+            )
+            st.plotly_chart(fig_mixed, width='stretch')
+        
+        with col_robot2:
+            st.subheader("Distance parcourue")
+            # Odométrie par jour (remises à zéro, sauts et trous écartés), simulée avant le premier snapshot
+            distance = ctx.kpi("7. Distance Parcourue", lambda: ctx.valeur_snapshot(
+                'distance_series', lambda: pd.DataFrame({
+                    "period": ["Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim"],
+                    "cumulative": [120, 350, 600, 850, 1100, 1320, 1450]})))
+            
+            fig_distance = go.Figure()
+            fig_distance.add_trace(go.Scatter(
+                x=distance["period"],
+                y=distance["cumulative"],
+                name="Distance totale (m)",
+                line=dict(color="#2ca02c", width=3)
+            ))
+            fig_distance.update_layout(
+                title_text="Distance cumulée",
+                xaxis_title="Jour",
+                yaxis_title="Distance (m)",
+                height=350,
+                margin=dict(l=40, r=40, t=40, b=40),
+                hovermode="x"
+            )
+            st.plotly_chart(fig_distance, width='stretch')
@@ -0,0 +1,114 @@
+"""
+Page Stockage: taux d'occupation, mouvements et carte des magasins (KPI 4 et 5)
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from vues import Contexte
+
+
+def afficher(ctx: Contexte):
+    ctx.display_header()
+    
+    st.title("📦 Logistique")
+    ctx.bandeau_snapshot()
+    
+    # Section Stockage
+    st.markdown("### 📦 Stockage")
+    with st.container():
+        col_stock1, col_stock2 = st.columns(2)
+        
+        with col_stock1:
+            st.subheader("Taux d'occupation de l'espace de stockage")
+            # Grille des positions tenue à jour par le journal des changements (simulée avant le premier snapshot)
+            stockage = ctx.kpi("4. Taux Occupation Stockage", lambda: ctx.valeur_snapshot(
+                'indicator_4_taux_occupation', lambda: {"taux": int(np.random.randint(45, 95))}))
+            occupation = stockage["taux"]
+            
+            # Jauge demi-cercle simple avec Plotly
+            gauge_fig = go.Figure(go.Indicator(
+                mode="gauge+number",
+                value=occupation,
+                number={"suffix": "%", "font": {"size": 20}},
+                gauge={
+                    "shape": "angular",
+                    "axis": {
+                        "range": [0, 100],
+                        "tickwidth": 1,
+                        "tickcolor": "#888",
+                        "nticks": 6
+                    },
+                    "bar": {"color": "#161b22", "thickness": 0.99},
+                    "steps": [
+                        {"range": [0, 70], "color": "#00aa00"},
+                        {"range": [70, 85], "color": "#ff9900"},
+                        {"range": [85, 100], "color": "#cc0000"}
+                    ],
+                },
+                domain={"x": [0, 1], "y": [0, 1]},
+            ))
+            gauge_fig.update_layout(margin=dict(l=10, r=10, t=10, b=10), height=280)
+            st.plotly_chart(gauge_fig, width='stretch')
+        
+        with col_stock2:
+            st.subheader("Mouvements Stocks (7j)")
+            # Journal des changements de tblbufferpos, simulé en attendant le premier snapshot
+            mouvements = ctx.kpi("5. Mouvements Stocks", lambda: ctx.valeur_snapshot(
+                'indicator_5_mouvements_stocks', lambda: {"par_jour": pd.DataFrame(
+                    np.random.randint(10, 50, size=(7, 2)), columns=['entrees', 'sorties'])}))
+            chart_data = mouvements["par_jour"].rename(columns={'entrees': 'Entrées', 'sorties': 'Sorties'})
+            if 'jour' in chart_data.columns:
+                chart_data = chart_data.set_index('jour')
+            chart_data = chart_data[['Entrées', 'Sorties']]
+            # Plotly plutôt que st.line_chart: Altair valide sa spécification JSON à chaque rerun (~0.1s)
+            fig_mouvements = go.Figure([go.Scatter(x=chart_data.index, y=chart_data[serie], name=serie, mode="lines")
+                                        for serie in chart_data.columns])
+            fig_mouvements.update_layout(height=280, margin=dict(l=30, r=30, t=10, b=30), hovermode="x",
+                                         legend=dict(x=0.5, y=-0.2, xanchor="center", yanchor="top", orientation="h"))
+            st.plotly_chart(fig_mouvements, width='stretch')
+    
+    # Carte des magasins et évolution de l'occupation (grille en mémoire, sans relire tblbufferpos)
+    carte = stockage.get("carte")
+    if carte is not None and not carte.empty:
+        st.markdown("### 🗺️ Carte du stockage")
+        col_carte1, col_carte2 = st.columns(2)
+        
+        with col_carte1:
+            magasins = carte[['ResourceId', 'BufNo', 'Description']].drop_duplicates()
+            libelles = {f"{m.Description} ({m.ResourceId}/{m.BufNo})": (m.ResourceId, m.BufNo)
+                        for m in magasins.itertuples(index=False)}
+            choix = st.selectbox("Magasin", list(libelles))
+            ressource, buffer = libelles[choix]
+            positions = carte[(carte['ResourceId'] == ressource) & (carte['BufNo'] == buffer)]
+            etats = positions.pivot(index='ligne', columns='colonne', values='code')
+            survol = positions.assign(texte=positions['BufPos'].map('Position {}'.format) + "<br>" + positions['etat']
+                                      + "<br>PNo " + positions['PNo'].astype(str) + " / Caisse " + positions['BoxID'].astype(str)
+                                      ).pivot(index='ligne', columns='colonne', values='texte')
+            fig_carte = go.Figure(go.Heatmap(
+                z=etats.values, x=[f"C{c + 1}" for c in etats.columns], y=[f"R{r + 1}" for r in etats.index],
+                text=survol.values, hoverinfo="text", zmin=0, zmax=3, xgap=2, ygap=2,
+                colorscale=[[0, "#2b2f36"], [0.33, "#1f77b4"], [0.67, "#00aa00"], [1, "#ff9900"]],
+                colorbar=dict(tickvals=[0, 1, 2, 3], ticktext=["Vide", "Pièces", "Caisse", "Réservée"]),
+            ))
+            fig_carte.update_layout(height=320, margin=dict(l=30, r=30, t=20, b=30), yaxis=dict(autorange="reversed"))
+            st.plotly_chart(fig_carte, width='stretch')
+        
+        with col_carte2:
+            st.caption("Occupation par type de stockage")
+            historique = stockage.get("historique")
+            if historique is not None and not historique.empty:
+                fig_historique = go.Figure()
+                for type_stock, points in historique.groupby('type'):
+                    fig_historique.add_trace(go.Scatter(x=points['at'], y=points['taux_pct'], name=type_stock,
+                                                        mode="lines", line_shape="hv"))
+                fig_historique.update_layout(
+                    height=260, margin=dict(l=30, r=30, t=20, b=50), yaxis_title="%",
+                    legend=dict(x=0.5, y=-0.3, xanchor="center", yanchor="top", orientation="h"))
+                st.plotly_chart(fig_historique, width='stretch')
+            st.dataframe(stockage["par_zone"].rename(columns={'zone': 'Zone', 'positions': 'Positions',
+                                                              'occupees': 'Occupées', 'reservees': 'Réservées',
+                                                              'taux_pct': 'Taux (%)'}).round(1),
+                         hide_index=True, width='stretch')
@@ -0,0 +1,112 @@
+"""
+Page Temps Réel (Opérateur): autonomie robot, OF et production du jour (KPI 1 à 3)
+Sans Plotly: les barres sont en HTML, la page reste la plus légère à ouvrir et à rafraîchir
+"""
+
+import numpy as np
+import streamlit as st
+
+from vues import Contexte
+
+
+def afficher(ctx: Contexte):
+    ctx.display_header()
+    
+    st.title("🏭 Suivi Production - Temps Réel")
+    snapshot_kpi = ctx.bandeau_snapshot()
+    if snapshot_kpi is not None:
+        st.info(f"Dernière mise à jour : {snapshot_kpi.computed_at.strftime('%d/%m/%Y %H:%M:%S')} "
+                f"(snapshot v{snapshot_kpi.version})")
+    
+    # Valeurs du snapshot partagé (simulées en attendant le premier calcul), mises en cache
+    # None: aucune mesure robot sur la période, affichée "—" sans alerte batterie
+    autonomie_restante = ctx.kpi("1. Autonomie Robot", lambda: ctx.valeur_snapshot(
+        'indicator_1_autonomie_robot', lambda: (int(np.random.randint(50, 95)), 0))[0])
+    of_realises, of_restants = ctx.kpi("2. OF Réalisés", lambda: ctx.valeur_snapshot(
+        'indicator_2_of_realises', lambda: (lambda faits: (faits, 16 - faits))(int(np.random.randint(8, 16)))))
+    of_total = int(of_realises + of_restants)
+    production_realisee = int(ctx.kpi("3. Production Réalisée", lambda: ctx.valeur_snapshot(
+        'indicator_3_production_realisee', lambda: (int(np.random.randint(400, 650)), 0))[0]))
+    production_objectif = 720
+    
+    # KPIs verticaux avec barres personnalisées
+    # KPI 1 : Autonomie Robot
+    if autonomie_restante is None:
+        barre_autonomie = """
+                <div style="width: 100%; display: flex; align-items: center; justify-content: center; color: #aaa; font-weight: bold;">
+                    — Aucune mesure robot sur la période
+                </div>"""
+    else:
+        autonomie_restante = int(autonomie_restante)
+        barre_autonomie = f"""
+                <div style="width: {autonomie_restante}%; background-color: #00cc00; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
+                    {autonomie_restante}% Restant
+                </div>
+                <div style="width: {100 - autonomie_restante}%; background-color: #cc0000; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
+                    {100 - autonomie_restante}% Utilisé
+                </div>"""
+    st.markdown(f"""
+        <div style="width: 100%; margin-bottom: 30px;">
+            <div style="text-align: center; font-weight: bold; font-size: 18px; margin-bottom: 10px;">
+                🔋 Autonomie Robot
+            </div>
+            <div style="width: 100%; height: 50px; background-color: #333; border-radius: 5px; overflow: hidden; display: flex;">
+                {barre_autonomie}
+            </div>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    # KPI 2 : OF Réalisés
+    if of_total == 0:
+        barre_of = """
+                <div style="width: 100%; display: flex; align-items: center; justify-content: center; color: #aaa; font-weight: bold;">
+                    — Aucun OF sur la période
+                </div>"""
+    else:
+        pct_of_fait = (of_realises / of_total) * 100
+        barre_of = f"""
+                <div style="width: {pct_of_fait}%; background-color: #00cc00; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
+                    {of_realises} Réalisés
+                </div>
+                <div style="width: {100 - pct_of_fait}%; background-color: #cc0000; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
+                    {of_restants} Restants
+                </div>"""
+    st.markdown(f"""
+        <div style="width: 100%; margin-bottom: 30px;">
+            <div style="text-align: center; font-weight: bold; font-size: 18px; margin-bottom: 10px;">
+                ✅ OF Réalisés (Jour)
+            </div>
+            <div style="width: 100%; height: 50px; background-color: #333; border-radius: 5px; overflow: hidden; display: flex;">
+                {barre_of}
+            </div>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    # KPI 3 : Production
+    pct_prod_fait = (production_realisee / production_objectif) * 100
+    pct_prod_reste = 100 - pct_prod_fait if pct_prod_fait < 100 else 0
+    st.markdown(f"""
+        <div style="width: 100%; margin-bottom: 30px;">
+            <div style="text-align: center; font-weight: bold; font-size: 18px; margin-bottom: 10px;">
+                📱 Production (Unités)
+            </div>
+            <div style="width: 100%; height: 50px; background-color: #333; border-radius: 5px; overflow: hidden; display: flex;">
+                <div style="width: {min(pct_prod_fait, 100)}%; background-color: #00cc00; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
+                    {production_realisee} unités
+                </div>
+                <div style="width: {pct_prod_reste}%; background-color: #cc0000; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold;">
+                    {'Objectif: ' + str(production_objectif) if pct_prod_reste > 0 else ''}
+                </div>
+            </div>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("### ⚠️ Alertes en cours")
+    if autonomie_restante is not None and autonomie_restante < 30:
+        st.error("🔴 ALERTE : Batterie robot critique (<30%)")
+    elif autonomie_restante is not None and autonomie_restante < 50:
+        st.warning("🟠 ATTENTION : Batterie robot faible (30-50%)")
+    elif of_total > 0 and production_realisee < (production_objectif * 0.5):
+        st.warning("⚠️ Production en retard par rapport à l'objectif")
+    else:
+        st.success("✅ Aucune alerte critique. Ligne nominale.")
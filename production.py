@@ -0,0 +1,131 @@
+"""
+Production journalière (indicateurs 8 et 9): OF terminés (tblfinorder) et positions terminées
+(tblfinorderpos) par jour de fin, dans une table de cumuls persistée (rollups.DailyRollup).
+Les vues hebdomadaire et détaillée lisent quelques lignes de cumuls, complétées par les jours
+du calendrier sans production, avec l'objectif et l'écart
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+
+from rollups import DailyRollup
+
+
+# Objectif hebdomadaire (OF) réparti sur les jours ouvrés (lundi = 0 ... vendredi = 4)
+WEEKLY_OBJECTIVE = 720
+WORKING_DAYS = (0, 1, 2, 3, 4)
+# Fenêtre par défaut sans période: les 7 jours se terminant au dernier jour produit
+DEFAULT_DAYS = 7
+
+ROLLUP_COLUMNS = ['day', 'orders', 'positions']
+CALENDAR_COLUMNS = ['jour', 'production', 'positions', 'objectif', 'ecart']
+
+ORDERS_SQL = """
+    SELECT DATE(End) as day, COUNT(*) as orders
+    FROM tblfinorder
+    WHERE End IS NOT NULL AND {condition}
+    GROUP BY DATE(End)
+"""
+POSITIONS_SQL = """
+    SELECT DATE(End) as day, COUNT(*) as positions
+    FROM tblfinorderpos
+    WHERE End IS NOT NULL AND {condition}
+    GROUP BY DATE(End)
+"""
+
+
+def _count_by_day(ends: pd.Series, name: str) -> pd.Series:
+    days = pd.to_datetime(ends.dropna()).dt.date
+    return days.value_counts().rename(name)
+
+
+def daily_production(orders: pd.DataFrame, positions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cumuls journaliers à partir des tables (snapshot): OF et positions terminés par jour de fin
+
+    Args:
+        orders: tblfinorder (colonne End), positions: tblfinorderpos (colonne End)
+    Returns: DataFrame (day, orders, positions) trié par jour
+    """
+    counts = [_count_by_day(frame['End'], name) for frame, name in ((orders, 'orders'), (positions, 'positions'))
+              if 'End' in frame.columns]
+    return _combine(counts)
+
+
+def production_from_sql(orders: pd.DataFrame, positions: pd.DataFrame) -> pd.DataFrame:
+    """Combine les résultats de ORDERS_SQL et POSITIONS_SQL au format des cumuls"""
+    counts = []
+    for frame, name in ((orders, 'orders'), (positions, 'positions')):
+        if not frame.empty and name in frame.columns:
+            counts.append(pd.Series(frame[name].astype('int64').to_numpy(),
+                                    index=pd.to_datetime(frame['day']).dt.date, name=name))
+    return _combine(counts)
+
+
+def _combine(counts) -> pd.DataFrame:
+    if not counts:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    daily = pd.concat(counts, axis=1).reindex(columns=ROLLUP_COLUMNS[1:]).fillna(0).astype('int64')
+    return daily.rename_axis('day').sort_index().reset_index()
+
+
+def calendar(daily: pd.DataFrame, start=None, end=None,
+             weekly_objective: float = WEEKLY_OBJECTIVE) -> pd.DataFrame:
+    """
+    Production jour par jour sur [start, end[, jours sans production compris (production = 0)
+
+    Sans période, fenêtre de DEFAULT_DAYS jours se terminant au dernier jour produit.
+    Objectif du jour = weekly_objective réparti sur les jours ouvrés, 0 le week-end
+
+    Args:
+        daily: Cumuls (day, orders, positions)
+        start, end: Bornes normalisées (datetime, fin exclue)
+    Returns: DataFrame (jour, production, positions, objectif, ecart) trié par jour
+    """
+    if start is None or end is None:
+        if daily.empty:
+            return pd.DataFrame(columns=CALENDAR_COLUMNS)
+        last = max(daily['day']) if end is None else (pd.Timestamp(end) - timedelta(microseconds=1)).date()
+        first = (pd.Timestamp(start).date() if start is not None
+                 else last - timedelta(days=DEFAULT_DAYS - 1))
+    else:
+        first = pd.Timestamp(start).date()
+        last = (pd.Timestamp(end) - timedelta(microseconds=1)).date()
+    if last < first:
+        return pd.DataFrame(columns=CALENDAR_COLUMNS)
+
+    days = pd.date_range(first, last, freq='D')
+    counts = daily.set_index('day')[['orders', 'positions']] if not daily.empty else None
+    result = pd.DataFrame({'jour': days.date})
+    if counts is not None:
+        counts.index = pd.to_datetime(counts.index)
+        counts = counts.reindex(days, fill_value=0)
+        result['production'] = counts['orders'].to_numpy()
+        result['positions'] = counts['positions'].to_numpy()
+    else:
+        result['production'] = 0
+        result['positions'] = 0
+    per_day = weekly_objective / len(WORKING_DAYS)
+    result['objectif'] = days.weekday.isin(WORKING_DAYS).astype('float64') * per_day
+    result['ecart'] = result['production'] - result['objectif']
+    return result[CALENDAR_COLUMNS]
+
+
+class ProductionRollup(DailyRollup):
+    """Cumuls journaliers de production, persistés dans production_daily.parquet"""
+
+    FILE = 'production_daily.parquet'
+    COLUMNS = ROLLUP_COLUMNS
+    SORT = ['day']
+
+    def _fetch(self, since: Optional[datetime]) -> Optional[pd.DataFrame]:
+        condition, params = ("1 = 1", None) if since is None else ("End >= %s", [since])
+        orders = self.query_func(ORDERS_SQL.format(condition=condition), params)
+        positions = self.query_func(POSITIONS_SQL.format(condition=condition), params)
+        # Un DataFrame sans colonnes signale une requête en erreur
+        if len(orders.columns) == 0 or len(positions.columns) == 0:
+            return None
+        return production_from_sql(orders, positions)
+
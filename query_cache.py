@@ -0,0 +1,261 @@
+"""
+Cache des résultats de requêtes de MESIndicators.query_db
+Clé: (SQL normalisé, paramètres, versions des tables lues). La version d'une table est relevée
+par des sondes peu coûteuses (information_schema, MAX d'une colonne indexée): un résultat est
+servi depuis la mémoire tant que ses tables n'ont pas changé, et ses entrées sont supprimées
+dès qu'une version change. Éviction LRU sous un plafond mémoire
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from db_pool import DatabaseUnavailableError
+from kpi_metrics import frame_bytes
+
+
+DEFAULT_MAX_MB = 64.0
+# Un résultat plus gros que cette part du plafond n'est pas mis en cache (synchronisations complètes)
+MAX_ENTRY_SHARE = 0.25
+# Durée (s) pendant laquelle les versions relevées sont réutilisées (une sonde par rafraîchissement)
+DEFAULT_PROBE_TTL = 1.0
+
+# Sondes de contenu en plus d'information_schema (UPDATE_TIME n'est pas conservé par InnoDB après
+# un redémarrage): MAX d'une colonne indexée, en O(log n)
+CONTENT_PROBES: Dict[str, str] = {
+    'tblbufferpos': 'MAX(TimeStamp)',
+    'tblmachinereport': 'MAX(TimeStamp)',
+    'tblfinorder': 'MAX(End)',
+    'tblfinorderpos': 'MAX(End)',
+    'tblfinstep': 'MAX(End)',
+}
+
+SCHEMA_PROBE = """
+    SELECT LOWER(TABLE_NAME) as table_name, UPDATE_TIME as update_time,
+           TABLE_ROWS as table_rows, AUTO_INCREMENT as auto_increment
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+# Chaînes quotées (laissées telles quelles) ou suites d'espaces
+_SPACES_RE = re.compile(r"('(?:[^'\\]|\\.)*'|\"[^\"]*\"|`[^`]*`)|\s+", re.S)
+_TABLE_RE = re.compile(r"\b(?:FROM|JOIN)\s+[`\"]?([\w.]+)[`\"]?(\s*\()?", re.I)
+# Jointure par virgule (FROM a [alias], b): les tables après la première ne sont pas relevées par _TABLE_RE
+_COMMA_JOIN_RE = re.compile(r"\bFROM\s+[`\"]?[\w.]+[`\"]?(?:\s+(?:AS\s+)?\w+)?\s*,", re.I)
+_VOLATILE_RE = re.compile(r"\b(?:NOW|CURDATE|CURTIME|SYSDATE|RAND|UUID|CURRENT_DATE|CURRENT_TIME|"
+                          r"CURRENT_TIMESTAMP|UNIX_TIMESTAMP|LAST_INSERT_ID)\b", re.I)
+
+VersionsFunc = Callable[[Iterable[str]], Optional[Dict[str, Hashable]]]
+
+
+def normalize_sql(query: str) -> str:
+    """Requête sur une ligne: espaces consécutifs réduits hors des chaînes, sans ; final"""
+    text = _SPACES_RE.sub(lambda m: m.group(1) or ' ', query).strip()
+    return text[:-1].rstrip() if text.endswith(';') else text
+
+
+def query_tables(query: str) -> Optional[FrozenSet[str]]:
+    """
+    Tables lues par une requête (FROM / JOIN), en minuscules
+
+    Returns: None si le résultat ne peut pas être mis en cache: instruction autre qu'un SELECT,
+             fonction non déterministe (NOW, RAND...), table système (schema.table) ou fonction
+             de table, jointure par virgule (FROM a, b), aucune table
+    """
+    text = query.lstrip().lower()
+    if not text.startswith(('select', 'with')) or _VOLATILE_RE.search(query) or _COMMA_JOIN_RE.search(query):
+        return None
+    tables = set()
+    for name, call in _TABLE_RE.findall(query):
+        if '.' in name or call:
+            return None
+        tables.add(name.lower())
+    return frozenset(tables) or None
+
+
+def _params_key(params: Optional[List]) -> Optional[Tuple]:
+    key = tuple(params or ())
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class SchemaVersionProbe:
+    """
+    Versions des tables MariaDB: (UPDATE_TIME, TABLE_ROWS, AUTO_INCREMENT) d'information_schema
+    et sondes de contenu (CONTENT_PROBES), relevées en deux requêtes au plus par probe_ttl
+    """
+
+    def __init__(self, query_func: Callable[..., pd.DataFrame], probe_ttl: float = DEFAULT_PROBE_TTL,
+                 probes: Optional[Dict[str, str]] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            query_func: Exécution directe d'une requête (sans passer par le cache)
+            probe_ttl: Durée (s) de validité des versions relevées
+            probes: Sondes de contenu par table (défaut: CONTENT_PROBES)
+            clock: Horloge (monotone)
+        """
+        self.query_func = query_func
+        self.probe_ttl = probe_ttl
+        self.probes = dict(CONTENT_PROBES if probes is None else probes)
+        self.clock = clock
+        self.available = True
+        self._versions: Dict[str, Hashable] = {}
+        self._probed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _probe(self) -> Optional[Dict[str, Hashable]]:
+        schema = self.query_func(SCHEMA_PROBE)
+        if len(schema.columns) == 0:
+            return None
+        versions: Dict[str, Hashable] = {
+            row.table_name: (str(row.update_time), str(row.table_rows), str(row.auto_increment))
+            for row in schema.itertuples(index=False)}
+        probed = [table for table in self.probes if table in versions]
+        if probed:
+            content = self.query_func(" UNION ALL ".join(
+                f"SELECT '{table}' as table_name, CAST({self.probes[table]} AS CHAR) as version FROM {table}"
+                for table in probed))
+            if len(content.columns) == 0:
+                return None
+            for row in content.itertuples(index=False):
+                versions[row.table_name] = versions[row.table_name] + (str(row.version),)
+        return versions
+
+    def versions(self, tables: Iterable[str]) -> Optional[Dict[str, Hashable]]:
+        """
+        Versions des tables demandées (relevées à nouveau si elles datent de plus de probe_ttl)
+
+        Returns: {table: version}, None si les sondes ont échoué (pas de mise en cache)
+        """
+        with self._lock:
+            if not self.available:
+                return None
+            if self._probed_at is None or self.clock() - self._probed_at >= self.probe_ttl:
+                try:
+                    versions = self._probe()
+                except DatabaseUnavailableError:
+                    raise
+                except Exception:
+                    versions = None
+                if versions is None:
+                    # Droits insuffisants sur information_schema: cache des requêtes désactivé
+                    self.available = False
+                    print("⚠️  Versions des tables indisponibles: cache des requêtes désactivé")
+                    return None
+                self._versions, self._probed_at = versions, self.clock()
+            return {table: self._versions.get(table) for table in tables}
+
+    def expire(self):
+        """Force un nouveau relevé à la prochaine requête (ex: après une écriture)"""
+        with self._lock:
+            self._probed_at = None
+
+
+class QueryCache:
+    """Résultats de requêtes en mémoire (thread-safe), LRU sous un plafond en octets"""
+
+    def __init__(self, versions: VersionsFunc, max_mb: float = DEFAULT_MAX_MB):
+        """
+        Args:
+            versions: Fonction (tables) -> {table: version}, None si inconnues
+                      (SchemaVersionProbe.versions, EmbeddedBackend.table_versions)
+            max_mb: Mémoire maximale des résultats conservés (Mo)
+        """
+        self.versions = versions
+        self.max_bytes = int(max_mb * 1e6)
+        # clé -> (résultat, octets, tables)
+        self._entries: 'OrderedDict[Tuple, Tuple[pd.DataFrame, int, FrozenSet[str]]]' = OrderedDict()
+        # Dernière version vue par table: un changement supprime les entrées de la table
+        self._seen: Dict[str, Hashable] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, query: str, params: Optional[List] = None) -> Optional[Tuple]:
+        """
+        Clé de cache d'une requête, avec les versions courantes de ses tables
+
+        Returns: None si le résultat ne doit pas être mis en cache
+        """
+        tables = query_tables(query)
+        params_key = _params_key(params)
+        if tables is None or params_key is None:
+            return None
+        versions = self.versions(tables)
+        if versions is None:
+            return None
+        stamp = tuple(sorted(versions.items()))
+        self._invalidate_changed(versions)
+        return (normalize_sql(query), params_key, stamp)
+
+    def _invalidate_changed(self, versions: Dict[str, Hashable]):
+        with self._lock:
+            changed = {t for t, v in versions.items() if t in self._seen and self._seen[t] != v}
+            self._seen.update(versions)
+            if not changed:
+                return
+            stale = [k for k, (_, _, tables) in self._entries.items() if tables & changed]
+            for k in stale:
+                self._drop(k)
+            self.invalidations += len(stale)
+
+    def _drop(self, key: Tuple):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def get(self, key: Tuple) -> Optional[pd.DataFrame]:
+        """Résultat en cache (copie: l'appelant peut le modifier), None si absent"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            frame = entry[0]
+        return frame.copy()
+
+    def put(self, key: Tuple, result: pd.DataFrame) -> bool:
+        """
+        Mémorise un résultat (copie), en évinçant les moins récemment lus au-delà du plafond
+
+        Returns: False si le résultat est trop gros pour être mis en cache
+        """
+        size = frame_bytes(result)
+        if size > self.max_bytes * MAX_ENTRY_SHARE:
+            return False
+        tables = frozenset(table for table, _ in key[2])
+        frame = result.copy()
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (frame, size, tables)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """État du cache (page Admin)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries), 'memory_mb': round(self.bytes / 1e6, 3),
+                    'max_mb': round(self.max_bytes / 1e6, 3), 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                    'evictions': self.evictions, 'invalidations': self.invalidations}
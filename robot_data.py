@@ -0,0 +1,429 @@
+"""
+Chargement optimisé des données du Robotino (robotino_data.csv)
+Seules les colonnes utiles aux indicateurs sont lues, avec des types compacts et par blocs.
+Un cache binaire Arrow (Feather) placé à côté du CSV évite de re-tokeniser le texte
+à chaque démarrage: seule la fin ajoutée au fichier est reconvertie.
+"""
+
+import hashlib
+import io
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from robot_distance import ODOMETRY_COLUMNS, odometry_steps
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+
+# Colonnes nécessaires à chaque indicateur robot (les autres colonnes du CSV sont ignorées)
+ROBOT_COLUMNS: Dict[str, List[str]] = {
+    'indicator_1': ['timestamp', 'device_potAccuChargeState_centiPercent', 'battery_level', 'battery'],
+    'indicator_6': ['timestamp', 'device_potAccuChargeState_centiPercent', 'power_output_current'],
+    'indicator_7': ['timestamp', 'odometry_x', 'odometry_y', 'odometry_vx', 'odometry_vy', 'odometry_seq'],
+}
+
+# Types explicites (float32 suffit largement à la précision des capteurs)
+ROBOT_DTYPES: Dict[str, str] = {
+    'device_potAccuChargeState_centiPercent': 'float32',
+    'battery_level': 'float32',
+    'battery': 'float32',
+    'power_output_current': 'float32',
+    'power_voltage': 'float32',
+    'odometry_x': 'float32',
+    'odometry_y': 'float32',
+    'odometry_phi': 'float32',
+    'odometry_vx': 'float32',
+    'odometry_vy': 'float32',
+    'odometry_omega': 'float32',
+    'odometry_seq': 'float64',
+    'power_batteryLow': 'boolean',
+    'power_ext_power': 'boolean',
+}
+
+TIMESTAMP_COLUMN = 'timestamp'
+DEFAULT_CHUNKSIZE = 50_000
+
+CACHE_SUFFIX = '.feather'
+CACHE_META_SUFFIX = '.feather.json'
+CACHE_VERSION = 1
+# Taille de l'extrait avant l'offset du cache utilisé pour vérifier que le début du CSV n'a pas changé
+PREFIX_CHECK_BYTES = 4096
+
+
+def robot_columns(indicators: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Union des colonnes déclarées pour les indicateurs demandés
+
+    Args:
+        indicators: Clés de ROBOT_COLUMNS (None = tous les indicateurs robot)
+    """
+    keys = ROBOT_COLUMNS.keys() if indicators is None else indicators
+    columns: List[str] = []
+    for key in keys:
+        for column in ROBOT_COLUMNS[key]:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def _typed_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Applique les types déclarés à un bloc lu"""
+    for column in chunk.columns:
+        if column == TIMESTAMP_COLUMN:
+            chunk[column] = pd.to_datetime(chunk[column], format='ISO8601', errors='coerce')
+        elif column in ROBOT_DTYPES:
+            dtype = ROBOT_DTYPES[column]
+            if dtype == 'boolean':
+                chunk[column] = chunk[column].map({'True': True, 'False': False, True: True, False: False})
+            chunk[column] = chunk[column].astype(dtype)
+    return chunk
+
+
+def estimate_full_memory(csv_path: str, rows: int, sample_rows: int = 500) -> int:
+    """
+    Estime la mémoire d'un chargement complet (toutes colonnes, types par défaut)
+    en extrapolant un échantillon des premières lignes
+
+    Returns: octets estimés
+    """
+    sample = pd.read_csv(csv_path, nrows=sample_rows)
+    if sample.empty:
+        return 0
+    return int(sample.memory_usage(deep=True).sum() / len(sample) * rows)
+
+
+def _read_columns(source, wanted: set, chunksize: int) -> pd.DataFrame:
+    """Lit par blocs les colonnes retenues d'un CSV (chemin ou buffer) et applique les types"""
+    # Les types sont appliqués après lecture: le parseur ne tokenise que les colonnes retenues
+    reader = pd.read_csv(
+        source,
+        usecols=lambda column: column in wanted,
+        dtype={c: 'float32' for c, t in ROBOT_DTYPES.items() if t == 'float32' and c in wanted},
+        chunksize=chunksize,
+    )
+    chunks = [_typed_chunk(chunk) for chunk in reader]
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=sorted(wanted))
+
+
+def _memory_stats(data: pd.DataFrame, full_bytes: int, report: bool) -> Dict:
+    """Mémoire chargée vs estimation d'une lecture complète (affichée si report)"""
+    loaded_bytes = int(data.memory_usage(deep=True).sum())
+    stats = {
+        'rows': len(data),
+        'columns': len(data.columns),
+        'memory_bytes': loaded_bytes,
+        'full_memory_bytes_estimate': full_bytes,
+        'saved_bytes_estimate': max(full_bytes - loaded_bytes, 0),
+    }
+    if report:
+        saved_pct = stats['saved_bytes_estimate'] / full_bytes * 100 if full_bytes else 0
+        print(f"   💾 Mémoire robot: {loaded_bytes / 1e6:.2f} Mo ({stats['columns']} colonnes) "
+              f"vs ~{full_bytes / 1e6:.2f} Mo en lecture complète "
+              f"→ {saved_pct:.0f}% économisés")
+    return stats
+
+
+def load_robot_csv(csv_path: str, columns: Optional[List[str]] = None,
+                   chunksize: int = DEFAULT_CHUNKSIZE, report: bool = True) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Charge le CSV robot en ne gardant que les colonnes utiles, typées, lu par blocs
+
+    Args:
+        csv_path: Chemin vers robotino_data.csv
+        columns: Colonnes à charger (défaut: toutes celles des indicateurs robot).
+                 Les colonnes absentes du fichier sont ignorées
+        chunksize: Nombre de lignes par bloc
+        report: Affiche la mémoire utilisée et la mémoire économisée
+    Returns: (DataFrame, statistiques mémoire)
+    """
+    data = _read_columns(csv_path, set(columns or robot_columns()), chunksize)
+    full_bytes = estimate_full_memory(csv_path, len(data)) if report else 0
+    return data, _memory_stats(data, full_bytes, report)
+
+
+# ========== CACHE BINAIRE (ARROW / FEATHER) ==========
+
+def complete_records_end(buffer: bytes) -> int:
+    """
+    Position de fin du dernier enregistrement CSV complet du buffer
+    Un saut de ligne n'est une fin d'enregistrement que hors d'un champ entre guillemets
+    (le champ festool_charger_message contient des retours à la ligne)
+
+    Returns: nombre d'octets à conserver (0 si aucun enregistrement complet)
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    # Parité du nombre de guillemets vus: impaire = à l'intérieur d'un champ quoté ("" compte double)
+    inside_quotes = (np.cumsum(data == ord('"')) & 1).astype(bool)
+    ends = np.flatnonzero((data == ord('\n')) & ~inside_quotes)
+    return int(ends[-1]) + 1 if len(ends) else 0
+
+
+def cached_columns() -> List[str]:
+    """Colonnes conservées dans le cache: toutes les colonnes déclarées (indicateurs + types)"""
+    columns = robot_columns()
+    for column in ROBOT_DTYPES:
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def _cache_paths(csv_path: str) -> Tuple[str, str]:
+    base = os.path.splitext(csv_path)[0]
+    return base + CACHE_SUFFIX, base + CACHE_META_SUFFIX
+
+
+def _prefix_hash(csv_path: str, offset: int) -> str:
+    """Empreinte des octets précédant l'offset (détecte une réécriture du début du fichier)"""
+    with open(csv_path, 'rb') as f:
+        f.seek(max(offset - PREFIX_CHECK_BYTES, 0))
+        return hashlib.sha1(f.read(min(offset, PREFIX_CHECK_BYTES))).hexdigest()
+
+
+def _read_cache(cache_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lit le cache Feather par memory-mapping: les colonnes sont lues directement dans les pages
+    mappées (pas de tampon de lecture), puis copiées une fois dans les blocs pandas par to_pandas()
+    """
+    table = feather.read_table(cache_path, columns=columns, memory_map=True)
+    return table.to_pandas(types_mapper={pa.bool_(): pd.BooleanDtype()}.get)
+
+
+def _write_cache(data: pd.DataFrame, cache_path: str, meta_path: str, meta: Dict) -> bool:
+    """Écrit le cache (non compressé pour rester mappable) puis ses métadonnées"""
+    tmp_path = cache_path + '.tmp'
+    try:
+        feather.write_feather(data.reset_index(drop=True), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, cache_path)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        return True
+    except OSError as e:
+        # Sous Windows un cache encore mappé ne peut pas être remplacé: on le réécrira au prochain démarrage
+        print(f"   ⚠️  Cache robot non mis à jour: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def load_robot_cached(csv_path: str, columns: Optional[List[str]] = None,
+                      chunksize: int = DEFAULT_CHUNKSIZE, report: bool = True) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Charge les données robot via le cache binaire placé à côté du CSV
+
+    - cache à jour (taille et mtime du CSV inchangées): lecture memory-mappée du cache
+    - CSV agrandi (ajout en fin de fichier): seule la fin ajoutée est convertie
+    - CSV réécrit ou colonnes manquantes dans le cache: reconstruction complète
+
+    Args:
+        csv_path: Chemin vers robotino_data.csv
+        columns: Colonnes à retourner (défaut: toutes celles des indicateurs robot)
+        chunksize: Nombre de lignes par bloc lors de la conversion
+        report: Affiche l'état du cache et la mémoire économisée
+    Returns: (DataFrame, statistiques mémoire + 'cache': hit / tail / rebuild)
+    """
+    if not ARROW_AVAILABLE:
+        return load_robot_csv(csv_path, columns, chunksize, report)
+
+    requested = list(columns or robot_columns())
+    cache_path, meta_path = _cache_paths(csv_path)
+    source = os.stat(csv_path)
+
+    meta = None
+    if os.path.exists(cache_path) and os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != CACHE_VERSION or not set(requested) <= set(meta['declared']):
+            meta = None
+
+    status = 'rebuild'
+    if meta is not None and source.st_size == meta['source_size'] and source.st_mtime == meta['source_mtime']:
+        status = 'hit'
+    elif (meta is not None and source.st_size > meta['offset']
+          and _prefix_hash(csv_path, meta['offset']) == meta['prefix_sha1']):
+        status = 'tail'
+
+    if status == 'hit':
+        data = _read_cache(cache_path, [c for c in requested if c in meta['columns']])
+    else:
+        declared = sorted(set(cached_columns()) | set(requested))
+        with open(csv_path, 'rb') as f:
+            header = f.readline()
+            start = meta['offset'] if status == 'tail' else len(header)
+            f.seek(start)
+            raw = f.read()
+        cut = complete_records_end(raw)
+        # Le tail est relu avec l'en-tête du fichier pour retrouver les colonnes
+        new_rows = _read_columns(io.BytesIO(header + raw[:cut]), set(declared), chunksize)
+
+        if status == 'tail':
+            cached = _read_cache(cache_path)
+            full = pd.concat([cached, new_rows[cached.columns]], ignore_index=True)
+            del cached
+            bytes_per_row = meta['full_bytes_per_row']
+        else:
+            full = new_rows
+            bytes_per_row = estimate_full_memory(csv_path, 1000) / 1000 if len(full) else 0
+
+        meta = {
+            'version': CACHE_VERSION,
+            'source_size': source.st_size,
+            'source_mtime': source.st_mtime,
+            'offset': start + cut,
+            'prefix_sha1': _prefix_hash(csv_path, start + cut),
+            'declared': declared,
+            'columns': list(full.columns),
+            'full_bytes_per_row': bytes_per_row,
+        }
+        _write_cache(full, cache_path, meta_path, meta)
+        data = full[[c for c in requested if c in full.columns]]
+
+    if report:
+        labels = {'hit': 'cache à jour', 'tail': 'fin du CSV ajoutée au cache', 'rebuild': 'cache reconstruit'}
+        print(f"   ⚡ Cache robot: {labels[status]}")
+    stats = _memory_stats(data, int(meta['full_bytes_per_row'] * len(data)), report)
+    stats['cache'] = status
+    return data, stats
+
+
+# ========== LECTURE EN CONTINU (MODE FOLLOW) ==========
+
+# Colonnes de batterie possibles, par ordre de préférence (centiPercent → %)
+BATTERY_COLUMNS = ['device_potAccuChargeState_centiPercent', 'battery_level', 'battery']
+LIVE_COLUMNS = [*BATTERY_COLUMNS, 'power_output_current', *ODOMETRY_COLUMNS]
+
+
+class RobotLogFollower:
+    """
+    Suit robotino_data.csv pendant que le robot y ajoute des lignes (équivalent de tail -f)
+    Un offset en octets mémorise la fin du dernier enregistrement complet lu: chaque appel
+    à poll() ne parse que les lignes ajoutées depuis, et met à jour des agrégats glissants
+    (batterie, distance cumulée, courant) en O(nouvelles lignes)
+    La distance suit les mêmes règles que l'indicateur 7 (robot_distance.odometry_steps):
+    remises à zéro, sauts de pose et trous dans le log ne sont pas comptés
+    """
+
+    def __init__(self, csv_path: str, from_start: bool = True):
+        """
+        Args:
+            csv_path: Chemin vers robotino_data.csv
+            from_start: True = agrège tout le fichier existant au premier poll(),
+                        False = ne suit que les lignes écrites après la création du follower
+        """
+        self.csv_path = csv_path
+        self.header = b''
+        self.offset = 0
+        self.from_start = from_start
+        self.reset()
+
+    def reset(self):
+        """Remet les agrégats à zéro (fichier tronqué ou recréé par le robot)"""
+        self.offset = 0
+        self.header = b''
+        self.rows = 0
+        self.last_timestamp = None
+        self.battery = None
+        self.battery_min = None
+        self.distance = 0.0
+        self._last_sample = None
+        self.current_last = None
+        self.current_max = None
+        self._current_sum = 0.0
+        self._current_count = 0
+
+    def _open_position(self) -> int:
+        """Lit l'en-tête et retourne la position de départ de la lecture"""
+        with open(self.csv_path, 'rb') as f:
+            self.header = f.readline()
+            if self.from_start:
+                return len(self.header)
+            raw = f.read()
+        return len(self.header) + complete_records_end(raw)
+
+    def poll(self) -> pd.DataFrame:
+        """
+        Lit les enregistrements complets ajoutés depuis le dernier appel et met à jour les agrégats
+        Une ligne en cours d'écriture (ou un champ quoté sur plusieurs lignes inachevé) est laissée
+        pour le prochain appel
+
+        Returns: nouvelles lignes (colonnes LIVE_COLUMNS présentes dans le fichier)
+        """
+        size = os.path.getsize(self.csv_path)
+        if size < self.offset:
+            self.reset()
+        if not self.header:
+            self.offset = self._open_position()
+
+        with open(self.csv_path, 'rb') as f:
+            f.seek(self.offset)
+            raw = f.read()
+        cut = complete_records_end(raw)
+        if cut == 0:
+            return pd.DataFrame()
+        self.offset += cut
+
+        new_rows = _read_columns(io.BytesIO(self.header + raw[:cut]), set(LIVE_COLUMNS), DEFAULT_CHUNKSIZE)
+        self._update(new_rows)
+        return new_rows
+
+    def _update(self, new_rows: pd.DataFrame):
+        """Agrégats glissants sur les seules nouvelles lignes"""
+        if new_rows.empty:
+            return
+        self.rows += len(new_rows)
+        if TIMESTAMP_COLUMN in new_rows.columns:
+            last = new_rows[TIMESTAMP_COLUMN].dropna()
+            if not last.empty:
+                self.last_timestamp = last.iloc[-1]
+
+        for column in BATTERY_COLUMNS:
+            if column in new_rows.columns:
+                values = new_rows[column].dropna()
+                if values.empty:
+                    break
+                scale = 100 if column == 'device_potAccuChargeState_centiPercent' else 1
+                self.battery = float(values.iloc[-1]) / scale
+                chunk_min = float(values.min()) / scale
+                self.battery_min = chunk_min if self.battery_min is None else min(self.battery_min, chunk_min)
+                break
+
+        if 'power_output_current' in new_rows.columns:
+            current = new_rows['power_output_current'].dropna()
+            if not current.empty:
+                self.current_last = float(current.iloc[-1])
+                chunk_max = float(current.max())
+                self.current_max = chunk_max if self.current_max is None else max(self.current_max, chunk_max)
+                self._current_sum += float(current.to_numpy(dtype='float64').sum())
+                self._current_count += len(current)
+
+        if {TIMESTAMP_COLUMN, 'odometry_x', 'odometry_y'} <= set(new_rows.columns):
+            columns = [c for c in ODOMETRY_COLUMNS if c in new_rows.columns]
+            samples = new_rows[columns].dropna(subset=[TIMESTAMP_COLUMN, 'odometry_x', 'odometry_y'])
+            if self._last_sample is not None:
+                # Raccord avec la dernière mesure du poll précédent (pas à cheval sur deux polls)
+                samples = pd.concat([self._last_sample, samples], ignore_index=True)
+            if len(samples) >= 2:
+                self.distance += float(odometry_steps(samples)['counted'].sum())
+            if len(samples):
+                self._last_sample = samples.iloc[-1:]
+
+    def status(self) -> Dict:
+        """Agrégats courants (valeurs None tant qu'aucune mesure n'a été lue)"""
+        return {
+            'rows': self.rows,
+            'last_timestamp': self.last_timestamp,
+            'battery': self.battery,
+            'battery_min': self.battery_min,
+            'distance': self.distance,
+            'current_last': self.current_last,
+            'current_avg': self._current_sum / self._current_count if self._current_count else None,
+            'current_max': self.current_max,
+        }
@@ -0,0 +1,154 @@
+"""
+Distance parcourue par le Robotino à partir de l'odométrie (robotino_data.csv)
+Calcul entièrement vectorisé: pas entre mesures successives, rejet des remises à zéro
+de l'odométrie et des sauts de pose, puis agrégation par jour ou par poste
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Postes de travail (3x8): nom et heure de début, le poste de nuit déborde sur le lendemain
+SHIFTS: List[Tuple[str, int]] = [('Matin', 6), ('Après-midi', 14), ('Nuit', 22)]
+
+# Écart maximal (s) entre deux mesures pour que le pas soit compté (au-delà: trou dans le log)
+MAX_GAP_SECONDS = 5.0
+# Pas autorisé = vitesse mesurée x durée x tolérance + bruit de position (m)
+SPEED_TOLERANCE = 2.0
+POSITION_NOISE = 0.05
+# Une pose revenue à moins de RESET_RADIUS (m) de l'origine après un pas non plausible = remise à zéro
+RESET_RADIUS = 0.01
+
+# Classement des pas (catégories de la colonne 'kind')
+STEP_KINDS = ['ok', 'reset', 'gap', 'jump']
+
+ODOMETRY_COLUMNS = ['timestamp', 'odometry_x', 'odometry_y', 'odometry_vx', 'odometry_vy', 'odometry_seq']
+
+
+def odometry_steps(data: pd.DataFrame, max_gap: float = MAX_GAP_SECONDS,
+                   speed_tolerance: float = SPEED_TOLERANCE,
+                   position_noise: float = POSITION_NOISE) -> pd.DataFrame:
+    """
+    Pas entre mesures d'odométrie successives, classés selon leur plausibilité
+
+    Un pas n'est compté que s'il est compatible avec la vitesse mesurée (odometry_vx/vy)
+    aux deux extrémités. Sinon il est classé:
+      - 'reset': compteur odometry_seq qui recule ou pose revenue à l'origine
+      - 'jump':  saut de pose incompatible avec la vitesse (relocalisation)
+      - 'gap':   mesures trop espacées (trou dans le log), le pas n'est pas extrapolé
+
+    Args:
+        data: Données robot (colonnes timestamp, odometry_x/y, odometry_vx/vy optionnelles)
+        max_gap: Écart maximal (s) entre deux mesures
+        speed_tolerance: Marge multiplicative sur la distance attendue d'après la vitesse
+        position_noise: Bruit de position toléré (m) en plus de la distance attendue
+    Returns: DataFrame (timestamp, step, counted, kind) indexé comme les mesures de fin de pas
+    """
+    columns = [c for c in ODOMETRY_COLUMNS if c in data.columns]
+    odo = data[columns].dropna(subset=['timestamp', 'odometry_x', 'odometry_y'])
+    if not odo['timestamp'].is_monotonic_increasing:
+        odo = odo.sort_values('timestamp', kind='stable')
+    if len(odo) < 2:
+        return pd.DataFrame({'timestamp': pd.Series(dtype='datetime64[ns]'), 'step': [], 'counted': [],
+                             'kind': pd.Categorical([], categories=STEP_KINDS)})
+
+    x = odo['odometry_x'].to_numpy(dtype='float64')
+    y = odo['odometry_y'].to_numpy(dtype='float64')
+    t = odo['timestamp'].to_numpy(dtype='datetime64[ns]').astype('int64') / 1e9
+    step = np.hypot(np.diff(x), np.diff(y))
+    dt = np.diff(t)
+
+    if {'odometry_vx', 'odometry_vy'} <= set(odo.columns):
+        speed = np.hypot(odo['odometry_vx'].to_numpy(dtype='float64'),
+                         odo['odometry_vy'].to_numpy(dtype='float64'))
+        speed = np.nan_to_num(speed)
+        allowed = np.maximum(speed[:-1], speed[1:]) * dt * speed_tolerance + position_noise
+    else:
+        # Sans vitesse mesurée, seuls les trous et les remises à zéro sont écartés
+        allowed = np.full(len(step), np.inf)
+
+    implausible = step > allowed
+    back_to_origin = np.hypot(x[1:], y[1:]) < RESET_RADIUS
+    reset = implausible & back_to_origin
+    if 'odometry_seq' in odo.columns:
+        seq = odo['odometry_seq'].to_numpy(dtype='float64')
+        reset |= np.diff(seq) < 0
+    gap = dt > max_gap
+
+    # Codes entiers puis catégories: évite de matérialiser des millions de chaînes
+    codes = np.select([reset, gap, implausible], [1, 2, 3], default=0).astype('int8')
+    return pd.DataFrame({
+        'timestamp': odo['timestamp'].to_numpy()[1:],
+        'step': step,
+        'counted': np.where(codes == 0, step, 0.0),
+        'kind': pd.Categorical.from_codes(codes, STEP_KINDS),
+    }, index=odo.index[1:])
+
+
+def _period_keys(timestamps: pd.Series, by: str) -> Tuple[pd.Series, pd.Series]:
+    """
+    Clés de regroupement numériques (jour, n° de poste): les libellés ne sont formatés
+    qu'une fois par groupe, pas pour chaque mesure
+    La nuit compte pour le jour où elle commence
+    """
+    if by == 'day':
+        return timestamps.dt.normalize(), pd.Series(0, index=timestamps.index)
+    if by == 'shift':
+        shifted = timestamps - pd.Timedelta(hours=SHIFTS[0][1])
+        return shifted.dt.normalize(), (shifted.dt.hour // 8).clip(upper=len(SHIFTS) - 1)
+    raise ValueError(f"Regroupement inconnu: {by} (attendu: 'day' ou 'shift')")
+
+
+def distance_by_period(data: pd.DataFrame, by: str = 'day', **thresholds) -> pd.DataFrame:
+    """
+    Distance parcourue par jour ou par poste, avec cumul
+
+    Args:
+        data: Données robot
+        by: 'day' (jour calendaire) ou 'shift' (postes SHIFTS, ex: '2025-04-16 Matin')
+        thresholds: Seuils transmis à odometry_steps (max_gap, speed_tolerance, position_noise)
+    Returns: DataFrame (period, distance, cumulative, resets, jumps, gaps)
+    """
+    steps = odometry_steps(data, **thresholds)
+    if steps.empty:
+        return pd.DataFrame(columns=['period', 'distance', 'cumulative', 'resets', 'jumps', 'gaps'])
+
+    day, shift = _period_keys(steps['timestamp'], by)
+    kind = steps['kind'].cat.codes.to_numpy()
+    grouped = pd.DataFrame({
+        'day': day,
+        'shift': shift,
+        'distance': steps['counted'],
+        'resets': (kind == STEP_KINDS.index('reset')).astype('int64'),
+        'jumps': (kind == STEP_KINDS.index('jump')).astype('int64'),
+        'gaps': (kind == STEP_KINDS.index('gap')).astype('int64'),
+    }).groupby(['day', 'shift'], sort=True).sum().reset_index()
+
+    period = grouped['day'].dt.strftime('%Y-%m-%d')
+    if by == 'shift':
+        names = np.array([name for name, _ in SHIFTS], dtype=object)
+        period = period + ' ' + names[grouped['shift'].to_numpy()]
+    grouped = grouped.drop(columns=['day', 'shift'])
+    grouped.insert(0, 'period', period)
+    grouped.insert(2, 'cumulative', grouped['distance'].cumsum())
+    return grouped
+
+
+def cumulative_distance(data: pd.DataFrame, **thresholds) -> pd.Series:
+    """Distance cumulée (m) à chaque mesure, indexée par timestamp"""
+    steps = odometry_steps(data, **thresholds)
+    return pd.Series(steps['counted'].cumsum().to_numpy(), index=steps['timestamp'].to_numpy(),
+                     name='distance_cumulee')
+
+
+def distance_summary(steps: pd.DataFrame) -> Dict:
+    """Distance retenue et nombre de pas écartés par motif"""
+    counts = steps['kind'].value_counts()
+    return {
+        'distance': float(steps['counted'].sum()),
+        'resets': int(counts.get('reset', 0)),
+        'jumps': int(counts.get('jump', 0)),
+        'gaps': int(counts.get('gap', 0)),
+    }
@@ -0,0 +1,101 @@
+"""
+Tables de cumuls journaliers persistées en Parquet (énergie, production...)
+Chaque rafraîchissement ne réagrège dans MariaDB que les jours à partir du dernier jour
+persisté (inclus, il peut être incomplet): les jours clos ne sont jamais relus
+"""
+
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (moteur Parquet de pandas)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+class DailyRollup(ABC):
+    """
+    Table de cumuls (une ligne par jour, ou par jour et clé) mise à jour incrémentalement
+    Les sous-classes définissent FILE, COLUMNS, SORT et _fetch(since)
+    """
+
+    FILE = 'daily.parquet'
+    COLUMNS: List[str] = ['day']
+    SORT: List[str] = ['day']
+
+    def __init__(self, query_func: Callable[..., pd.DataFrame], cache_dir: str):
+        """
+        Args:
+            query_func: Fonction (requête, paramètres) -> DataFrame (ex: MESIndicators.query_db)
+            cache_dir: Dossier du cache local (un fichier Parquet par table de cumuls)
+        """
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow est requis pour les cumuls journaliers (pip install pyarrow)")
+        self.query_func = query_func
+        self.path = os.path.join(cache_dir, self.FILE)
+        self.daily: Optional[pd.DataFrame] = None
+        self.last_refresh_rows = 0
+
+    def empty(self) -> pd.DataFrame:
+        return pd.DataFrame(columns=self.COLUMNS)
+
+    @abstractmethod
+    def _fetch(self, since: Optional[datetime]) -> Optional[pd.DataFrame]:
+        """
+        Cumuls des jours à partir de since (None = tout l'historique)
+
+        Returns: DataFrame au format COLUMNS, None si une requête a échoué
+        """
+
+    def load(self) -> pd.DataFrame:
+        """Cumuls persistés (vide si jamais calculés)"""
+        if self.daily is None:
+            if os.path.exists(self.path):
+                daily = pd.read_parquet(self.path)
+                daily['day'] = pd.to_datetime(daily['day']).dt.date
+                self.daily = daily
+            else:
+                self.daily = self.empty()
+        return self.daily
+
+    def refresh(self) -> pd.DataFrame:
+        """
+        Recalcule les cumuls à partir du dernier jour persisté et réécrit la table
+
+        Returns: table complète des cumuls
+        """
+        stored = self.load()
+        since = None if stored.empty else datetime.combine(max(stored['day']), datetime.min.time())
+        fresh = self._fetch(since)
+        # Requête en erreur: les cumuls connus sont conservés
+        if fresh is None:
+            return stored
+        kept = stored if since is None else stored[stored['day'] < since.date()]
+        daily = pd.concat([kept, fresh], ignore_index=True) if not kept.empty else fresh
+        daily = daily.sort_values(self.SORT).reset_index(drop=True)
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        daily.assign(day=pd.to_datetime(daily['day'])).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+        self.daily = daily
+        self.last_refresh_rows = len(fresh)
+        return daily
+
+
+def filter_days(daily: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """Lignes des cumuls dont le jour est dans [start, end[ (bornes datetime normalisées)"""
+    if daily.empty:
+        return daily
+    days = pd.to_datetime(daily['day'])
+    mask = pd.Series(True, index=daily.index)
+    if start is not None:
+        mask &= days >= pd.Timestamp(start).normalize()
+    if end is not None:
+        mask &= days < pd.Timestamp(end)
+    return daily[mask]
@@ -0,0 +1,272 @@
+"""
+Historique des mouvements de stock (indicateur 5) par capture des changements de tblbufferpos
+La table ne contient que l'état courant de chaque position (ResourceId, BufNo, BufPos): chaque
+relevé est haché ligne à ligne, seules les positions dont l'empreinte a changé produisent un
+enregistrement compact (avant / après) dans un journal des changements. Les entrées et sorties
+par jour sont ensuite lues dans ce journal, sans relire la table complète
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (moteur Parquet de pandas)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+KEY_COLUMNS = ['ResourceId', 'BufNo', 'BufPos']
+# Contenu haché: un changement de l'une de ces colonnes est un changement de la position
+CONTENT_COLUMNS = ['PNo', 'ONo', 'OPos', 'Quantity', 'PalletID', 'BoxID', 'Booked', 'TimeStamp']
+# Configuration de la position (type de stockage, zone): relevée mais non hachée
+LAYOUT_COLUMNS = ['Type', 'Zone']
+BUFFER_COLUMNS = KEY_COLUMNS + CONTENT_COLUMNS + LAYOUT_COLUMNS
+
+# Types de changement: entrée (position vide -> occupée), sortie (occupée -> vide), échange
+# (contenu remplacé: une sortie et une entrée), mise à jour (réservation, quantité...)
+CHANGE_KINDS = ['entry', 'exit', 'swap', 'update']
+
+DELTA_COLUMNS = KEY_COLUMNS + ['at', 'kind', 'PNo_before', 'PNo_after', 'BoxID_before', 'BoxID_after',
+                               'Quantity_before', 'Quantity_after', 'Booked_before', 'Booked_after', 'inferred']
+
+
+def _int_column(frame: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in frame.columns:
+        return np.zeros(len(frame), dtype='int64')
+    return pd.to_numeric(frame[column], errors='coerce').fillna(0).to_numpy(dtype='int64')
+
+
+def occupied(frame: pd.DataFrame) -> np.ndarray:
+    """Position occupée: pièce, palette ou caisse présente (PNo, PalletID ou BoxID non nul)"""
+    return (_int_column(frame, 'PNo') != 0) | (_int_column(frame, 'PalletID') != 0) | (_int_column(frame, 'BoxID') != 0)
+
+
+def row_hashes(frame: pd.DataFrame) -> pd.Series:
+    """
+    Empreinte 64 bits du contenu de chaque position, indexée par la clé primaire
+
+    Args:
+        frame: Relevé de tblbufferpos (colonnes KEY_COLUMNS et CONTENT_COLUMNS disponibles)
+    """
+    content = [c for c in CONTENT_COLUMNS if c in frame.columns]
+    hashes = pd.util.hash_pandas_object(frame[content], index=False)
+    return pd.Series(hashes.to_numpy(), index=pd.MultiIndex.from_frame(frame[KEY_COLUMNS]))
+
+
+def _empty_deltas() -> pd.DataFrame:
+    deltas = pd.DataFrame({c: pd.Series(dtype='int64') for c in DELTA_COLUMNS})
+    deltas['at'] = pd.Series(dtype='datetime64[ns]')
+    deltas['kind'] = pd.Categorical([], categories=CHANGE_KINDS)
+    deltas['inferred'] = pd.Series(dtype=bool)
+    return deltas
+
+
+def diff_states(before: pd.DataFrame, after: pd.DataFrame, at: datetime) -> pd.DataFrame:
+    """
+    Enregistrements de changement entre deux relevés des mêmes positions (lignes alignées)
+
+    Args:
+        before, after: Contenu avant / après des positions modifiées (même ordre, même clé)
+        at: Instant du relevé, utilisé si la ligne n'a pas de TimeStamp
+    Returns: DataFrame au format DELTA_COLUMNS
+    """
+    if after.empty:
+        return _empty_deltas()
+    was, now = occupied(before), occupied(after)
+    content_changed = ((_int_column(before, 'PNo') != _int_column(after, 'PNo'))
+                       | (_int_column(before, 'PalletID') != _int_column(after, 'PalletID'))
+                       | (_int_column(before, 'BoxID') != _int_column(after, 'BoxID')))
+    kind = np.select([~was & now, was & ~now, was & now & content_changed],
+                     [0, 1, 2], default=3).astype('int8')
+    stamp = (pd.to_datetime(after['TimeStamp']) if 'TimeStamp' in after.columns
+             else pd.Series(pd.NaT, index=after.index))
+    deltas = after[KEY_COLUMNS].reset_index(drop=True)
+    deltas['at'] = stamp.fillna(pd.Timestamp(at)).to_numpy(dtype='datetime64[ns]')
+    deltas['kind'] = pd.Categorical.from_codes(kind, categories=CHANGE_KINDS)
+    for column in ('PNo', 'BoxID', 'Quantity', 'Booked'):
+        deltas[f"{column}_before"] = _int_column(before, column)
+        deltas[f"{column}_after"] = _int_column(after, column)
+    deltas['inferred'] = False
+    return deltas[DELTA_COLUMNS]
+
+
+def baseline_deltas(state: pd.DataFrame) -> pd.DataFrame:
+    """
+    Historique déduit du premier relevé: le dernier changement de chaque position (TimeStamp)
+    est une entrée si elle est occupée, une sortie sinon (inferred = True)
+    """
+    state = state[state['TimeStamp'].notna()] if 'TimeStamp' in state.columns else state.iloc[0:0]
+    if state.empty:
+        return _empty_deltas()
+    now = occupied(state)
+    deltas = state[KEY_COLUMNS].reset_index(drop=True)
+    deltas['at'] = pd.to_datetime(state['TimeStamp']).to_numpy(dtype='datetime64[ns]')
+    deltas['kind'] = pd.Categorical.from_codes(np.where(now, 0, 1).astype('int8'), categories=CHANGE_KINDS)
+    deltas['PNo_before'] = 0
+    deltas['PNo_after'] = _int_column(state, 'PNo')
+    deltas['BoxID_before'] = 0
+    deltas['BoxID_after'] = _int_column(state, 'BoxID')
+    deltas['Quantity_before'] = 0
+    deltas['Quantity_after'] = _int_column(state, 'Quantity')
+    deltas['Booked_before'] = 0
+    deltas['Booked_after'] = _int_column(state, 'Booked')
+    deltas['inferred'] = True
+    return deltas[DELTA_COLUMNS]
+
+
+def movements_by_day(deltas: pd.DataFrame, start=None, end=None, days: Optional[int] = None) -> pd.DataFrame:
+    """
+    Entrées et sorties par jour (un échange compte une entrée et une sortie)
+
+    Args:
+        deltas: Journal des changements
+        start, end: Bornes normalisées (datetime, fin exclue)
+        days: Complète le calendrier (jours sans mouvement à 0): toute la période si elle est
+              bornée, sinon les `days` jours se terminant au dernier mouvement. None = jours actifs
+    Returns: DataFrame (jour, entrees, sorties, mouvements) trié par jour
+    """
+    columns = ['jour', 'entrees', 'sorties', 'mouvements']
+    if deltas.empty:
+        return pd.DataFrame(columns=columns)
+    at = pd.to_datetime(deltas['at'])
+    mask = pd.Series(True, index=deltas.index)
+    if start is not None:
+        mask &= at >= start
+    if end is not None:
+        mask &= at < end
+    kinds = deltas.loc[mask, 'kind'].astype(str)
+    flows = pd.DataFrame({'jour': at[mask].dt.normalize(),
+                          'entrees': kinds.isin(['entry', 'swap']).astype('int64'),
+                          'sorties': kinds.isin(['exit', 'swap']).astype('int64')})
+    result = flows.groupby('jour')[['entrees', 'sorties']].sum()
+    if days is not None and (not result.empty or (start is not None and end is not None)):
+        if start is not None and end is not None:
+            first, last = pd.Timestamp(start).normalize(), (pd.Timestamp(end) - pd.Timedelta(1)).normalize()
+        else:
+            last = result.index.max() if end is None else (pd.Timestamp(end) - pd.Timedelta(1)).normalize()
+            first = pd.Timestamp(start).normalize() if start is not None else last - pd.Timedelta(days=days - 1)
+        result = result.reindex(pd.date_range(first, last, freq='D'), fill_value=0)
+    result['mouvements'] = result['entrees'] + result['sorties']
+    result.index = result.index.date
+    return result.rename_axis('jour').reset_index()[columns]
+
+
+class StockChangeCapture:
+    """Relevés successifs de tblbufferpos comparés par empreinte, journal des changements"""
+
+    def __init__(self, cache_dir: Optional[str] = None, compact_every: int = 50):
+        """
+        Args:
+            cache_dir: Dossier où persister le dernier état et le journal (Parquet).
+                       None = journal en mémoire seulement
+            compact_every: Nombre de fichiers du journal au-delà duquel il est compacté
+        """
+        if cache_dir and not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow est requis pour persister les mouvements de stock (pip install pyarrow)")
+        self.folder = os.path.join(cache_dir, 'bufferpos_changes') if cache_dir else None
+        self.compact_every = compact_every
+        self.state: Optional[pd.DataFrame] = None
+        self.hashes: Optional[pd.Series] = None
+        self.deltas: Optional[pd.DataFrame] = None
+        self.last_poll_changes = 0
+        self._lock = threading.Lock()
+
+    # ---------- Stockage local ----------
+
+    def _state_path(self) -> str:
+        return os.path.join(self.folder, 'state.parquet')
+
+    def _parts(self) -> List[str]:
+        if self.folder is None or not os.path.isdir(self.folder):
+            return []
+        return sorted(os.path.join(self.folder, f) for f in os.listdir(self.folder) if f.startswith('delta-'))
+
+    def _load(self):
+        """Relit le dernier état et le journal persistés (une seule fois)"""
+        if self.deltas is not None:
+            return
+        self.deltas = _empty_deltas()
+        if self.folder is None:
+            return
+        if os.path.exists(self._state_path()):
+            self.state = pd.read_parquet(self._state_path())
+            self.hashes = row_hashes(self.state)
+        parts = self._parts()
+        if parts:
+            deltas = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+            # Journal écrit avant l'ajout de colonnes (ex: Booked): valeurs absentes à 0
+            deltas = deltas.reindex(columns=DELTA_COLUMNS, fill_value=0)
+            deltas['kind'] = pd.Categorical(deltas['kind'], categories=CHANGE_KINDS)
+            self.deltas = deltas
+
+    def _persist(self, new_deltas: pd.DataFrame):
+        if self.folder is None:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        if not new_deltas.empty:
+            new_deltas.to_parquet(os.path.join(self.folder, f"delta-{time.time_ns()}.parquet"), index=False)
+            parts = self._parts()
+            if len(parts) > self.compact_every:
+                self.deltas.to_parquet(os.path.join(self.folder, f"delta-{time.time_ns()}.parquet"), index=False)
+                for part in parts:
+                    os.remove(part)
+        tmp_path = self._state_path() + '.tmp'
+        self.state.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self._state_path())
+
+    # ---------- Capture ----------
+
+    def poll(self, current: pd.DataFrame, at: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Compare un relevé de tblbufferpos au précédent et journalise les positions modifiées
+
+        Positions apparues: comparées à une position vide. Positions disparues: sorties
+        si elles étaient occupées. Le premier relevé initialise l'état (baseline_deltas)
+
+        Args:
+            current: Relevé complet (colonnes BUFFER_COLUMNS)
+            at: Instant du relevé (défaut: maintenant)
+        Returns: nouveaux enregistrements du journal
+        """
+        if len(current.columns) == 0 or not set(KEY_COLUMNS) <= set(current.columns):
+            return _empty_deltas()
+        at = at or datetime.now()
+        current = current[[c for c in BUFFER_COLUMNS if c in current.columns]].reset_index(drop=True)
+        hashes = row_hashes(current)
+        with self._lock:
+            self._load()
+            if self.state is None:
+                new_deltas = baseline_deltas(current)
+            else:
+                previous = self.hashes
+                aligned = previous.reindex(hashes.index)
+                changed = aligned.isna().to_numpy() | (aligned.to_numpy() != hashes.to_numpy())
+                after = current[changed]
+                before_index = pd.MultiIndex.from_frame(after[KEY_COLUMNS])
+                state = self.state.set_index(KEY_COLUMNS)
+                before = state.reindex(before_index).reset_index()
+                # Positions disparues de la table: comparées à une position vide
+                gone_index = previous.index.difference(hashes.index)
+                gone = state.loc[gone_index].reset_index() if len(gone_index) else state.iloc[0:0].reset_index()
+                empty = gone[KEY_COLUMNS].assign(TimeStamp=pd.NaT)
+                new_deltas = pd.concat([diff_states(before, after, at), diff_states(gone, empty, at)],
+                                       ignore_index=True)
+            new_deltas['kind'] = pd.Categorical(new_deltas['kind'], categories=CHANGE_KINDS)
+            self.state, self.hashes = current, hashes
+            self.deltas = pd.concat([self.deltas, new_deltas], ignore_index=True) if not self.deltas.empty else new_deltas
+            self.last_poll_changes = len(new_deltas)
+            self._persist(new_deltas)
+        return new_deltas
+
+    def history(self) -> pd.DataFrame:
+        """Journal complet des changements (copie)"""
+        with self._lock:
+            self._load()
+            return self.deltas.copy()
@@ -0,0 +1,283 @@
+"""
+Occupation du stockage (indicateur 4) tenue à jour en mémoire, position par position
+La grille des positions (ResourceId, BufNo, BufPos) est chargée une fois depuis tblbufferpos,
+puis mise à jour par les enregistrements du journal des changements (stock_changes): chaque
+changement ajuste en O(1) les compteurs de sa zone et de son type de stockage et ajoute un
+point à l'historique. Taux par zone / type, évolution dans le temps et carte des magasins sont
+lus dans la grille, sans relire la table
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from stock_changes import KEY_COLUMNS
+
+
+# Types de tblbuffertype regroupés (les trois types de transfert AGV comptent ensemble)
+TYPE_GROUPS = {1: 'storage', 2: 'fifo', 3: 'stack', 10: 'AGV', 11: 'AGV', 12: 'AGV'}
+OTHER_GROUP = 'autre'
+
+RACK_COLUMNS = ['ResourceId', 'BufNo', 'Description', 'Type', 'Sides', 'Rows', 'Columns']
+# Rows est un mot réservé de MariaDB (fonctions de fenêtre)
+RACK_QUERY = "SELECT ResourceId, BufNo, Description, Type, Sides, `Rows`, `Columns` FROM tblbuffer"
+
+# État d'une position sur la carte (code = rang dans la liste)
+CELL_STATES = ['vide', 'pièces', 'caisse', 'réservée']
+OCCUPANCY_COLUMNS = ['positions', 'occupees', 'reservees', 'taux_pct']
+CELL_COLUMNS = KEY_COLUMNS + ['Zone', 'type', 'PNo', 'BoxID', 'Booked', 'depuis', 'etat', 'code']
+
+
+def _value(value) -> int:
+    """Entier d'une cellule de relevé (NULL = 0)"""
+    return 0 if value is None or pd.isna(value) else int(value)
+
+
+def cell_state(pno: int, box: int, booked: int) -> int:
+    """Code CELL_STATES d'une position: réservée, caisse présente, pièces sans caisse ou vide"""
+    if booked:
+        return 3
+    if box:
+        return 2
+    return 1 if pno else 0
+
+
+class StorageGrid:
+    """
+    Positions de stockage en mémoire et compteurs d'occupation par zone et par type
+
+    Une position est occupée quand une caisse y est présente (BoxID non nul), comme le taux
+    historique de l'indicateur 4. Réservée = Booked
+    """
+
+    def __init__(self):
+        self.slots: Dict[Tuple[int, int, int], int] = {}
+        self.keys: List[Tuple[int, int, int]] = []
+        self.zone: List[int] = []
+        self.group: List[str] = []
+        self.pno: List[int] = []
+        self.box: List[int] = []
+        self.booked: List[int] = []
+        self.since: List[Optional[datetime]] = []
+        # (axe, valeur) -> [positions, occupées, réservées]
+        self.counts: Dict[Tuple[str, object], List[int]] = {}
+        # Historique: (instant, zone, type, variation occupées, variation réservées)
+        self.events: List[Tuple[datetime, int, str, int, int]] = []
+        self.racks: Optional[pd.DataFrame] = None
+        self.loaded_at: Optional[datetime] = None
+        self.updated_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    @property
+    def empty(self) -> bool:
+        return not self.keys
+
+    # ---------- Mises à jour ----------
+
+    def _counter(self, axis: str, value) -> List[int]:
+        return self.counts.setdefault((axis, value), [0, 0, 0])
+
+    def _add_slot(self, key: Tuple[int, int, int], buffer_type: int, zone: int) -> int:
+        slot = len(self.keys)
+        self.slots[key] = slot
+        self.keys.append(key)
+        self.zone.append(zone)
+        self.group.append(TYPE_GROUPS.get(buffer_type, OTHER_GROUP))
+        self.pno.append(0)
+        self.box.append(0)
+        self.booked.append(0)
+        self.since.append(None)
+        for counter in (self._counter('zone', zone), self._counter('type', self.group[slot])):
+            counter[0] += 1
+        return slot
+
+    def _set_cell(self, slot: int, pno: int, box: int, booked: int, at: datetime) -> bool:
+        """Nouveau contenu d'une position: compteurs ajustés et point d'historique si l'occupation change"""
+        d_occupied = int(box != 0) - int(self.box[slot] != 0)
+        d_booked = int(booked != 0) - int(self.booked[slot] != 0)
+        changed = (pno, box, booked) != (self.pno[slot], self.box[slot], self.booked[slot])
+        self.pno[slot], self.box[slot], self.booked[slot] = pno, box, booked
+        if changed:
+            self.since[slot] = at
+        if d_occupied or d_booked:
+            for counter in (self._counter('zone', self.zone[slot]), self._counter('type', self.group[slot])):
+                counter[1] += d_occupied
+                counter[2] += d_booked
+            self.events.append((at, self.zone[slot], self.group[slot], d_occupied, d_booked))
+        return changed
+
+    def load(self, frame: pd.DataFrame, at: Optional[datetime] = None):
+        """
+        Initialise la grille depuis un relevé complet de tblbufferpos
+
+        L'historique antérieur est reconstruit à partir du dernier changement de chaque
+        position (TimeStamp): une position occupée est supposée vide avant cet instant
+
+        Args:
+            frame: Relevé (KEY_COLUMNS, PNo, BoxID, Booked, Type, Zone, TimeStamp)
+            at: Instant du relevé, utilisé pour les positions sans TimeStamp (défaut: maintenant)
+        """
+        at = at or datetime.now()
+        rows = frame.reindex(columns=KEY_COLUMNS + ['Type', 'Zone', 'PNo', 'BoxID', 'Booked', 'TimeStamp'])
+        stamps = pd.to_datetime(rows['TimeStamp']).dt.to_pydatetime() if len(rows) else []
+        with self._lock:
+            self.slots, self.keys, self.zone, self.group = {}, [], [], []
+            self.pno, self.box, self.booked, self.since = [], [], [], []
+            self.counts, self.events = {}, []
+            for row, stamp in zip(rows.itertuples(index=False), stamps):
+                key = (_value(row.ResourceId), _value(row.BufNo), _value(row.BufPos))
+                slot = self.slots.get(key)
+                if slot is None:
+                    slot = self._add_slot(key, _value(row.Type), _value(row.Zone))
+                changed_at = at if pd.isna(stamp) else stamp
+                self._set_cell(slot, _value(row.PNo), _value(row.BoxID), _value(row.Booked), changed_at)
+            self.events.sort(key=lambda event: event[0])
+            known = [s for s in self.since if s is not None]
+            self.loaded_at = max(known) if known else at
+            self.updated_at = at
+
+    def apply(self, deltas: pd.DataFrame, layout: Optional[pd.DataFrame] = None,
+              at: Optional[datetime] = None) -> int:
+        """
+        Applique les enregistrements du journal des changements (stock_changes.DELTA_COLUMNS)
+
+        Les enregistrements déduits du premier relevé (inferred) sont ignorés: load les couvre
+
+        Args:
+            deltas: Nouveaux enregistrements (StockChangeCapture.poll)
+            layout: Relevé courant, pour le type et la zone des positions inconnues de la grille
+            at: Instant du relevé (défaut: maintenant)
+        Returns: nombre de positions modifiées
+        """
+        at = at or datetime.now()
+        if 'inferred' in deltas.columns:
+            deltas = deltas[~deltas['inferred'].astype(bool)]
+        positions = None
+        changed = 0
+        with self._lock:
+            for delta in deltas.sort_values('at', kind='stable').itertuples(index=False):
+                key = (_value(delta.ResourceId), _value(delta.BufNo), _value(delta.BufPos))
+                slot = self.slots.get(key)
+                if slot is None:
+                    buffer_type, zone = 0, 0
+                    if positions is None and layout is not None and set(KEY_COLUMNS) <= set(layout.columns):
+                        positions = layout.set_index(KEY_COLUMNS)
+                    if positions is not None and key in positions.index:
+                        position = positions.loc[key]
+                        buffer_type, zone = _value(position.get('Type')), _value(position.get('Zone'))
+                    slot = self._add_slot(key, buffer_type, zone)
+                booked = _value(getattr(delta, 'Booked_after', 0))
+                changed += self._set_cell(slot, _value(delta.PNo_after), _value(delta.BoxID_after),
+                                          booked, pd.Timestamp(delta.at).to_pydatetime())
+            self.updated_at = at
+        return changed
+
+    def set_racks(self, racks: pd.DataFrame):
+        """Géométrie des magasins (tblbuffer: faces, rangées, colonnes) pour la carte"""
+        if len(racks.columns) > 0 and not racks.empty:
+            with self._lock:
+                self.racks = racks.reindex(columns=RACK_COLUMNS)
+
+    # ---------- Lectures ----------
+
+    def rate(self) -> Tuple[int, int, float]:
+        """Positions occupées, positions totales et taux d'occupation (%)"""
+        with self._lock:
+            totals = [counter for (axis, _), counter in self.counts.items() if axis == 'type']
+            occupied = sum(counter[1] for counter in totals)
+            total = sum(counter[0] for counter in totals)
+        return occupied, total, (occupied / total * 100) if total > 0 else 0.0
+
+    def occupancy(self, by: str = 'type') -> pd.DataFrame:
+        """
+        Occupation courante par zone ou par type de stockage (lue dans les compteurs)
+
+        Args:
+            by: 'zone' ou 'type'
+        Returns: DataFrame (zone ou type, positions, occupees, reservees, taux_pct)
+        """
+        with self._lock:
+            rows = [(value, *counter) for (axis, value), counter in self.counts.items() if axis == by]
+        result = pd.DataFrame(rows, columns=[by] + OCCUPANCY_COLUMNS[:3])
+        result['taux_pct'] = (result['occupees'] / result['positions'].where(result['positions'] > 0) * 100).fillna(0)
+        return result.sort_values(by).reset_index(drop=True)
+
+    def timeline(self, by: str = 'type', start=None, end=None) -> pd.DataFrame:
+        """
+        Évolution de l'occupation par zone ou par type (un point par changement)
+
+        Args:
+            by: 'zone' ou 'type'
+            start, end: Bornes normalisées (datetime, fin exclue). Le niveau au début de la
+                        période est repris en premier point
+        Returns: DataFrame (at, zone ou type, positions, occupees, reservees, taux_pct)
+        """
+        columns = ['at', by] + OCCUPANCY_COLUMNS
+        with self._lock:
+            events = pd.DataFrame(self.events, columns=['at', 'zone', 'type', 'd_occupees', 'd_reservees'])
+            positions = {value: counter[0] for (axis, value), counter in self.counts.items() if axis == by}
+        if events.empty:
+            return pd.DataFrame(columns=columns)
+        # Niveau 0 au premier instant connu: chaque groupe a un point, même sans changement
+        base = pd.DataFrame({'at': events['at'].min(), by: list(positions), 'd_occupees': 0, 'd_reservees': 0})
+        events = pd.concat([base, events], ignore_index=True).sort_values('at', kind='stable')
+        grouped = events.groupby(by)
+        events['occupees'] = grouped['d_occupees'].cumsum()
+        events['reservees'] = grouped['d_reservees'].cumsum()
+        # Un point par (instant, groupe): dernier niveau atteint
+        levels = events.groupby(['at', by], sort=True)[['occupees', 'reservees']].last().reset_index()
+        if start is not None:
+            before = levels[levels['at'] < start].groupby(by).tail(1).assign(at=pd.Timestamp(start))
+            levels = pd.concat([before, levels[levels['at'] >= start]], ignore_index=True)
+        if end is not None:
+            levels = levels[levels['at'] < end]
+        levels['positions'] = levels[by].map(positions).fillna(0).astype('int64')
+        levels['taux_pct'] = (levels['occupees'] / levels['positions'].where(levels['positions'] > 0) * 100).fillna(0)
+        return levels.sort_values(['at', by]).reset_index(drop=True)[columns]
+
+    def cells(self) -> pd.DataFrame:
+        """État de chaque position (format CELL_COLUMNS)"""
+        with self._lock:
+            keys = np.array(self.keys, dtype='int64').reshape(-1, 3)
+            codes = [cell_state(p, b, k) for p, b, k in zip(self.pno, self.box, self.booked)]
+            result = pd.DataFrame(keys, columns=KEY_COLUMNS)
+            result['Zone'] = self.zone
+            result['type'] = self.group
+            result['PNo'] = self.pno
+            result['BoxID'] = self.box
+            result['Booked'] = self.booked
+            result['depuis'] = pd.to_datetime(pd.Series(self.since, dtype='object'))
+        result['code'] = np.array(codes, dtype='int64')
+        result['etat'] = [CELL_STATES[c] for c in codes]
+        return result[CELL_COLUMNS]
+
+    def heatmap(self) -> pd.DataFrame:
+        """
+        Positions placées dans leur magasin pour la carte de chaleur
+
+        BufPos est numéroté face par face, rangée par rangée (colonnes de gauche à droite), selon
+        la géométrie de tblbuffer. Sans géométrie connue: une seule rangée par magasin
+
+        Returns: DataFrame (CELL_COLUMNS + Description, face, rangee, colonne, ligne), ligne =
+                 rangée dans l'empilement des faces (axe vertical de la carte)
+        """
+        cells = self.cells()
+        if cells.empty:
+            return cells.assign(Description='', face=0, rangee=0, colonne=0, ligne=0)
+        racks = self.racks if self.racks is not None else pd.DataFrame(columns=RACK_COLUMNS)
+        cells = cells.merge(racks[['ResourceId', 'BufNo', 'Description', 'Sides', 'Rows', 'Columns']],
+                            on=['ResourceId', 'BufNo'], how='left')
+        index = cells['BufPos'] - 1
+        per_buffer = cells.groupby(['ResourceId', 'BufNo'])['BufPos'].transform('max')
+        columns = cells['Columns'].where(cells['Columns'] > 0, per_buffer).fillna(per_buffer).astype('int64')
+        rows = cells['Rows'].where(cells['Rows'] > 0, 1).fillna(1).astype('int64')
+        cells['face'] = index // (rows * columns)
+        cells['rangee'] = (index % (rows * columns)) // columns
+        cells['colonne'] = index % columns
+        cells['ligne'] = cells['face'] * rows + cells['rangee']
+        cells['Description'] = cells['Description'].fillna('Magasin ' + cells['ResourceId'].astype(str)
+                                                          + '/' + cells['BufNo'].astype(str))
+        return cells.drop(columns=['Sides', 'Rows', 'Columns']).sort_values(KEY_COLUMNS).reset_index(drop=True)
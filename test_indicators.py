@@ -4,13 +4,36 @@ Affiche les résultats dans le terminal sans interface graphique
 """
 
 import pandas as pd
-import mysql.connector
-from datetime import datetime, timedelta
-import numpy as np
-from typing import Dict, Tuple
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 import warnings
+import os
 import sys
 import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
+
+from db_pool import DatabaseUnavailableError, close_all_pools, get_pool
+from energy import (ENERGY_COLUMNS, ROLLUP_SQL, EnergyRollup, daily_rollup, order_consumption, previous_day,
+                    rollup_from_sql, step_consumption, summarize)
+from kpi_metrics import MetricsRecorder, frame_bytes
+from lead_time import (STEP_COLUMNS, breakdown_by_day, breakdown_by_resource, order_breakdown,
+                       step_segments)
+from machine_states import (MAX_HOLD_SECONDS, REPORT_COLUMNS, lookback_start, machine_intervals,
+                            occupancy, split_by_day)
+from mes_backends import EmbeddedBackend, MESBackend
+from mes_dump import DumpBackend
+from mes_sync import MESTableSync
+from query_cache import DEFAULT_MAX_MB, QueryCache, SchemaVersionProbe
+from production import (ORDERS_SQL, POSITIONS_SQL, WEEKLY_OBJECTIVE, ProductionRollup, calendar,
+                        daily_production, production_from_sql)
+from robot_data import RobotLogFollower, load_robot_cached, load_robot_csv, robot_columns
+from robot_distance import distance_by_period, distance_summary, odometry_steps
+from rollups import filter_days
+from stock_changes import BUFFER_COLUMNS, StockChangeCapture, movements_by_day
+from storage_grid import RACK_QUERY, StorageGrid
 
 # Force UTF-8 encoding for Windows terminal
 if sys.platform == 'win32':
@@ -18,76 +41,580 @@ if sys.platform == 'win32':
 
 warnings.filterwarnings('ignore')
 
+# Durée maximale (s) d'un indicateur en mode parallèle avant d'être abandonné
+INDICATOR_TIMEOUT = 60.0
+
+
+class _ThreadOutput:
+    """
+    Remplace sys.stdout pour le calcul parallèle: chaque thread d'indicateur écrit dans
+    son propre tampon, réaffiché ensuite dans l'ordre des onglets (sortie déterministe)
+    Les autres threads écrivent directement dans le flux d'origine
+    """
+
+    @classmethod
+    def install(cls) -> '_ThreadOutput':
+        """Installe le proxy sur sys.stdout (une seule fois, il reste en place: un indicateur
+        abandonné sur timeout continue d'écrire dans son tampon, pas dans la sortie suivante)"""
+        if not isinstance(sys.stdout, cls):
+            sys.stdout = cls(sys.stdout)
+        return sys.stdout
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    @contextmanager
+    def capture(self):
+        """Redirige les print() du thread courant vers un tampon (retourné par le with)"""
+        self._local.buffer = io.StringIO()
+        try:
+            yield self._local.buffer
+        finally:
+            self._local.buffer = None
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
 
 class MESIndicators:
     """Classe pour calculer les 15 indicateurs MES"""
     
-    def __init__(self, db_config: Dict[str, str], csv_robot_path: str):
+    # Mode snapshot: chaque table de base n'est lue qu'une fois par rafraîchissement,
+    # les 15 indicateurs sont ensuite dérivés en mémoire de ces DataFrames partagés
+    SNAPSHOT_QUERIES = {
+        'tblfinorder': "SELECT ONo, Start, End FROM tblfinorder",
+        'tblfinorderpos': "SELECT ONo, OPos, End FROM tblfinorderpos",
+        'tblfinstep': f"SELECT {', '.join(STEP_COLUMNS + ENERGY_COLUMNS)} FROM tblfinstep",
+        'tblbufferpos': f"SELECT {', '.join(BUFFER_COLUMNS)} FROM tblbufferpos",
+        'tblbuffer': RACK_QUERY,
+        'tblboxpos': "SELECT BoxPos, BoxPNo, BoxId FROM tblboxpos",
+        'tblmainterror': "SELECT ErrorNo FROM tblmainterror",
+        'tblerrorcodes': "SELECT ErrorId, Description FROM tblerrorcodes",
+        'tblmachinereport': f"SELECT {', '.join(REPORT_COLUMNS)} FROM tblmachinereport",
+    }
+    
+    # Tables du snapshot restreintes à la période: (colonne début, colonne fin)
+    SNAPSHOT_PERIOD_COLUMNS = {
+        'tblfinorder': ('Start', 'End'),
+        # Start n'est pas renseignée pour les positions récentes: seule la fin filtre
+        'tblfinorderpos': ('End', 'End'),
+        'tblfinstep': ('Start', 'End'),
+        'tblmachinereport': ('TimeStamp', 'TimeStamp'),
+    }
+    
+    # Historique (s) lu avant le début de la période: état des postes au début de la fenêtre
+    SNAPSHOT_LOOKBACK = {
+        'tblmachinereport': MAX_HOLD_SECONDS,
+    }
+    
+    # Indicateurs par onglet du dashboard, dans l'ordre d'affichage
+    INDICATOR_TABS = [
+        ("🔴 ONGLET 1: TEMPS RÉEL", [
+            'indicator_1_autonomie_robot', 'indicator_2_of_realises', 'indicator_3_production_realisee']),
+        ("🟠 ONGLET 2: STOCKAGE", [
+            'indicator_4_taux_occupation', 'indicator_5_mouvements_stocks']),
+        ("🟡 ONGLET 3: ROBOT", [
+            'indicator_6_historique_autonomie', 'indicator_7_distance_parcourue']),
+        ("🔵 ONGLET 4: PRODUCTION / QUALITÉ / ÉNERGIE", [
+            'indicator_8_production_hebdo', 'indicator_9_production_detaillee',
+            'indicator_10_taux_occupation_machine', 'indicator_11_temps_cycle_nva',
+            'indicator_12_taux_defaut', 'indicator_13_causes_nc', 'indicator_14_taux_conforme',
+            'indicator_15_consommation_energie']),
+    ]
+    
+    # Index qui rendent les filtres de période proportionnels à la fenêtre demandée
+    PERIOD_INDEXES = [
+        ('tblfinorder', 'idx_finorder_end', 'End'),
+        ('tblfinorder', 'idx_finorder_start', 'Start'),
+        ('tblfinorderpos', 'idx_finorderpos_end', 'End'),
+        ('tblfinstep', 'idx_finstep_start', 'Start'),
+        ('tblfinstep', 'idx_finstep_end', 'End'),
+        ('tblmachinereport', 'idx_machinereport_timestamp', 'TimeStamp'),
+        ('tblbufferpos', 'idx_bufferpos_timestamp', 'TimeStamp'),
+    ]
+    
+    def __init__(self, db_config: Dict[str, str], csv_robot_path: str,
+                 pool_size: Optional[int] = None, cache_dir: Optional[str] = None,
+                 dump_path: Optional[str] = None, backend: Optional[MESBackend] = None,
+                 metrics: Optional[MetricsRecorder] = None,
+                 query_cache_mb: Optional[float] = DEFAULT_MAX_MB):
         """
         Initialise la connexion à la base de données et charge les données CSV
         
         Args:
             db_config: Configuration de connexion MariaDB
             csv_robot_path: Chemin vers robotino_data.csv
+            pool_size: Taille du pool de connexions partagé (défaut: db_pool.DEFAULT_POOL_SIZE)
+            cache_dir: Dossier du cache local Parquet (synchronisation incrémentale des
+                       tables d'OF et de rapports, cumuls journaliers de production et d'énergie,
+                       journal des mouvements de stock).
+                       None = lecture directe dans MariaDB
+            dump_path: Dump mysqldump (.sql) ou dossier Parquet: les indicateurs sont calculés
+                       hors ligne depuis ce fichier, sans MariaDB (mode snapshot uniquement)
+            backend: Backend d'exécution du SQL des indicateurs (ex: mes_backends.EmbeddedBackend,
+                     copie analytique locale). None = pool MariaDB partagé
+            metrics: Instrumentation des indicateurs et des requêtes (défaut: tampon propre à l'instance)
+            query_cache_mb: Plafond mémoire (Mo) du cache des résultats de requêtes, invalidé par
+                            les versions des tables (voir query_cache). None ou 0 = sans cache
         """
         self.db_config = db_config
         self.csv_robot_path = csv_robot_path
-        self.conn = None
+        self.pool_size = pool_size
+        self.pool = None
         self.robot_data = None
+        self.robot_memory = {}
+        self.robot_follower = None
+        self.snapshot = None
+        self.query_count = 0
+        # Sondes de version du cache des requêtes, comptées à part de query_count
+        self.probe_count = 0
+        self._count_lock = threading.Lock()
+        self.sync = MESTableSync(self.query_db, cache_dir) if cache_dir else None
+        self.energy = EnergyRollup(self.query_db, cache_dir) if cache_dir else None
+        self.production = ProductionRollup(self.query_db, cache_dir) if cache_dir else None
+        self.stock_changes = StockChangeCapture(cache_dir)
+        self.storage_grid = StorageGrid()
+        self._stock_lock = threading.Lock()
+        self.dump_path = dump_path
+        self.dump = None
+        self.backend = backend
+        self.metrics = metrics if metrics is not None else MetricsRecorder()
+        # Journal des requêtes exécutées (requête, paramètres, indicateur), activé par index_advisor
+        self.query_log: Optional[List[Tuple[str, Optional[List], Optional[str]]]] = None
+        self.query_cache = None
+        if query_cache_mb:
+            versions = backend.table_versions if backend is not None else None
+            if versions is None or versions([]) is None:
+                versions = SchemaVersionProbe(self._execute_probe).versions
+            self.query_cache = QueryCache(versions, query_cache_mb)
         
     def connect_db(self):
-        """Établit la connexion à MariaDB"""
+        """Rattache l'instance au pool MariaDB partagé et vérifie que le serveur répond"""
+        if self.dump_path:
+            self.load_dump()
+            return
+        if self.backend is not None:
+            self.backend.ping()
+            print(f"✅ Base analytique embarquée prête ({self.backend.name}), MariaDB non sollicitée\n")
+            return
         try:
-            self.conn = mysql.connector.connect(**self.db_config)
-            print("✅ Connexion à MariaDB réussie\n")
+            self.pool = get_pool(self.db_config, self.pool_size)
+            self.pool.ping()
+            print(f"✅ Connexion à MariaDB réussie (pool de {self.pool.pool_size} connexions)\n")
         except Exception as e:
             print(f"❌ Erreur de connexion à MariaDB: {e}\n")
             raise
     
-    def load_robot_data(self):
-        """Charge les données du robot depuis le CSV"""
+    def load_dump(self):
+        """Charge les tables du snapshot depuis le dump (une seule lecture du fichier)"""
+        if self.dump is None:
+            try:
+                self.dump = DumpBackend(self.dump_path, tables=self.SNAPSHOT_QUERIES)
+                print(f"✅ Dump chargé: {self.dump_path} ({len(self.dump.tables)} tables, sans MariaDB)\n")
+            except Exception as e:
+                print(f"❌ Erreur de lecture du dump: {e}\n")
+                raise
+        return self.dump
+    
+    def load_robot_data(self, indicators: Optional[List[str]] = None, use_cache: bool = True):
+        """
+        Charge les données du robot depuis le CSV (colonnes utiles seulement, typées)
+        
+        Args:
+            indicators: Indicateurs robot à servir (clés de robot_data.ROBOT_COLUMNS, None = tous)
+            use_cache: Passe par le cache binaire Feather à côté du CSV (seule la fin ajoutée est relue)
+        """
         try:
-            self.robot_data = pd.read_csv(self.csv_robot_path)
+            loader = load_robot_cached if use_cache else load_robot_csv
+            with self.metrics.measure('robot', os.path.basename(self.csv_robot_path)) as details:
+                self.robot_data, self.robot_memory = loader(
+                    self.csv_robot_path, columns=robot_columns(indicators))
+                details.update(rows=len(self.robot_data), cache=self.robot_memory.get('cache'),
+                               memory_bytes=self.robot_memory.get('memory_bytes', 0))
             print(f"✅ Données robot chargées: {len(self.robot_data)} lignes\n")
         except Exception as e:
             print(f"❌ Erreur de chargement CSV robot: {e}\n")
             raise
     
-    def query_db(self, query: str) -> pd.DataFrame:
-        """Execute une requête SQL et retourne un DataFrame"""
+    def poll_robot_live(self) -> Dict:
+        """
+        Lit les lignes ajoutées au CSV robot depuis le dernier appel (mode follow)
+        Le suivi démarre au premier appel; les appels suivants ne parsent que la fin du fichier
+        
+        Returns: agrégats glissants (batterie, distance cumulée, courant) de RobotLogFollower.status()
+        """
+        if self.robot_follower is None:
+            self.robot_follower = RobotLogFollower(self.csv_robot_path)
+        new_rows = self.robot_follower.poll()
+        if not new_rows.empty:
+            print(f"   📡 Robot: {len(new_rows)} nouvelles mesures")
+        return self.robot_follower.status()
+    
+    def query_db(self, query: str, params: Optional[List] = None) -> pd.DataFrame:
+        """
+        Execute une requête SQL sur une connexion du pool (ou sur le backend configuré)
+        et retourne un DataFrame
+        Un résultat déjà lu est servi par le cache des requêtes tant que les versions de ses
+        tables n'ont pas changé
+        
+        Args:
+            query: Requête SQL (placeholders %s)
+            params: Valeurs des placeholders
+        
+        Raises:
+            DatabaseUnavailableError: si MariaDB reste injoignable malgré les reconnexions
+                (une connexion perdue ne doit pas se transformer en KPI à zéro)
+        """
+        key = self.query_cache.key(query, params) if self.query_cache is not None else None
+        if key is not None:
+            began = time.perf_counter()
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                self.metrics.record_query(query, time.perf_counter() - began, cached, source='cache', cache='hit')
+                return cached
+        result = self._execute_query(query, params)
+        # Une requête en erreur (DataFrame sans colonnes) n'est jamais mise en cache
+        if key is not None and len(result.columns) > 0:
+            self.query_cache.put(key, result)
+        return result
+    
+    def _execute_query(self, query: str, params: Optional[List] = None, probe: bool = False) -> pd.DataFrame:
+        """
+        Exécute une requête sur le pool ou le backend, sans passer par le cache (voir query_db)
+        Une sonde de version (probe) est comptée dans probe_count, hors query_count et query_log
+        """
+        with self._count_lock:
+            if probe:
+                self.probe_count += 1
+            else:
+                self.query_count += 1
+                if self.query_log is not None:
+                    self.query_log.append((query, params, self.metrics.current_indicator()))
+        if self.backend is None and self.pool is None:
+            self.connect_db()
+        source = self.backend.name if self.backend is not None else 'mariadb'
+        began = time.perf_counter()
         try:
-            return pd.read_sql(query, self.conn)
+            if self.backend is not None:
+                result = self.backend.query(query, params)
+            else:
+                result = self.pool.query(query, params)
+        except DatabaseUnavailableError as e:
+            self.metrics.record_query(query, time.perf_counter() - began, source=source, error=str(e))
+            raise
         except Exception as e:
+            self.metrics.record_query(query, time.perf_counter() - began, source=source, error=str(e))
             print(f"❌ Erreur lors de la requête SQL: {e}")
             return pd.DataFrame()
+        self.metrics.record_query(query, time.perf_counter() - began, result, source=source)
+        return result
+    
+    def _execute_probe(self, query: str, params: Optional[List] = None) -> pd.DataFrame:
+        """Exécuteur des sondes de version du cache des requêtes (SchemaVersionProbe)"""
+        return self._execute_query(query, params, probe=True)
+    
+    def ensure_indexes(self, create: bool = False) -> List[str]:
+        """
+        Vérifie la présence des index utilisés par les filtres de période
+        
+        Args:
+            create: Si True, crée les index manquants (droit INDEX requis)
+        Returns: liste des instructions CREATE INDEX manquantes
+        """
+        if isinstance(self.backend, EmbeddedBackend):
+            # Copie locale: les index sont créés directement, sans droits particuliers
+            return self.backend.create_indexes(self.PERIOD_INDEXES)
+        existing = self.query_db("""
+            SELECT LOWER(TABLE_NAME) as table_name, LOWER(COLUMN_NAME) as column_name
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND SEQ_IN_INDEX = 1
+        """)
+        indexed = set(zip(existing['table_name'], existing['column_name'])) if not existing.empty else set()
+        
+        missing = [
+            f"CREATE INDEX {name} ON {table} (`{column}`)"
+            for table, name, column in self.PERIOD_INDEXES
+            if (table, column.lower()) not in indexed
+        ]
+        for statement in missing:
+            if create:
+                try:
+                    self.pool.execute(statement)
+                    print(f"   ✅ {statement}")
+                except DatabaseUnavailableError:
+                    raise
+                except Exception as e:
+                    print(f"   ❌ {statement}: {e}")
+            else:
+                print(f"   💡 Index conseillé: {statement}")
+        return missing
+    
+    @staticmethod
+    def _normalize_period(start=None, end=None) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """
+        Convertit la période du filtre en bornes [start, end[
+        Une date de fin sans heure (date_input Streamlit) inclut toute la journée
+        """
+        if start is not None:
+            start = pd.Timestamp(start).to_pydatetime()
+        if end is not None:
+            end_is_day = isinstance(end, date) and not isinstance(end, datetime)
+            end = pd.Timestamp(end).to_pydatetime()
+            if end_is_day:
+                end += timedelta(days=1)
+        return start, end
+    
+    @classmethod
+    def _period_sql(cls, column: str, start=None, end=None) -> Tuple[str, List]:
+        """
+        Prédicat sargable sur une colonne temporelle: la colonne reste nue
+        (pas de DATE()/fonction), l'index sur `column` est donc utilisable
+        
+        Returns: (condition SQL, paramètres)
+        """
+        start, end = cls._normalize_period(start, end)
+        conditions, params = [], []
+        if start is not None:
+            conditions.append(f"{column} >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append(f"{column} < %s")
+            params.append(end)
+        return " AND ".join(conditions) or "1 = 1", params
+    
+    @classmethod
+    def _overlap_sql(cls, start_column: str, end_column: str, start=None, end=None) -> Tuple[str, List]:
+        """
+        Prédicat sargable des lignes actives sur la période
+        (commencées avant la fin et non terminées avant le début)
+        
+        Returns: (condition SQL, paramètres)
+        """
+        start, end = cls._normalize_period(start, end)
+        conditions, params = [], []
+        if end is not None:
+            conditions.append(f"{start_column} < %s")
+            params.append(end)
+        if start is not None:
+            conditions.append(f"({end_column} >= %s OR {end_column} IS NULL)")
+            params.append(start)
+        return " AND ".join(conditions) or "1 = 1", params
+    
+    @classmethod
+    def _period_mask(cls, values: pd.Series, start=None, end=None) -> pd.Series:
+        """Équivalent en mémoire de _period_sql (valeurs manquantes exclues si période)"""
+        start, end = cls._normalize_period(start, end)
+        values = pd.to_datetime(values)
+        mask = pd.Series(True, index=values.index)
+        if start is not None:
+            mask &= values >= start
+        if end is not None:
+            mask &= values < end
+        return mask
+    
+    @classmethod
+    def _overlap_mask(cls, starts: pd.Series, ends: pd.Series, start=None, end=None) -> pd.Series:
+        """Équivalent en mémoire de _overlap_sql"""
+        start, end = cls._normalize_period(start, end)
+        starts, ends = pd.to_datetime(starts), pd.to_datetime(ends)
+        mask = pd.Series(True, index=starts.index)
+        if end is not None:
+            mask &= starts < end
+        if start is not None:
+            mask &= (ends >= start) | ends.isna()
+        return mask
+    
+    def _robot_period(self, start=None, end=None) -> Optional[pd.DataFrame]:
+        """Données robot restreintes à la période (colonne timestamp)"""
+        if self.robot_data is None or (start is None and end is None):
+            return self.robot_data
+        if 'timestamp' not in self.robot_data.columns:
+            return self.robot_data
+        if not pd.api.types.is_datetime64_any_dtype(self.robot_data['timestamp']):
+            self.robot_data['timestamp'] = pd.to_datetime(self.robot_data['timestamp'], errors='coerce')
+        return self.robot_data[self._period_mask(self.robot_data['timestamp'], start, end)]
+    
+    def refresh_snapshot(self, start=None, end=None) -> Dict[str, pd.DataFrame]:
+        """
+        Charge les tables de base en une seule passe (une requête par table)
+        
+        Args:
+            start, end: Période d'analyse (les tables d'ordres ne sont lues que sur la période)
+        Returns: dict {nom_table: DataFrame} partagé par tous les indicateurs
+        """
+        queries_before = self.query_count
+        source = 'dump' if self.dump_path else self.backend.name if self.backend is not None else 'mariadb'
+        with self.metrics.measure('snapshot', 'refresh_snapshot', source=source) as details:
+            self._load_snapshot(start, end)
+            details.update(queries=self.query_count - queries_before,
+                           rows=sum(len(frame) for frame in self.snapshot.values()),
+                           memory_bytes=frame_bytes(self.snapshot))
+        return self.snapshot
+    
+    def last_active_period(self, days: int = 7) -> Optional[Tuple[date, date]]:
+        """
+        Dernière période d'activité des données: les `days` jours terminés par le dernier OF fini
+        (période par défaut du dashboard, le dump hors ligne ne couvre pas la semaine en cours)
+        
+        Returns: (premier jour, dernier jour) inclus, None si aucun OF terminé
+        """
+        if self.dump_path:
+            orders = self.load_dump().table('tblfinorder')
+            last = pd.to_datetime(orders['End']).max() if 'End' in orders.columns else None
+        else:
+            result = self.query_db("SELECT MAX(End) AS fin FROM tblfinorder")
+            last = result['fin'].iloc[0] if not result.empty else None
+        if last is None or pd.isna(last):
+            return None
+        last = pd.Timestamp(last).date()
+        return last - timedelta(days=days - 1), last
+    
+    def _load_snapshot(self, start=None, end=None) -> Dict[str, pd.DataFrame]:
+        queries_before = self.query_count
+        self.snapshot = {}
+        
+        # Mode hors ligne: toutes les tables viennent du dump, filtrées en mémoire
+        if self.dump_path:
+            for table in self.SNAPSHOT_QUERIES:
+                frame = self.load_dump().table(table)
+                if table in self.SNAPSHOT_PERIOD_COLUMNS and len(frame.columns) > 0:
+                    start_column, end_column = self.SNAPSHOT_PERIOD_COLUMNS[table]
+                    frame = frame[self._overlap_mask(frame[start_column], frame[end_column],
+                                                     *self._snapshot_window(table, start, end))]
+                self.snapshot[table] = frame
+            print(f"✅ Snapshot chargé: {len(self.snapshot)} tables depuis le dump\n")
+            return self.snapshot
+        
+        # Tables immuables: copie locale synchronisée, seules les nouvelles lignes sont lues
+        if self.sync is not None:
+            for table, frame in self.sync.refresh().items():
+                if table not in self.SNAPSHOT_QUERIES:
+                    continue
+                if table in self.SNAPSHOT_PERIOD_COLUMNS and len(frame.columns) > 0:
+                    start_column, end_column = self.SNAPSHOT_PERIOD_COLUMNS[table]
+                    frame = frame[self._overlap_mask(frame[start_column], frame[end_column],
+                                                     *self._snapshot_window(table, start, end))]
+                self.snapshot[table] = frame
+            new_rows = sum(self.sync.last_sync_rows.values())
+            print(f"🔄 Cache local synchronisé: {new_rows} nouvelles lignes")
+        
+        for table, query in self.SNAPSHOT_QUERIES.items():
+            if table in self.snapshot:
+                continue
+            params = None
+            if table in self.SNAPSHOT_PERIOD_COLUMNS:
+                condition, params = self._overlap_sql(*self.SNAPSHOT_PERIOD_COLUMNS[table],
+                                                      *self._snapshot_window(table, start, end))
+                query = f"{query} WHERE {condition}"
+            self.snapshot[table] = self.query_db(query, params)
+        print(f"✅ Snapshot chargé: {len(self.snapshot)} tables "
+              f"en {self.query_count - queries_before} requêtes\n")
+        return self.snapshot
+    
+    @classmethod
+    def _snapshot_window(cls, table: str, start=None, end=None) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Période lue pour une table du snapshot (début avancé de SNAPSHOT_LOOKBACK)"""
+        start, end = cls._normalize_period(start, end)
+        if table in cls.SNAPSHOT_LOOKBACK:
+            start = lookback_start(start, cls.SNAPSHOT_LOOKBACK[table])
+        return start, end
+    
+    @staticmethod
+    def _snapshot_result(source: pd.DataFrame, **aggregations) -> pd.DataFrame:
+        """
+        Construit un résultat d'une ligne au format des requêtes SQL
+        
+        Args:
+            source: Table du snapshot
+            aggregations: nom_colonne -> fonction(DataFrame) calculant la valeur
+        Returns: DataFrame vide si la table source n'a pas pu être chargée
+        """
+        if len(source.columns) == 0:
+            return pd.DataFrame()
+        return pd.DataFrame({name: [func(source)] for name, func in aggregations.items()})
+    
+    @classmethod
+    def _finished_orders(cls, orders: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+        """OF terminés sur la période (End renseignée et dans [start, end[)"""
+        return orders[orders['End'].notna() & cls._period_mask(orders['End'], start, end)]
+    
+    @classmethod
+    def _order_durations(cls, orders: pd.DataFrame, start=None, end=None) -> pd.Series:
+        """Durées (s) des OF terminés, équivalent de TIMESTAMPDIFF(SECOND, start, end)"""
+        done = cls._finished_orders(orders, start, end)
+        start = pd.to_datetime(done['Start'])
+        end = pd.to_datetime(done['End'])
+        return (end - start).dt.total_seconds()
+    
+    def _snapshot_quality_counts(self) -> pd.DataFrame:
+        """Total d'OF et nombre de défauts (indicateurs 12 et 14, tout l'historique) à partir du snapshot"""
+        orders = self.snapshot['tblfinorder']
+        errors = self.snapshot['tblmainterror']
+        if len(orders.columns) == 0 or len(errors.columns) == 0:
+            return pd.DataFrame()
+        return pd.DataFrame({'total': [len(orders)], 'defauts': [len(errors)]})
+    
+    def _snapshot_causes_nc(self) -> pd.DataFrame:
+        """Répartition des causes NC (jointure tblmainterror / tblerrorcodes) en mémoire"""
+        errors = self.snapshot['tblmainterror']
+        codes = self.snapshot['tblerrorcodes']
+        if len(errors.columns) == 0 or len(codes.columns) == 0:
+            return pd.DataFrame()
+        merged = errors.merge(codes, left_on='ErrorNo', right_on='ErrorId')
+        return (merged.groupby('Description').size()
+                .rename_axis('cause').reset_index(name='nombre'))
     
     # ========== ONGLET 1: TEMPS RÉEL ==========
     
-    def indicator_1_autonomie_robot(self) -> Tuple[float, float]:
+    def indicator_1_autonomie_robot(self, start=None, end=None) -> Tuple[Optional[float], Optional[float]]:
         """
         1. Autonomie du Robot (Journalier)
-        Returns: (batterie_restante_%, batterie_consommee_%)
+        Args: start, end: Période d'analyse (dernière mesure de la période)
+        Returns: (batterie_restante_%, batterie_consommee_%), (None, None) sans mesure sur la période
         """
         print("📊 Indicateur 1: Autonomie du Robot")
-        
-        if self.robot_data is None:
+        # Sans période, la dernière mesure vient du suivi en continu s'il est actif
+        if self.robot_follower is not None and start is None and end is None:
+            live = self.poll_robot_live()
+            if live['battery'] is not None:
+                restante = round(live['battery'])
+                print(f"   🟢 Batterie restante: {restante}% (temps réel)")
+                print(f"   🔴 Batterie consommée: {100 - restante}%\n")
+                return restante, 100 - restante
+        
+        robot = self._robot_period(start, end)
+        
+        if robot is None or robot.empty:
             print("   ⚠️  Données robot non disponibles")
-            return 0.0, 100.0
+            return None, None
         
         # Chercher la colonne de batterie (peut avoir différents noms)
         battery_col = None
         for col in ['device_potAccuChargeState_centiPercent', 'battery_level', 'battery']:
-            if col in self.robot_data.columns:
+            if col in robot.columns:
                 battery_col = col
                 break
         
         if battery_col is None:
             print("   ⚠️  Colonne de batterie non trouvée dans les données robot")
-            print(f"   📋 Colonnes disponibles: {', '.join(self.robot_data.columns[:5])}...")
-            return 0.0, 100.0
+            print(f"   📋 Colonnes disponibles: {', '.join(robot.columns[:5])}...")
+            return None, None
+        
+        mesures = robot[battery_col].dropna()
+        if mesures.empty:
+            print("   ⚠️  Aucune mesure de batterie sur la période")
+            return None, None
         
         # Dernière valeur de batterie (en centiPercent → Pourcentage)
-        last_battery = self.robot_data[battery_col].iloc[-1]
+        last_battery = mesures.iloc[-1]
         if battery_col == 'device_potAccuChargeState_centiPercent':
             last_battery = last_battery / 100
         
@@ -99,22 +626,32 @@ class MESIndicators:
         
         return restante, consommee
     
-    def indicator_2_of_realises(self) -> Tuple[int, int]:
+    def indicator_2_of_realises(self, start=None, end=None) -> Tuple[int, int]:
         """
         2. Nombre d'OF Réalisés (Journalier)
+        Args: start, end: Période d'analyse (OF actifs sur la période / terminés dans la période)
         Returns: (of_termines, of_restants)
         """
         print("📊 Indicateur 2: Ordres de Fabrication Réalisés")
         
-        query = "SELECT COUNT(*) as total FROM tblfinorder"
-        total_of = self.query_db(query)
-        
-        query_done = """
-            SELECT COUNT(*) as done 
-            FROM tblfinorder 
-            WHERE end IS NOT NULL
-        """
-        of_done = self.query_db(query_done)
+        if self.snapshot is not None:
+            fin = self.snapshot['tblfinorder']
+            total_of = self._snapshot_result(
+                fin, total=lambda df: self._overlap_mask(df['Start'], df['End'], start, end).sum())
+            of_done = self._snapshot_result(
+                fin, done=lambda df: len(self._finished_orders(df, start, end)))
+        else:
+            condition, params = self._overlap_sql('Start', 'End', start, end)
+            query = f"SELECT COUNT(*) as total FROM tblfinorder WHERE {condition}"
+            total_of = self.query_db(query, params)
+            
+            condition, params = self._period_sql('End', start, end)
+            query_done = f"""
+                SELECT COUNT(*) as done 
+                FROM tblfinorder 
+                WHERE end IS NOT NULL AND {condition}
+            """
+            of_done = self.query_db(query_done, params)
         
         if total_of.empty or of_done.empty:
             print("   ⚠️  Pas de données d'OF disponibles")
@@ -130,20 +667,27 @@ class MESIndicators:
         
         return done, reste
     
-    def indicator_3_production_realisee(self) -> Tuple[int, int]:
+    def indicator_3_production_realisee(self, start=None, end=None) -> Tuple[int, int]:
         """
         3. Production Réalisée (Journalière)
+        Args: start, end: Période d'analyse (pièces finies; tblboxpos n'est pas horodatée)
         Returns: (pieces_finies, pieces_restantes)
         """
         print("📊 Indicateur 3: Production Réalisée")
         
-        # Compter le total de pièces dans tblboxpos
-        query_total = "SELECT COUNT(*) as total FROM tblboxpos"
-        result_total = self.query_db(query_total)
-        
-        # Compter les OF terminés comme proxy des pièces finies
-        query_done = "SELECT COUNT(*) as fini FROM tblfinorder WHERE end IS NOT NULL"
-        result_done = self.query_db(query_done)
+        if self.snapshot is not None:
+            result_total = self._snapshot_result(self.snapshot['tblboxpos'], total=len)
+            result_done = self._snapshot_result(
+                self.snapshot['tblfinorder'], fini=lambda df: len(self._finished_orders(df, start, end)))
+        else:
+            # Compter le total de pièces dans tblboxpos
+            query_total = "SELECT COUNT(*) as total FROM tblboxpos"
+            result_total = self.query_db(query_total)
+            
+            # Compter les OF terminés comme proxy des pièces finies
+            condition, params = self._period_sql('End', start, end)
+            query_done = f"SELECT COUNT(*) as fini FROM tblfinorder WHERE end IS NOT NULL AND {condition}"
+            result_done = self.query_db(query_done, params)
         
         if result_total.empty:
             print("   ⚠️  Pas de données de production disponibles")
@@ -161,249 +705,395 @@ class MESIndicators:
     
     # ========== ONGLET 2: STOCKAGE ==========
     
-    def indicator_4_taux_occupation(self) -> float:
+    def indicator_4_taux_occupation(self, start=None, end=None) -> Dict:
         """
         4. Taux d'Occupation Stockage
-        Returns: taux_occupation_%
+        Grille des positions tenue à jour par le journal des changements de tblbufferpos
+        (voir storage_grid): une position est occupée quand une caisse y est présente
+        Args: start, end: Période de l'historique d'occupation (le taux est instantané)
+        Returns: dict avec taux (%), occupees, positions, par_zone, par_type (DataFrames),
+                 historique (évolution par type) et carte (positions placées dans leur magasin)
         """
         print("📊 Indicateur 4: Taux d'Occupation Stockage")
         
-        query_total = "SELECT COUNT(*) as total FROM tblbufferpos"
-        query_occupied = """
-            SELECT COUNT(*) as occupied 
-            FROM tblbufferpos 
-            WHERE boxid IS NOT NULL AND boxid != 0
-        """
-        
-        total = self.query_db(query_total)
-        occupied = self.query_db(query_occupied)
-        
-        if total.empty or occupied.empty:
+        self.poll_stock_changes()
+        if self.storage_grid.empty:
             print("   ⚠️  Pas de données de stockage disponibles")
-            return 0.0
+            return {"taux": 0.0, "occupees": 0, "positions": 0, "par_zone": pd.DataFrame(),
+                    "par_type": pd.DataFrame(), "historique": pd.DataFrame(), "carte": pd.DataFrame()}
         
-        total_positions = int(total['total'].iloc[0])
-        occupied_positions = int(occupied['occupied'].iloc[0])
-        taux = (occupied_positions / total_positions * 100) if total_positions > 0 else 0
+        occupied_positions, total_positions, taux = self.storage_grid.rate()
+        start, end = self._normalize_period(start, end)
         
         status = "🟢" if taux < 70 else "🟠" if taux < 85 else "🔴"
         print(f"   {status} Taux d'occupation: {taux:.1f}%")
-        print(f"   📦 Positions occupées: {occupied_positions}/{total_positions}\n")
+        print(f"   📦 Positions occupées: {occupied_positions}/{total_positions}")
+        by_type = self.storage_grid.occupancy('type')
+        for row in by_type.itertuples(index=False):
+            print(f"      {row.type}: {row.occupees}/{row.positions} ({row.taux_pct:.0f}%)")
+        print()
         
-        return taux
+        return {"taux": taux, "occupees": occupied_positions, "positions": total_positions,
+                "par_zone": self.storage_grid.occupancy('zone'), "par_type": by_type,
+                "historique": self.storage_grid.timeline('type', start, end),
+                "carte": self.storage_grid.heatmap()}
     
-    def indicator_5_mouvements_stocks(self) -> int:
+    def indicator_5_mouvements_stocks(self, start=None, end=None) -> Dict:
         """
         5. Mouvements de Stocks
-        Returns: nombre_total_mouvements
+        Entrées et sorties lues dans le journal des changements de tblbufferpos (relevé comparé
+        au précédent à chaque calcul, voir stock_changes)
+        Args: start, end: Période d'analyse (instant du changement)
+        Returns: dict avec total, entrees, sorties et par_jour (DataFrame jour, entrees, sorties,
+                 mouvements; sans période: les 7 jours se terminant au dernier mouvement)
         """
         print("📊 Indicateur 5: Mouvements de Stocks")
         
-        # Approximation: on compte les changements dans tblbufferpos
-        query = """
-            SELECT COUNT(*) as mouvements 
-            FROM tblbufferpos 
-            WHERE boxid IS NOT NULL
-        """
-        result = self.query_db(query)
-        
-        if result.empty:
-            print("   ⚠️  Pas de données de mouvements disponibles")
-            return 0
+        self.poll_stock_changes()
+        start, end = self._normalize_period(start, end)
+        history = self.stock_changes.history()
+        per_day = movements_by_day(history, start, end)
+        if per_day.empty:
+            print("   ⚠️  Pas de données de mouvements disponibles\n")
+            return {"total": 0, "entrees": 0, "sorties": 0, "par_jour": per_day}
+        
+        entrees, sorties = int(per_day['entrees'].sum()), int(per_day['sorties'].sum())
+        print(f"   📊 Mouvements totaux: {entrees + sorties}")
+        print(f"   📥 Entrées: {entrees}   📤 Sorties: {sorties}")
+        if history['inferred'].all():
+            print("   ℹ️  Historique déduit du premier relevé (dernier changement de chaque position)")
+        print()
         
-        mouvements = int(result['mouvements'].iloc[0])
-        print(f"   📊 Mouvements totaux: {mouvements}\n")
+        return {"total": entrees + sorties, "entrees": entrees, "sorties": sorties,
+                "par_jour": movements_by_day(history, start, end, days=7)}
+    
+    def poll_stock_changes(self) -> pd.DataFrame:
+        """
+        Relevé de tblbufferpos (snapshot courant ou requête) comparé au précédent par empreinte
         
-        return mouvements
+        Returns: nouveaux enregistrements du journal des changements
+        """
+        if self.snapshot is not None:
+            current = self.snapshot['tblbufferpos']
+        else:
+            current = self.query_db(self.SNAPSHOT_QUERIES['tblbufferpos'])
+        # Journal et grille d'occupation mis à jour ensemble (indicateurs 4 et 5 en parallèle)
+        with self._stock_lock:
+            changes = self.stock_changes.poll(current)
+            if self.storage_grid.empty:
+                self._load_storage_grid(current)
+            else:
+                self.storage_grid.apply(changes, layout=current)
+        if len(changes) and changes['inferred'].all():
+            print(f"   📸 Premier relevé du stock: {len(changes)} positions")
+        elif len(changes):
+            print(f"   🔄 {len(changes)} positions de stock modifiées depuis le dernier relevé")
+        return changes
+    
+    def _load_storage_grid(self, current: pd.DataFrame):
+        """Charge la grille depuis un relevé complet, avec la géométrie des magasins (tblbuffer)"""
+        if not set(BUFFER_COLUMNS) <= set(current.columns):
+            return
+        self.storage_grid.load(current)
+        if self.snapshot is not None and 'tblbuffer' in self.snapshot:
+            racks = self.snapshot['tblbuffer']
+        else:
+            racks = self.query_db(self.SNAPSHOT_QUERIES['tblbuffer'])
+        self.storage_grid.set_racks(racks)
+    
+    def storage_occupancy(self, by: str = 'type', start=None, end=None) -> pd.DataFrame:
+        """Évolution de l'occupation par type ('type') ou par zone ('zone'), lue dans la grille"""
+        start, end = self._normalize_period(start, end)
+        return self.storage_grid.timeline(by, start, end)
+    
+    def stock_movements(self, start=None, end=None) -> pd.DataFrame:
+        """Entrées / sorties par jour depuis le journal des changements (graphique de la page Stockage)"""
+        start, end = self._normalize_period(start, end)
+        return movements_by_day(self.stock_changes.history(), start, end, days=7)
     
     # ========== ONGLET 3: ROBOT ==========
     
-    def indicator_6_historique_autonomie(self) -> Dict:
+    def indicator_6_historique_autonomie(self, start=None, end=None) -> Dict:
         """
         6. Historique Autonomie Robot
+        Args: start, end: Période d'analyse
         Returns: dict avec moyennes
         """
         print("📊 Indicateur 6: Historique Autonomie Robot")
+        robot = self._robot_period(start, end)
         
-        if self.robot_data is None:
+        if robot is None or robot.empty:
             print("   ⚠️  Données robot non disponibles")
             return {}
         
-        if 'device_potAccuChargeState_centiPercent' in self.robot_data.columns:
-            avg_battery = self.robot_data['device_potAccuChargeState_centiPercent'].mean() / 100
+        if 'device_potAccuChargeState_centiPercent' in robot.columns:
+            avg_battery = robot['device_potAccuChargeState_centiPercent'].mean() / 100
             print(f"   🔋 Batterie moyenne: {avg_battery:.1f}%")
         
-        if 'power_output_current' in self.robot_data.columns:
-            avg_current = self.robot_data['power_output_current'].mean()
+        if 'power_output_current' in robot.columns:
+            avg_current = robot['power_output_current'].mean()
             print(f"   ⚡ Courant moyen: {avg_current:.2f}A\n")
         
-        return {"battery_avg": avg_battery if 'device_potAccuChargeState_centiPercent' in self.robot_data.columns else 0}
+        return {"battery_avg": avg_battery if 'device_potAccuChargeState_centiPercent' in robot.columns else 0}
     
-    def indicator_7_distance_parcourue(self) -> float:
+    def indicator_7_distance_parcourue(self, start=None, end=None) -> float:
         """
         7. Distance Parcourue
+        Les remises à zéro de l'odométrie, sauts de pose et trous dans le log ne sont pas comptés
+        Args: start, end: Période d'analyse
         Returns: distance_en_metres
         """
         print("📊 Indicateur 7: Distance Parcourue")
+        robot = self._robot_period(start, end)
         
-        if self.robot_data is None or 'odometry_x' not in self.robot_data.columns:
+        if robot is None or 'odometry_x' not in robot.columns:
             print("   ⚠️  Données d'odométrie non disponibles")
-            print(f"   📋 Colonnes disponibles: {', '.join(self.robot_data.columns[:10]) if self.robot_data is not None else 'aucune'}...")
+            print(f"   📋 Colonnes disponibles: {', '.join(robot.columns[:10]) if robot is not None else 'aucune'}...")
             return 0.0
         
-        # Calcul de la distance euclidienne entre points successifs
-        x = self.robot_data['odometry_x'].values
-        y = self.robot_data['odometry_y'].values
-        
-        # Retirer les NaN
-        mask = ~(np.isnan(x) | np.isnan(y))
-        x = x[mask]
-        y = y[mask]
-        
-        if len(x) < 2:
+        steps = odometry_steps(robot)
+        if steps.empty:
             print("   ⚠️  Pas assez de données d'odométrie valides")
             return 0.0
         
-        distances = np.sqrt(np.diff(x)**2 + np.diff(y)**2)
-        total_distance = np.sum(distances)
-        
-        print(f"   🚗 Distance totale: {total_distance:.0f} mètres\n")
+        summary = distance_summary(steps)
+        total_distance = summary['distance']
+        print(f"   🚗 Distance totale: {total_distance:.0f} mètres")
+        ignored = summary['resets'] + summary['jumps'] + summary['gaps']
+        if ignored:
+            print(f"   ⚠️  Pas écartés: {summary['resets']} remises à zéro, {summary['jumps']} sauts, "
+                  f"{summary['gaps']} trous")
+        print()
         
         return round(total_distance)
     
+    def distance_series(self, by: str = 'day', start=None, end=None) -> pd.DataFrame:
+        """
+        Distance parcourue par jour ou par poste avec cumul (graphique de la page Robot)
+        
+        Args:
+            by: 'day' ou 'shift'
+            start, end: Période d'analyse
+        Returns: DataFrame (period, distance, cumulative, resets, jumps, gaps)
+        """
+        robot = self._robot_period(start, end)
+        if robot is None or 'odometry_x' not in robot.columns:
+            return pd.DataFrame(columns=['period', 'distance', 'cumulative', 'resets', 'jumps', 'gaps'])
+        return distance_by_period(robot, by)
+    
     # ========== ONGLET 4: PROD / QUALITÉ / ÉNERGIE ==========
     
-    def indicator_8_production_hebdo(self, objectif: int = 720) -> Tuple[int, int]:
+    def indicator_8_production_hebdo(self, objectif: int = WEEKLY_OBJECTIVE, start=None, end=None) -> Tuple[int, int]:
         """
         8. Production Hebdomadaire
+        Args:
+            objectif: Objectif hebdomadaire (réparti sur les jours ouvrés de la période)
+            start, end: Période d'analyse (date de fin des OF), défaut: 7 derniers jours produits
         Returns: (production_reelle, objectif)
         """
         print("📊 Indicateur 8: Production Hebdomadaire")
         
-        # Compter les OF terminés comme production
-        query = """
-            SELECT COUNT(*) as prod 
-            FROM tblfinorder 
-            WHERE end IS NOT NULL
-        """
-        result = self.query_db(query)
-        
-        if result.empty:
+        days = calendar(self._production_daily(start, end), *self._normalize_period(start, end),
+                        weekly_objective=objectif)
+        if days.empty:
             print("   ⚠️  Pas de données de production disponibles")
             return 0, objectif
         
-        production = int(result['prod'].iloc[0])
-        print(f"   📊 Production réelle: {production}")
-        print(f"   🎯 Objectif: {objectif}")
-        print(f"   {'✅' if production >= objectif else '❌'} Objectif {'atteint' if production >= objectif else 'non atteint'}\n")
+        production = int(days['production'].sum())
+        objectif_periode = int(round(days['objectif'].sum()))
+        print(f"   📊 Production réelle: {production} OF ({int(days['positions'].sum())} positions)")
+        print(f"   🎯 Objectif: {objectif_periode} ({days['jour'].iloc[0]} → {days['jour'].iloc[-1]})")
+        print(f"   {'✅' if production >= objectif_periode else '❌'} Objectif "
+              f"{'atteint' if production >= objectif_periode else 'non atteint'} "
+              f"(écart: {production - objectif_periode:+d})\n")
         
-        return production, objectif
+        return production, objectif_periode
     
-    def indicator_9_production_detaillee(self) -> pd.DataFrame:
+    def indicator_9_production_detaillee(self, start=None, end=None) -> pd.DataFrame:
         """
         9. Production Détaillée (Semaine)
-        Returns: DataFrame avec production par jour
+        Tous les jours de la période, jours sans production compris
+        Args: start, end: Période d'analyse (date de fin des OF), défaut: 7 derniers jours produits
+        Returns: DataFrame (jour, production, positions, objectif, ecart) par jour
         """
         print("📊 Indicateur 9: Production Détaillée par Jour")
         
-        query = """
-            SELECT 
-                DATE(end) as jour,
-                COUNT(*) as production
-            FROM tblfinorder
-            WHERE end IS NOT NULL
-            GROUP BY DATE(end)
-            ORDER BY jour DESC
-            LIMIT 7
-        """
-        result = self.query_db(query)
-        
+        result = calendar(self._production_daily(start, end), *self._normalize_period(start, end))
         if result.empty:
             print("   ⚠️  Pas de données de production disponibles")
             return pd.DataFrame()
         
         print("   📅 Production par jour:")
-        for _, row in result.iterrows():
-            print(f"      {row['jour']}: {row['production']} pièces")
+        for row in result.itertuples(index=False):
+            print(f"      {row.jour}: {row.production} pièces (objectif {row.objectif:.0f}, écart {row.ecart:+.0f})")
         print()
         
         return result
     
-    def indicator_10_taux_occupation_machine(self) -> float:
+    def _production_daily(self, start=None, end=None) -> pd.DataFrame:
+        """
+        Cumuls journaliers de production (day, orders, positions): table persistée si un cache
+        local est configuré, sinon snapshot ou agrégation SQL directe sur la période
+        """
+        start, end = self._normalize_period(start, end)
+        if self.production is not None and not self.dump_path:
+            return filter_days(self.production.refresh(), start, end)
+        if self.snapshot is not None:
+            orders, positions = self.snapshot['tblfinorder'], self.snapshot['tblfinorderpos']
+            if len(orders.columns) == 0:
+                return daily_production(pd.DataFrame(), pd.DataFrame())
+            orders = self._finished_orders(orders, start, end)
+            if len(positions.columns) > 0:
+                positions = self._finished_orders(positions, start, end)
+            return daily_production(orders, positions)
+        condition, params = self._period_sql('End', start, end)
+        orders = self.query_db(ORDERS_SQL.format(condition=condition), params)
+        positions = self.query_db(POSITIONS_SQL.format(condition=condition), params)
+        return production_from_sql(orders, positions)
+    
+    def indicator_10_taux_occupation_machine(self, start=None, end=None) -> float:
         """
         10. Taux d'Occupation Machine
+        Temps occupé (Busy) / temps observé des postes (hors mode manuel), d'après les rapports tblmachinereport
+        Args: start, end: Période d'analyse
         Returns: taux_%
         """
         print("📊 Indicateur 10: Taux d'Occupation Machine")
         
-        query = """
-            SELECT 
-                SUM(TIMESTAMPDIFF(SECOND, start, end)) / 3600 as heures_travail
-            FROM tblfinorder
-            WHERE end IS NOT NULL
-        """
-        result = self.query_db(query)
-        
-        if result.empty or pd.isna(result['heures_travail'].iloc[0]):
-            print("   ⚠️  Pas de données de temps de travail disponibles")
+        intervals = self._machine_intervals(start, end)
+        if intervals.empty:
+            print("   ⚠️  Pas de rapports machine sur la période")
             return 0.0
         
-        heures_travail = float(result['heures_travail'].iloc[0])
-        # Hypothèse: 8h/jour * 5 jours = 40h disponibles par semaine
-        heures_disponibles = 40
-        taux = (heures_travail / heures_disponibles * 100) if heures_disponibles > 0 else 0
+        stations = occupancy(intervals, ['ResourceID'])
+        busy_h, observed_h = stations['busy_h'].sum(), stations['observed_h'].sum()
+        taux = busy_h / observed_h * 100 if observed_h > 0 else 0.0
         
         status = "✅" if taux >= 80 else "⚠️"
         print(f"   {status} Taux d'occupation: {taux:.1f}%")
-        print(f"   ⏱️  Heures travail: {heures_travail:.1f}h / {heures_disponibles}h")
+        print(f"   ⏱️  Heures occupées: {busy_h:.1f}h / {observed_h:.1f}h observées "
+              f"(erreur: {stations['error_h'].sum():.1f}h, mode manuel exclu: {stations['manual_h'].sum():.1f}h)")
+        print("   🏭 Par poste:")
+        for row in stations.itertuples(index=False):
+            print(f"      Poste {row.ResourceID}: {row.occupation_pct:.1f}% "
+                  f"({row.busy_h:.1f}h / {row.observed_h:.1f}h, erreur {row.erreur_pct:.1f}%)")
         print(f"   🎯 Objectif: 80%\n")
         
         return taux
     
-    def indicator_11_temps_cycle_nva(self) -> Dict[str, float]:
+    def _machine_intervals(self, start=None, end=None) -> pd.DataFrame:
+        """Intervalles occupé / libre / erreur / manuel des postes sur la période (voir machine_states)"""
+        if self.snapshot is not None:
+            reports = self.snapshot['tblmachinereport']
+        else:
+            condition, params = self._period_sql('TimeStamp',
+                                                 *self._snapshot_window('tblmachinereport', start, end))
+            reports = self.query_db(f"{self.SNAPSHOT_QUERIES['tblmachinereport']} WHERE {condition}", params)
+        return machine_intervals(reports, *self._normalize_period(start, end))
+    
+    def machine_occupancy(self, by: str = 'resource', start=None, end=None) -> pd.DataFrame:
+        """
+        Occupation des postes par poste, par jour ou par poste et par jour (page Qualité)
+        
+        Args:
+            by: 'resource', 'day' ou 'resource_day'
+            start, end: Période d'analyse
+        Returns: DataFrame (ResourceID et/ou day, busy_h, idle_h, error_h, manual_h, observed_h,
+                 occupation_pct, erreur_pct)
+        """
+        columns = {'resource': ['ResourceID'], 'day': ['day'], 'resource_day': ['ResourceID', 'day']}[by]
+        intervals = self._machine_intervals(start, end)
+        if 'day' in columns:
+            intervals = split_by_day(intervals)
+        return occupancy(intervals, columns)
+    
+    def indicator_11_temps_cycle_nva(self, start=None, end=None) -> Dict[str, float]:
         """
         11. Temps de Cycle & Non Valeur Ajoutée
-        Returns: dict avec temps_cycle_moyen et nva
+        Délai des OF découpé d'après les étapes tblfinstep: traitement (VA), transport et
+        attente entre étapes (NVA)
+        Args: start, end: Période d'analyse (date de fin des OF)
+        Returns: dict avec temps_cycle_moyen, va, nva (transport + attente), transport, attente
         """
         print("📊 Indicateur 11: Temps de Cycle & NVA")
         
-        query = """
-            SELECT 
-                AVG(TIMESTAMPDIFF(SECOND, start, end)) as cycle_moyen
-            FROM tblfinorder
-            WHERE end IS NOT NULL
-        """
-        result = self.query_db(query)
-        
-        if result.empty or pd.isna(result['cycle_moyen'].iloc[0]):
+        orders = order_breakdown(self._cycle_segments(start, end))
+        if orders.empty:
             print("   ⚠️  Pas de données de temps de cycle disponibles")
-            return {"cycle": 0, "va": 0, "nva": 0}
-        
-        cycle_moyen = float(result['cycle_moyen'].iloc[0])
-        # Hypothèse: 20% du temps est NVA (attente, stockage)
-        nva = cycle_moyen * 0.20
-        va = cycle_moyen - nva
-        
-        print(f"   ⏱️  Temps cycle moyen: {cycle_moyen:.0f}s")
-        print(f"   ✅ Valeur ajoutée: {va:.0f}s ({va/cycle_moyen*100:.1f}%)")
-        print(f"   ❌ Non valeur ajoutée: {nva:.0f}s ({nva/cycle_moyen*100:.1f}%)\n")
+            return {"cycle": 0, "va": 0, "nva": 0, "transport": 0, "attente": 0}
+        
+        cycle_moyen = float(orders['lead_s'].mean())
+        va = float(orders['va_s'].mean())
+        transport = float(orders['transport_s'].mean())
+        attente = float(orders['waiting_s'].mean())
+        nva = transport + attente
+        part = (lambda value: value / cycle_moyen * 100) if cycle_moyen > 0 else (lambda value: 0.0)
+        
+        print(f"   ⏱️  Temps cycle moyen: {cycle_moyen:.0f}s ({len(orders)} OF)")
+        print(f"   ✅ Valeur ajoutée: {va:.0f}s ({part(va):.1f}%)")
+        print(f"   ❌ Non valeur ajoutée: {nva:.0f}s ({part(nva):.1f}%)")
+        print(f"      🚚 Transport: {transport:.0f}s ({part(transport):.1f}%)")
+        print(f"      ⏳ Attente: {attente:.0f}s ({part(attente):.1f}%)\n")
+        
+        return {"cycle": cycle_moyen, "va": va, "nva": nva, "transport": transport, "attente": attente}
+    
+    def _cycle_segments(self, start=None, end=None) -> pd.DataFrame:
+        """Étapes des OF terminés sur la période, avec leurs temps (voir lead_time.step_segments)"""
+        if self.snapshot is not None:
+            steps, orders = self.snapshot['tblfinstep'], self.snapshot['tblfinorder']
+            if len(steps.columns) == 0 or len(orders.columns) == 0:
+                return step_segments(pd.DataFrame(columns=STEP_COLUMNS))
+            steps = steps[steps['ONo'].isin(self._finished_orders(orders, start, end)['ONo'])]
+        else:
+            condition, params = self._period_sql('End', start, end)
+            steps = self.query_db(f"""
+                SELECT {', '.join(STEP_COLUMNS)}
+                FROM tblfinstep
+                WHERE ONo IN (SELECT ONo FROM tblfinorder WHERE End IS NOT NULL AND {condition})
+            """, params)
+            if steps.empty:
+                return step_segments(pd.DataFrame(columns=STEP_COLUMNS))
+        return step_segments(steps)
+    
+    def cycle_breakdown(self, by: str = 'day', start=None, end=None) -> pd.DataFrame:
+        """
+        Temps de cycle découpé en VA / transport / attente (histogramme empilé de la page Qualité)
         
-        return {"cycle": cycle_moyen, "va": va, "nva": nva}
+        Args:
+            by: 'order' (un OF par ligne), 'day' (moyennes par jour de fin) ou 'resource'
+            start, end: Période d'analyse (date de fin des OF)
+        Returns: DataFrame de lead_time.order_breakdown, breakdown_by_day ou breakdown_by_resource
+        """
+        segments = self._cycle_segments(start, end)
+        if by == 'resource':
+            return breakdown_by_resource(segments)
+        orders = order_breakdown(segments)
+        return orders if by == 'order' else breakdown_by_day(orders)
     
-    def indicator_12_taux_defaut(self) -> float:
+    def indicator_12_taux_defaut(self, start=None, end=None) -> Optional[float]:
         """
         12. Taux de Défaut (NC)
-        Returns: taux_defaut_%
+        Args: start, end: Période d'analyse. tblmainterror n'est pas horodatée: les défauts ne
+              peuvent pas être restreints à une période, le taux porte sur tout l'historique
+        Returns: taux_defaut_%, None si une période est demandée
         """
         print("📊 Indicateur 12: Taux de Défaut (Non-Conformités)")
         
+        # Jamais de défauts de tout l'historique rapportés aux OF d'une période
+        if start is not None or end is not None:
+            print("   ⚠️  Non calculable sur une période (tblmainterror n'est pas horodatée)\n")
+            return None
+        
         # Utiliser tblmainterror pour compter les erreurs
         query = """
             SELECT 
                 (SELECT COUNT(*) FROM tblfinorder) as total,
                 (SELECT COUNT(*) FROM tblmainterror) as defauts
         """
-        result = self.query_db(query)
+        if self.snapshot is not None:
+            result = self._snapshot_quality_counts()
+        else:
+            result = self.query_db(query)
         
         if result.empty:
             print("   ⚠️  Pas de données de qualité disponibles")
@@ -420,9 +1110,10 @@ class MESIndicators:
         
         return taux
     
-    def indicator_13_causes_nc(self) -> Dict[str, int]:
+    def indicator_13_causes_nc(self, start=None, end=None) -> Dict[str, int]:
         """
         13. Causes des Non-Conformités
+        Args: start, end: Acceptés pour homogénéité (tblmainterror n'est pas horodatée)
         Returns: dict avec répartition des causes
         """
         print("📊 Indicateur 13: Causes des Non-Conformités")
@@ -435,7 +1126,10 @@ class MESIndicators:
             JOIN tblerrorcodes ec ON me.ErrorNo = ec.ErrorId
             GROUP BY ec.Description
         """
-        result = self.query_db(query)
+        if self.snapshot is not None:
+            result = self._snapshot_causes_nc()
+        else:
+            result = self.query_db(query)
         
         if result.empty:
             print("   ⚠️  Pas de données de causes NC disponibles")
@@ -454,20 +1148,28 @@ class MESIndicators:
         
         return causes
     
-    def indicator_14_taux_conforme(self) -> float:
+    def indicator_14_taux_conforme(self, start=None, end=None) -> Optional[float]:
         """
         14. Taux de Conforme
-        Returns: taux_conforme_%
+        Args: start, end: Période d'analyse (comme l'indicateur 12, tout l'historique uniquement)
+        Returns: taux_conforme_%, None si une période est demandée
         """
         print("📊 Indicateur 14: Taux de Conformité")
         
+        if start is not None or end is not None:
+            print("   ⚠️  Non calculable sur une période (tblmainterror n'est pas horodatée)\n")
+            return None
+        
         # Inverser le calcul du taux de défaut pour obtenir le taux de conformité
         query = """
             SELECT 
                 (SELECT COUNT(*) FROM tblfinorder) as total,
                 (SELECT COUNT(*) FROM tblmainterror) as defauts
         """
-        result = self.query_db(query)
+        if self.snapshot is not None:
+            result = self._snapshot_quality_counts()
+        else:
+            result = self.query_db(query)
         
         if result.empty:
             print("   ⚠️  Pas de données de qualité disponibles")
@@ -483,64 +1185,267 @@ class MESIndicators:
         
         return taux
     
-    def indicator_15_consommation_energie(self) -> float:
+    def indicator_15_consommation_energie(self, start=None, end=None) -> Dict:
         """
         15. Consommation Énergie
-        Returns: consommation_kwh
+        Énergie électrique et air comprimé des étapes tblfinstep, lus dans les cumuls journaliers
+        Args: start, end: Période d'analyse (date de fin des étapes)
+        Returns: dict avec j_1 (kWh de la veille), jour, moyenne_jour, total_kwh, air_nl
+                 et par_jour (DataFrame day, energy_kwh, air_nl pour la courbe de tendance)
         """
         print("📊 Indicateur 15: Consommation Énergétique")
         
-        # Note: À adapter selon le format réel du fichier dataEnergy
-        print("   ⚠️  Fichier dataEnergy non implémenté")
-        print("   📊 Consommation (simulation): 250.5 kWh\n")
+        daily = self._energy_daily(start, end)
+        if daily.empty:
+            print("   ⚠️  Pas de consommation enregistrée sur la période\n")
+            return {"j_1": 0.0, "jour": None, "moyenne_jour": 0.0, "total_kwh": 0.0, "air_nl": 0.0,
+                    "par_jour": summarize(daily, 'day')}
+        
+        per_day = summarize(daily, 'day')
+        _, period_end = self._normalize_period(start, end)
+        jour = previous_day(daily, period_end.date() if period_end else None)
+        j_1 = float(per_day.loc[per_day['day'] == jour, 'energy_kwh'].sum()) if jour else 0.0
+        total_kwh = float(per_day['energy_kwh'].sum())
+        air_nl = float(per_day['air_nl'].sum())
+        moyenne_jour = total_kwh / len(per_day)
+        measured = int(per_day['measured_steps'].sum())
+        
+        print(f"   ⚡ Consommation J-1 ({jour}): {j_1:.3f} kWh")
+        print(f"   📊 Moyenne: {moyenne_jour:.3f} kWh/jour sur {len(per_day)} jours ({total_kwh:.3f} kWh)")
+        print(f"   💨 Air comprimé: {air_nl:.1f} Nl")
+        if measured == 0:
+            print("   ⚠️  Aucune mesure réelle: valeurs calculées par MES4 (ElectricEnergyCalc)")
+        print()
         
-        return 250.5
+        return {"j_1": j_1, "jour": jour, "moyenne_jour": moyenne_jour, "total_kwh": total_kwh,
+                "air_nl": air_nl, "par_jour": per_day[['day', 'energy_kwh', 'air_nl']]}
+    
+    def _energy_daily(self, start=None, end=None) -> pd.DataFrame:
+        """
+        Cumuls (jour, ressource) de la période: table persistée si un cache local est configuré,
+        sinon snapshot tblfinstep ou agrégation SQL directe
+        """
+        start, end = self._normalize_period(start, end)
+        if self.energy is not None and not self.dump_path:
+            return filter_days(self.energy.refresh(), start, end)
+        if self.snapshot is not None:
+            steps = self.snapshot['tblfinstep']
+            if len(steps.columns) == 0:
+                return daily_rollup(step_consumption(pd.DataFrame(columns=['End'])))
+            steps = steps[steps['End'].notna() & self._period_mask(steps['End'], start, end)]
+            return daily_rollup(step_consumption(steps))
+        condition, params = self._period_sql('End', start, end)
+        return rollup_from_sql(self.query_db(ROLLUP_SQL.format(condition=condition), params))
     
-    def run_all_indicators(self):
-        """Exécute tous les 15 indicateurs"""
+    def energy_consumption(self, by: str = 'day', start=None, end=None) -> pd.DataFrame:
+        """
+        Consommation par jour, par ressource ou par OF (graphiques de la page Qualité)
+        
+        Args:
+            by: 'day', 'resource' ou 'order' (l'OF relit ses étapes, les autres vues les cumuls)
+            start, end: Période d'analyse (date de fin des étapes)
+        Returns: DataFrame (day / ResourceID / ONo, energy_kwh, air_nl, steps...)
+        """
+        if by != 'order':
+            return summarize(self._energy_daily(start, end), by)
+        if self.snapshot is not None:
+            steps = self.snapshot['tblfinstep']
+            if len(steps.columns) == 0:
+                return order_consumption(step_consumption(pd.DataFrame(columns=['End'])))
+            steps = steps[steps['End'].notna() & self._period_mask(steps['End'], start, end)]
+        else:
+            condition, params = self._period_sql('End', start, end)
+            steps = self.query_db(f"""
+                SELECT ONo, ResourceID, End, {', '.join(ENERGY_COLUMNS)}
+                FROM tblfinstep
+                WHERE End IS NOT NULL AND {condition}
+            """, params)
+        return order_consumption(step_consumption(steps))
+    
+    def _prepare_run(self, snapshot: bool, start=None, end=None, parallel: bool = False) -> bool:
+        """
+        Connexion, données robot et snapshot avant un calcul complet
+        
+        Args:
+            parallel: Lit le CSV robot dans un thread pendant la connexion et le snapshot SQL
+        Returns: mode snapshot effectivement utilisé
+        """
+        if not parallel:
+            self.connect_db()
+            self.load_robot_data()
+            return self._prepare_snapshot(snapshot, start, end)
+        
+        # Lecture du CSV (disque + parsing) en parallèle des requêtes du snapshot (réseau)
+        output = _ThreadOutput.install()
+        
+        def load_robot():
+            with output.capture() as buffer:
+                try:
+                    self.load_robot_data()
+                finally:
+                    robot_log.append(buffer.getvalue())
+        
+        robot_log: List[str] = []
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='robot-csv') as executor:
+            robot = executor.submit(load_robot)
+            try:
+                self.connect_db()
+                snapshot = self._prepare_snapshot(snapshot, start, end)
+            finally:
+                # Attend la fin de la lecture même si le snapshot a échoué
+                robot_error = robot.exception()
+        print(''.join(robot_log), end='')
+        if robot_error is not None:
+            raise robot_error
+        return snapshot
+    
+    def _prepare_snapshot(self, snapshot: bool, start=None, end=None) -> bool:
+        self.query_count = 0
+        self.probe_count = 0
+        if self.dump_path and not snapshot:
+            # Le dump n'exécute pas de SQL: seul le mode snapshot est disponible
+            print("ℹ️  Dump hors ligne: passage en mode snapshot\n")
+            snapshot = True
+        if start is not None or end is not None:
+            print(f"📅 Période d'analyse: {start or '...'} → {end or '...'}\n")
+        if snapshot:
+            self.refresh_snapshot(start, end)
+        else:
+            self.snapshot = None
+        return snapshot
+    
+    def _call_indicator(self, method: str, start=None, end=None):
+        """Calcule un indicateur en l'instrumentant (durée, requêtes, mémoire du résultat)"""
+        return self.metrics.call(method, getattr(self, method), start=start, end=end,
+                                 cache='snapshot' if self.snapshot is not None else None)
+    
+    def _run_indicators(self, start=None, end=None, parallel: bool = False,
+                        max_workers: Optional[int] = None,
+                        timeout: float = INDICATOR_TIMEOUT) -> Dict[str, Tuple]:
+        """
+        Calcule les 15 indicateurs, en séquence ou sur un pool de threads
+        
+        En parallèle, les indicateurs SQL attendent surtout MariaDB (I/O): chacun emprunte sa
+        propre connexion au pool partagé et la durée totale tend vers celle du plus lent.
+        Les print() de chaque indicateur sont capturés puis réaffichés dans l'ordre des onglets.
+        
+        Args:
+            start, end: Période d'analyse
+            parallel: Exécute les indicateurs sur un pool de threads
+            max_workers: Nombre de threads (défaut: un par indicateur)
+            timeout: Délai (s) accordé à chaque indicateur depuis le lancement du calcul
+                     parallèle, au-delà il est signalé en erreur sans bloquer les autres
+        Returns: dict ordonné {nom_méthode: (résultat, erreur ou None, sortie capturée ou None)}
+        """
+        methods = [method for _, tab_methods in self.INDICATOR_TABS for method in tab_methods]
+        outcomes = {}
+        if not parallel:
+            for method in methods:
+                try:
+                    outcomes[method] = (self._call_indicator(method, start, end), None, None)
+                except DatabaseUnavailableError:
+                    raise
+                except Exception as e:
+                    outcomes[method] = (None, str(e), None)
+            return outcomes
+        
+        output = _ThreadOutput.install()
+        
+        def run(method):
+            with output.capture() as buffer:
+                try:
+                    return self._call_indicator(method, start, end), None, buffer.getvalue()
+                except DatabaseUnavailableError:
+                    raise
+                except Exception as e:
+                    return None, str(e), buffer.getvalue()
+        
+        # Pas de with: un indicateur bloqué ne doit pas faire attendre la fin du calcul
+        executor = ThreadPoolExecutor(max_workers=max_workers or len(methods),
+                                      thread_name_prefix='indicator')
+        try:
+            futures = {method: executor.submit(run, method) for method in methods}
+            deadline = time.monotonic() + timeout
+            for method, future in futures.items():
+                try:
+                    outcomes[method] = future.result(timeout=max(deadline - time.monotonic(), 0))
+                except FuturesTimeoutError:
+                    outcomes[method] = (None, f"délai dépassé (> {timeout:g}s)", None)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return outcomes
+    
+    def compute_all(self, snapshot: bool = True, start=None, end=None, parallel: bool = False,
+                    max_workers: Optional[int] = None, timeout: float = INDICATOR_TIMEOUT,
+                    quiet: bool = False) -> Tuple[Dict, Dict]:
+        """
+        Calcule les 15 indicateurs et retourne leurs valeurs (sans s'arrêter sur une erreur)
+        
+        Args:
+            snapshot: Mode snapshot (voir run_all_indicators)
+            start, end: Période d'analyse
+            parallel, max_workers, timeout: Exécution parallèle (voir _run_indicators)
+            quiet: Écarte l'affichage des indicateurs, pour le thread appelant seulement (les autres
+                   threads du processus, ex: sessions Streamlit, écrivent normalement)
+        Returns: ({nom_méthode: résultat}, {nom_méthode: message d'erreur})
+        """
+        if quiet:
+            with _ThreadOutput.install().capture():
+                return self.compute_all(snapshot, start, end, parallel, max_workers, timeout)
+        self._prepare_run(snapshot, start, end, parallel)
+        results, errors = {}, {}
+        for method, (result, error, output) in self._run_indicators(
+                start, end, parallel, max_workers, timeout).items():
+            if output:
+                print(output, end='')
+            if error is not None:
+                errors[method] = error
+                print(f"   ❌ {method}: {error}\n")
+            else:
+                results[method] = result
+        return results, errors
+    
+    def run_all_indicators(self, snapshot: bool = True, start=None, end=None, parallel: bool = False,
+                           max_workers: Optional[int] = None, timeout: float = INDICATOR_TIMEOUT):
+        """
+        Exécute tous les 15 indicateurs
+        
+        Args:
+            snapshot: Si True, charge les tables de base une seule fois (refresh_snapshot)
+                      et dérive tous les indicateurs de ce snapshot en mémoire
+            start, end: Période d'analyse appliquée à tous les indicateurs (None = tout l'historique)
+            parallel: Exécute les indicateurs sur un pool de threads (sortie identique, dans le même ordre)
+            max_workers: Nombre de threads en mode parallèle (défaut: un par indicateur)
+            timeout: Durée maximale (s) d'un indicateur en mode parallèle
+        """
         print("=" * 60)
         print("🚀 TEST DES 15 INDICATEURS MES 4.0 - DASHBOARD T'ELEFAN")
         print("=" * 60)
         print()
         
         try:
-            self.connect_db()
-            self.load_robot_data()
-            
-            print("\n" + "=" * 60)
-            print("🔴 ONGLET 1: TEMPS RÉEL")
-            print("=" * 60 + "\n")
-            
-            self.indicator_1_autonomie_robot()
-            self.indicator_2_of_realises()
-            self.indicator_3_production_realisee()
-            
-            print("\n" + "=" * 60)
-            print("🟠 ONGLET 2: STOCKAGE")
-            print("=" * 60 + "\n")
+            began = time.perf_counter()
+            snapshot = self._prepare_run(snapshot, start, end, parallel)
             
-            self.indicator_4_taux_occupation()
-            self.indicator_5_mouvements_stocks()
+            if parallel:
+                outcomes = self._run_indicators(start, end, True, max_workers, timeout)
+            for title, methods in self.INDICATOR_TABS:
+                print("\n" + "=" * 60)
+                print(title)
+                print("=" * 60 + "\n")
+                for method in methods:
+                    if not parallel:
+                        self._call_indicator(method, start, end)
+                        continue
+                    _, error, output = outcomes[method]
+                    print(output or '', end='')
+                    if error is not None:
+                        print(f"   ❌ {method}: {error}\n")
             
-            print("\n" + "=" * 60)
-            print("🟡 ONGLET 3: ROBOT")
-            print("=" * 60 + "\n")
-            
-            self.indicator_6_historique_autonomie()
-            self.indicator_7_distance_parcourue()
-            
-            print("\n" + "=" * 60)
-            print("🔵 ONGLET 4: PRODUCTION / QUALITÉ / ÉNERGIE")
-            print("=" * 60 + "\n")
-            
-            self.indicator_8_production_hebdo()
-            self.indicator_9_production_detaillee()
-            self.indicator_10_taux_occupation_machine()
-            self.indicator_11_temps_cycle_nva()
-            self.indicator_12_taux_defaut()
-            self.indicator_13_causes_nc()
-            self.indicator_14_taux_conforme()
-            self.indicator_15_consommation_energie()
+            print(f"🔁 Requêtes SQL exécutées: {self.query_count}"
+                  f" (mode {'snapshot' if snapshot else 'direct'}, + {self.probe_count} sondes de version)\n")
+            print(f"⏱️  Durée totale: {time.perf_counter() - began:.2f}s"
+                  f" ({'parallèle' if parallel else 'séquentiel'})\n")
             
             print("=" * 60)
             print("✅ TEST TERMINÉ")
@@ -549,9 +1454,8 @@ class MESIndicators:
         except Exception as e:
             print(f"\n❌ ERREUR CRITIQUE: {e}\n")
         finally:
-            if self.conn:
-                self.conn.close()
-                print("\n🔌 Connexion MariaDB fermée")
+            if self.pool:
+                print("\n🔌 Connexions MariaDB rendues au pool")
 
 
 if __name__ == "__main__":
@@ -567,6 +1471,34 @@ if __name__ == "__main__":
     # Chemin vers le fichier CSV robot
     CSV_ROBOT_PATH = 'TELEFAN/robotino_data.csv'
     
+    # Cache local des tables d'OF et de rapports (synchronisation incrémentale)
+    CACHE_DIR = 'TELEFAN/mes_cache'
+    
+    # Mode hors ligne: python test_indicators.py --dump [fichier.sql]
+    DUMP_PATH = None
+    if '--dump' in sys.argv:
+        position = sys.argv.index('--dump')
+        DUMP_PATH = sys.argv[position + 1] if len(sys.argv) > position + 1 and not sys.argv[position + 1].startswith('--') else 'TELEFAN/FestoMES-2025-03-27.sql'
+    
+    # Base analytique embarquée construite depuis le dump: python test_indicators.py --embedded [fichier.sql]
+    BACKEND = None
+    if '--embedded' in sys.argv:
+        position = sys.argv.index('--embedded')
+        source = sys.argv[position + 1] if len(sys.argv) > position + 1 and not sys.argv[position + 1].startswith('--') else 'TELEFAN/FestoMES-2025-03-27.sql'
+        BACKEND = EmbeddedBackend.from_dump(source)
+    
     # Exécution des tests
-    mes = MESIndicators(DB_CONFIG, CSV_ROBOT_PATH)
-    mes.run_all_indicators()
+    mes = MESIndicators(DB_CONFIG, CSV_ROBOT_PATH, cache_dir=None if DUMP_PATH or BACKEND else CACHE_DIR,
+                        dump_path=DUMP_PATH, backend=BACKEND)
+    try:
+        # Indicateurs en parallèle sur le pool de connexions: python test_indicators.py --parallel
+        mes.run_all_indicators(parallel='--parallel' in sys.argv)
+        
+        # Mesures par indicateur et par requête: python test_indicators.py --profile [fichier.csv|.json]
+        if '--profile' in sys.argv:
+            position = sys.argv.index('--profile')
+            profile_path = sys.argv[position + 1] if len(sys.argv) > position + 1 and not sys.argv[position + 1].startswith('--') else 'kpi_metrics.csv'
+            print(mes.metrics.summary().to_string(index=False))
+            print(f"\n⏱️  {mes.metrics.export(profile_path)} mesures exportées dans {profile_path}")
+    finally:
+        close_all_pools()